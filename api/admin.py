@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import Category,Slider, Products, Slider, News
+from .models import Category,Slider, Products, Slider, News, Job, DeadLetterJob
 # Register your models here.
 admin.site.register(Category)
 admin.site.register(Products)
 admin.site.register(Slider)
 admin.site.register(News)
+admin.site.register(Job)
+admin.site.register(DeadLetterJob)
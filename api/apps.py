@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate, pre_migrate
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import drop_sqlite_triggers, ensure_sqlite_index
+        pre_migrate.connect(drop_sqlite_triggers, sender=self)
+        post_migrate.connect(ensure_sqlite_index, sender=self)
@@ -0,0 +1,165 @@
+"""
+Native async list, detail and delete views for products and news.
+
+DRF views are synchronous: under ASGI each request to one holds a thread
+for its whole duration, and under gunicorn's sync workers a whole worker.
+These are plain Django async views that read with the async ORM
+(aiterator(), aget()) and answer with the same bodies as their DRF
+counterparts: the serializer compiled by FastRepresentation, KeysetPagination,
+CachedJWTAuthentication, and {"error": ...} for refused deletes. They also
+work under WSGI, where Django runs each one in its own event loop.
+
+They do not add response caching or conditional GET; the DRF views keep
+those for clients that benefit from them.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+
+from .authentication import CachedJWTAuthentication
+from .jobs import enqueue_media_deletion
+from .models import News, Products
+from .pagination import KeysetPagination
+from .rendering import FastJSONRenderer, FastRepresentation
+from .serializers import NewsSerializer, ProductSerializer
+from .views import delete_product_media
+
+
+class AsyncAPIView(View):
+    """Base view: JSON responses and, when ``authentication_required``, a JWT user."""
+    authentication_required = False
+    queryset = None
+    serializer_class = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Authentication is by token, not cookie, as for DRF's APIView.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.user = None
+        if self.authentication_required:
+            authenticator = CachedJWTAuthentication()
+            try:
+                result = await sync_to_async(authenticator.authenticate)(request)
+                if result is None:
+                    raise exceptions.NotAuthenticated()
+            except exceptions.APIException as exc:
+                response = self.exception_response(exc)
+                response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+                return response
+            self.user = result[0]
+        return await super().dispatch(request, *args, **kwargs)
+
+    def render(self, data, status=status.HTTP_200_OK):
+        return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+    def exception_response(self, exc):
+        detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+        return self.render(detail, exc.status_code)
+
+    def not_found(self):
+        return self.render({'detail': f'No {self.queryset.model._meta.object_name} matches the given query.'}, status.HTTP_404_NOT_FOUND)
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_representation(self):
+        representation = FastRepresentation.for_serializer(self.serializer_class(context={'request': self.request}))
+        if representation is None:
+            raise ImproperlyConfigured(f'{self.serializer_class.__name__} has fields the async views cannot compile')
+        return representation
+
+
+class AsyncListView(AsyncAPIView):
+    pagination_class = KeysetPagination
+
+    async def get(self, request, *args, **kwargs):
+        representation = self.get_representation()
+        paginator = self.pagination_class()
+        ordering = getattr(self, 'pagination_ordering', paginator.ordering)
+        # The paginator reads its ordering fields from the rows for cursors.
+        lookups = dict.fromkeys([*representation.lookups, *(field.lstrip('-') for field in ordering)])
+        rows = self.get_queryset().values(*lookups)
+        try:
+            page = await paginator.apaginate_queryset(rows, Request(request), view=self)
+        except exceptions.NotFound as exc:
+            return self.exception_response(exc)
+        return self.render(paginator.get_paginated_response(representation.many(page)).data)
+
+
+class AsyncDetailView(AsyncAPIView):
+    async def get(self, request, pk, *args, **kwargs):
+        representation = self.get_representation()
+        try:
+            row = await self.get_queryset().values(*representation.lookups).aget(pk=pk)
+        except self.queryset.model.DoesNotExist:
+            return self.not_found()
+        return self.render(representation.many([row])[0])
+
+
+class AsyncDeleteView(AsyncAPIView):
+    """
+    Delete an instance owned by the user and queue deletion of its media.
+    The delete and the queued jobs commit together, in one transaction,
+    which the async ORM cannot open, so that part runs in a thread.
+    """
+    authentication_required = True
+    forbidden_message = None
+    deleted_message = None
+
+    async def delete(self, request, pk, *args, **kwargs):
+        try:
+            instance = await self.get_queryset().aget(pk=pk)
+        except self.queryset.model.DoesNotExist:
+            return self.not_found()
+        if instance.author_id != self.user.id:
+            return self.render({'error': self.forbidden_message}, status.HTTP_403_FORBIDDEN)
+        await sync_to_async(self.perform_destroy)(instance)
+        return self.render({'message': self.deleted_message}, status.HTTP_204_NO_CONTENT)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self.delete_media(instance)
+            instance.delete()
+
+    def delete_media(self, instance):
+        raise NotImplementedError
+
+
+class AsyncProductList(AsyncListView):
+    queryset = Products.objects.all()
+    serializer_class = ProductSerializer
+
+class AsyncProductDetail(AsyncDetailView):
+    queryset = Products.objects.all()
+    serializer_class = ProductSerializer
+
+class AsyncProductDelete(AsyncDeleteView):
+    queryset = Products.objects.all()
+    forbidden_message = 'You do not have permission to delete this product'
+    deleted_message = 'Product and associated media files deleted successfully'
+
+    def delete_media(self, instance):
+        delete_product_media(instance)
+
+class AsyncNewsList(AsyncListView):
+    queryset = News.objects.all()
+    serializer_class = NewsSerializer
+
+class AsyncNewsDetail(AsyncDetailView):
+    queryset = News.objects.all()
+    serializer_class = NewsSerializer
+
+class AsyncNewsDelete(AsyncDeleteView):
+    queryset = News.objects.all()
+    forbidden_message = 'You do not have permission to delete this news'
+    deleted_message = 'News deleted successfully'
+
+    def delete_media(self, instance):
+        enqueue_media_deletion(instance.image)
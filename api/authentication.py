@@ -0,0 +1,63 @@
+"""
+JWT authentication without a user query on every request.
+
+simplejwt's JWTAuthentication loads the user row for each authenticated
+request. CachedJWTAuthentication keeps the user in the cache for
+AUTH_USER_CACHE_TIMEOUT seconds, keyed by user id, together with the
+password fingerprint that simplejwt embeds in tokens (CHECK_REVOKE_TOKEN).
+A token issued before a password change carries the old fingerprint and is
+rejected, cached user or not.
+
+Saving or deleting a user drops its entry once the transaction commits (see
+signals.py); dropping it earlier would let a concurrent request cache the
+old row again. Changes made with queryset.update(), which sends no signals,
+are picked up when the entry expires.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_KEY = 'api:auth-user:{}'
+
+
+def forget_user(user_id):
+    cache.delete(USER_KEY.format(user_id))
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = getattr(instance, api_settings.USER_ID_FIELD)
+    transaction.on_commit(lambda: forget_user(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """Drop-in replacement for JWTAuthentication with the same checks."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        key = USER_KEY.format(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            cached = (user, get_md5_hash_password(user.password))
+            cache.set(key, cached, settings.AUTH_USER_CACHE_TIMEOUT)
+        user, password_fingerprint = cached
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_fingerprint:
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,338 @@
+"""
+Benchmark every route in core/urls.py and api/urls.py.
+
+Each route gets one request shape: GET where the view supports it,
+otherwise a write from WRITE_CASES. Routes are called in-process through
+the Django test client, inside a transaction that is rolled back, or over
+HTTP against a running server (GET routes only, since writes could not be
+undone). Results are plain dicts, so `manage.py benchmark_api` can dump them
+as JSON and compare runs across commits.
+"""
+import json
+import platform
+import re
+import statistics
+import subprocess
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.urls.resolvers import RoutePattern
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Category, Contact, News, Products, Slider, Testimonial, UploadSession
+from .seeding import PASSWORD, USER_PREFIX
+
+# Route kwargs that do not refer to the view's own model.
+PATH_MODELS = {
+    'products_by_category': Category,
+    'slider_upload': UploadSession,
+}
+
+# Request bodies for routes without a GET handler, by URL name. Each is
+# called with the benchmark context and returns (method, body).
+WRITE_CASES = {
+    'register': lambda ctx: ('post', {'username': 'benchmark-register', 'password': 'benchmark-password-1'}),
+    'token_obtain_pair': lambda ctx: ('post', {'username': ctx['user'].username, 'password': PASSWORD}),
+    'token_refresh': lambda ctx: ('post', {'refresh': ctx['refresh']}),
+    'create_category': lambda ctx: ('post', {'name': 'Benchmark category'}),
+    'category_update': lambda ctx: ('patch', {'name': 'Benchmark category'}),
+    'category_delete': lambda ctx: ('delete', None),
+    'product_create': lambda ctx: ('post', ctx['new_product']),
+    'product_update': lambda ctx: ('patch', {'price': 12.5}),
+    'product_delete': lambda ctx: ('delete', None),
+    'async_product_delete': lambda ctx: ('delete', None),
+    'product_bulk_create': lambda ctx: ('post', [ctx['new_product']] * 50),
+    'product_bulk_update': lambda ctx: ('patch', [{'id': pk, 'price': 12.5} for pk in ctx['batch']]),
+    'product_bulk_delete': lambda ctx: ('post', {'ids': ctx['batch']}),
+    'slider_update': lambda ctx: ('patch', {'caption': 'Benchmark caption'}),
+    'slider_delete': lambda ctx: ('delete', None),
+    'contact_create': lambda ctx: ('post', {
+        'firstName': 'Bench', 'lastName': 'Mark', 'email': 'bench@example.com',
+        'message': 'Benchmark message', 'category': 'support',
+    }),
+    'contact_update': lambda ctx: ('patch', {'is_read': True}),
+    'contact_mark_read': lambda ctx: ('post', {'filter': {'category': 'support'}}),
+    'contact_mark_unread': lambda ctx: ('post', {'ids': [ctx['pks'][Contact]]}),
+    'contact_mark_responded': lambda ctx: ('post', {'filter': {}}),
+    'contact_mark_unresponded': lambda ctx: ('post', {'ids': [ctx['pks'][Contact]]}),
+    'contact_delete': lambda ctx: ('delete', None),
+    'news_create': lambda ctx: ('post', {'title': 'Benchmark news', 'content': 'Benchmark content'}),
+    'news_update': lambda ctx: ('patch', {'title': 'Benchmark news'}),
+    'news_delete': lambda ctx: ('delete', None),
+    'async_news_delete': lambda ctx: ('delete', None),
+    'testimonial_create': lambda ctx: ('post', {'name': 'Benchmark customer', 'content': 'Benchmark content'}),
+    'testimonial_update': lambda ctx: ('patch', {'content': 'Benchmark content'}),
+    'testimonial_delete': lambda ctx: ('delete', None),
+}
+
+SKIPPED = {
+    'slider_create': 'needs a video file upload',
+    'slider_upload_create': 'creates a temp file outside the database',
+    'slider_upload_complete': 'needs a completed upload',
+    'product_import': 'needs a manifest file upload',
+    'metrics': 'authenticates with METRICS_TOKEN, not a user token',
+}
+
+ROUTE_KWARG = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+def iter_routes(patterns=None, prefix=''):
+    """
+    Yield (name, route, view class) for the project's own routes: those in
+    core/urls.py and in URLconfs included from the api app. Third-party
+    includes (admin, DRF login) and regex routes are left out.
+    """
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            module = getattr(pattern.urlconf_module, '__name__', '')
+            if module.split('.')[0] == 'api':
+                yield from iter_routes(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern) and isinstance(pattern.pattern, RoutePattern):
+            view_class = getattr(pattern.callback, 'view_class', None)
+            if view_class is not None:
+                yield pattern.name, '/' + prefix + str(pattern.pattern), view_class
+
+
+def build_context():
+    """Pick rows owned by the first seeded user to fill in routes and bodies."""
+    user = User.objects.filter(username__startswith=USER_PREFIX, products__isnull=False).order_by('pk').first()
+    if user is None:
+        raise ValueError('No seeded data: run `manage.py seed_catalog` first')
+    refresh = RefreshToken.for_user(user)
+
+    def owned(model):
+        return model.objects.filter(author=user).order_by('pk').values_list('pk', flat=True).first()
+
+    products = list(Products.objects.filter(author=user).order_by('pk').values_list('pk', flat=True)[:50])
+    category = Products.objects.filter(pk=products[0]).values_list('category_id', flat=True).get()
+    return {
+        'user': user,
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+        'batch': products,
+        'new_product': {'name': 'Benchmark pipe', 'category': category, 'price': 10, 'description': 'Benchmark'},
+        'pks': {
+            Products: products[0],
+            Category: category,
+            News: owned(News),
+            Testimonial: owned(Testimonial),
+            Slider: owned(Slider),
+            Contact: Contact.objects.order_by('pk').values_list('pk', flat=True).first(),
+            User: user.pk,
+        },
+    }
+
+
+def plan_cases(context, writes=True):
+    """Return (cases, skipped): one request per route, or the reason there is none."""
+    cases, skipped = [], []
+    for name, route, view_class in iter_routes():
+        if name in SKIPPED:
+            skipped.append({'name': name, 'path': route, 'reason': SKIPPED[name]})
+            continue
+        kwargs = ROUTE_KWARG.findall(route)
+        model = PATH_MODELS.get(name) or getattr(getattr(view_class, 'queryset', None), 'model', None)
+        pk = context['pks'].get(model)
+        if kwargs and pk is None:
+            skipped.append({'name': name, 'path': route, 'reason': 'no row to fill the route with'})
+            continue
+        path = ROUTE_KWARG.sub(str(pk), route)
+
+        if hasattr(view_class, 'get'):
+            cases.append({'name': name, 'method': 'get', 'path': path, 'body': None})
+        elif name in WRITE_CASES and writes:
+            method, body = WRITE_CASES[name](context)
+            cases.append({'name': name, 'method': method, 'path': path, 'body': body})
+        else:
+            reason = 'writes only run in-process' if name in WRITE_CASES else 'no request defined in WRITE_CASES'
+            skipped.append({'name': name, 'path': path, 'reason': reason})
+    return cases, skipped
+
+
+def summarize(latencies, elapsed):
+    """Latency percentiles (ms) and throughput (requests/s) for one endpoint."""
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(cuts[49], 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+class InProcessRunner:
+    """Call views through the test client; every write is rolled back."""
+    mode = 'in-process'
+
+    def __init__(self, context):
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        self.client = Client(
+            HTTP_HOST=host, HTTP_AUTHORIZATION=f"Bearer {context['access']}", raise_request_exception=False,
+        )
+
+    def request(self, case):
+        body = json.dumps(case['body']) if case['body'] is not None else ''
+        if case['method'] == 'get':
+            return self.client.get(case['path']).status_code
+        with transaction.atomic():
+            response = self.client.generic(case['method'].upper(), case['path'], body, content_type='application/json')
+            transaction.set_rollback(True)
+        return response.status_code
+
+    def measure(self, case, iterations, warmup):
+        # Counted with a wrapper: the test client's request_started signal
+        # resets connection.queries, which CaptureQueriesContext relies on.
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            status = self.request(case)
+        for _ in range(warmup - 1):
+            self.request(case)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        self.request(case)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            request_started = time.perf_counter()
+            self.request(case)
+            latencies.append((time.perf_counter() - request_started) * 1000)
+        elapsed = time.perf_counter() - started
+        return {
+            'status': status,
+            'queries': len(queries),
+            'peak_alloc_kb': round((peak - before) / 1024, 1),
+            **summarize(latencies, elapsed),
+        }
+
+
+class HTTPRunner:
+    """GET routes over HTTP against a running server, optionally concurrently."""
+    mode = 'http'
+
+    def __init__(self, context, base_url, concurrency=1):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Authorization': f"Bearer {context['access']}"}
+        self.concurrency = concurrency
+
+    def request(self, case):
+        request = urllib.request.Request(self.base_url + case['path'], headers=self.headers)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def timed_request(self, case):
+        started = time.perf_counter()
+        self.request(case)
+        return (time.perf_counter() - started) * 1000
+
+    def measure(self, case, iterations, warmup):
+        status = self.request(case)
+        for _ in range(warmup - 1):
+            self.request(case)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            latencies = list(pool.map(self.timed_request, [case] * iterations))
+        elapsed = time.perf_counter() - started
+        return {'status': status, 'queries': None, 'peak_alloc_kb': None, **summarize(latencies, elapsed)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(iterations=50, warmup=3, base_url=None, concurrency=1, only=None, log=None):
+    """
+    Benchmark every route and return a JSON-serializable report. ``only``
+    restricts the run to the given URL names.
+    """
+    log = log or (lambda message: None)
+    # Repeating the same write would otherwise measure 429s and duplicate
+    # submission hits instead of the views.
+    unprotected = override_settings(THROTTLE_ENABLED=False, DUPLICATE_SUBMISSION_WINDOW=0)
+    with unprotected, transaction.atomic():
+        context = build_context()
+        context['pks'][UploadSession] = UploadSession.objects.create(
+            author=context['user'], filename='benchmark.mp4', size=1,
+        ).pk
+        if base_url:
+            # The upload session only exists inside this transaction.
+            del context['pks'][UploadSession]
+            runner = HTTPRunner(context, base_url, concurrency)
+        else:
+            runner = InProcessRunner(context)
+        cases, skipped = plan_cases(context, writes=base_url is None)
+        if only:
+            cases = [case for case in cases if case['name'] in only]
+
+        # Reads first, so writes (and the cache invalidation they cause)
+        # do not disturb them.
+        results = []
+        for case in sorted(cases, key=lambda case: case['method'] != 'get'):
+            result = {'name': case['name'], 'method': case['method'].upper(), 'path': case['path']}
+            result.update(runner.measure(case, iterations, warmup))
+            log(
+                f"{result['method']:<6} {result['path']:<45} {result['status']} "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms queries={result['queries']}"
+            )
+            results.append(result)
+        dataset = {model._meta.label: model.objects.count() for model in (Products, Category, News, Testimonial, Slider, Contact, User)}
+        transaction.set_rollback(True)
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'mode': runner.mode,
+            'iterations': iterations,
+            'concurrency': concurrency if base_url else 1,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': dataset,
+        },
+        'endpoints': results,
+        'skipped': skipped,
+    }
+
+
+def compare(previous, current):
+    """Rows of (name, method, old p50, new p50, change %, old queries, new queries)."""
+    before = {(row['name'], row['method']): row for row in previous['endpoints']}
+    rows = []
+    for row in current['endpoints']:
+        old = before.get((row['name'], row['method']))
+        if old is None:
+            continue
+        change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+        rows.append((row['name'], row['method'], old['p50_ms'], row['p50_ms'], change, old['queries'], row['queries']))
+    return rows
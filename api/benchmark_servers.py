@@ -0,0 +1,29 @@
+"""
+WSGI and ASGI entry points for `manage.py benchmark_asgi`. With
+BENCHMARK_QUERY_LATENCY_MS set, every query first sleeps that long, standing
+in for a database on the other side of a network.
+"""
+import os
+import time
+
+from core.asgi import application as asgi_application  # noqa: F401
+from core.wsgi import application as wsgi_application  # noqa: F401
+from django.db.backends.signals import connection_created
+
+LATENCY = float(os.environ.get('BENCHMARK_QUERY_LATENCY_MS') or 0) / 1000
+
+
+def delay(execute, sql, params, many, context):
+    time.sleep(LATENCY)
+    return execute(sql, params, many, context)
+
+
+def add_latency(sender, connection, **kwargs):
+    # Sent on every reconnect of the same connection object, possibly inside
+    # an execute_wrapper() block, which pops the last wrapper on exit.
+    if delay not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, delay)
+
+
+if LATENCY:
+    connection_created.connect(add_latency)
@@ -0,0 +1,189 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from .routers import reading_from_replica
+
+GENERATION_KEY = 'api:generation:{}'
+DELETED_KEY = 'api:deleted:{}'
+CHANGED_KEY = 'api:changed:{}'
+RESPONSE_KEY = 'api:response:{}'
+STATS_KEY = 'api:response-stats:{}:{}'
+QUERY_KEY = 'api:query:{}:{}'
+
+
+def _incr(key, initial):
+    """Increment ``key``, creating it with ``initial`` when it is missing or was evicted."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, initial, None):
+            return initial
+        return cache.incr(key)
+
+
+def get_generations(models):
+    """
+    Return the current generation of each model. A generation that is not in
+    the cache (first use or eviction) starts at the current time in
+    nanoseconds so it can never repeat an earlier value.
+    """
+    keys = [GENERATION_KEY.format(model._meta.label_lower) for model in models]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        generations.append(found[key])
+    return generations
+
+
+def bump_generation(*models):
+    """
+    Invalidate every cached response that depends on one of ``models``.
+
+    Inside a transaction the bump waits for the commit, and is dropped on
+    rollback. Bumping earlier would let a request that still reads the old
+    rows cache them, and build its validators, under the new generation.
+    """
+    transaction.on_commit(lambda: _bump(models))
+
+
+def _bump(models):
+    for model in models:
+        _incr(GENERATION_KEY.format(model._meta.label_lower), time.time_ns())
+    cache.set_many({CHANGED_KEY.format(model._meta.label_lower): time.time() for model in models}, None)
+
+
+def mark_deleted(model):
+    """Record, once the transaction commits, when a row of ``model`` was last deleted, for Last-Modified."""
+    transaction.on_commit(lambda: cache.set(DELETED_KEY.format(model._meta.label_lower), time.time(), None))
+
+
+def last_deleted(model):
+    """
+    Timestamp of the last deletion of a ``model`` row. When unknown (first use
+    or eviction) it starts at the current time, which errs on the side of
+    reporting the content as modified.
+    """
+    return _timestamp(DELETED_KEY.format(model._meta.label_lower))
+
+
+def last_changed(model):
+    """
+    Timestamp of the last change to any ``model`` row, recorded by
+    bump_generation(). Unknown times start at the current time, as in
+    last_deleted().
+    """
+    return _timestamp(CHANGED_KEY.format(model._meta.label_lower))
+
+
+def _timestamp(key):
+    now = time.time()
+    if cache.add(key, now, None):
+        return now
+    return cache.get(key, now)
+
+
+def cached_query(name, models, compute):
+    """
+    Return ``compute()``, cached until a row of one of ``models`` changes.
+    For results behind authentication, which CachedResponseMixin cannot
+    serve.
+    """
+    key = QUERY_KEY.format(name, '-'.join(map(str, get_generations(models))))
+    return cache.get_or_set(key, compute, settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def response_cache_key(request, models):
+    parts = [
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        *map(str, get_generations(models)),
+    ]
+    return RESPONSE_KEY.format(hashlib.md5('|'.join(parts).encode()).hexdigest())
+
+
+def cache_stats():
+    """Hit and miss counters for every view using CachedResponseMixin."""
+    names = sorted(CachedResponseMixin.registry)
+    keys = [STATS_KEY.format(name, kind) for name in names for kind in ('hits', 'misses')]
+    found = cache.get_many(keys)
+    return {
+        name: {
+            kind: found.get(STATS_KEY.format(name, kind), 0)
+            for kind in ('hits', 'misses')
+        }
+        for name in names
+    }
+
+
+def reset_cache_stats():
+    cache.delete_many([
+        STATS_KEY.format(name, kind)
+        for name in CachedResponseMixin.registry for kind in ('hits', 'misses')
+    ])
+
+
+class CachedResponseMixin:
+    """
+    Cache successful GET responses keyed by URL, query string and Accept
+    header. The key also includes the generation of every model in
+    ``cache_models``; signals bump those on save/delete, so a change is
+    visible on the next request without deleting any entries.
+
+    Hits skip authentication, so only use this on AllowAny views.
+    """
+    cache_models = ()
+    registry = set()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        CachedResponseMixin.registry.add(cls.__name__)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return super().dispatch(request, *args, **kwargs)
+
+        name = type(self).__name__
+        key = response_cache_key(request, self.cache_models)
+        cached = cache.get(key)
+        if cached is not None:
+            _incr(STATS_KEY.format(name, 'hits'), 1)
+            content, status, headers = cached
+            response = HttpResponse(content, status=status)
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            # The validators were stored with the entry, so conditional
+            # requests can still be answered with 304 on a hit.
+            return get_conditional_response(
+                request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+                response=response,
+            ) or response
+
+        _incr(STATS_KEY.format(name, 'misses'), 1)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            if hasattr(response, 'render'):
+                response.render()
+            timeout = settings.RESPONSE_CACHE_TIMEOUT
+            if reading_from_replica():
+                # The replica may not have the write that bumped the generation yet.
+                timeout = min(timeout, settings.READ_YOUR_WRITES_SECONDS)
+            cache.set(
+                key,
+                (response.content, response.status_code, dict(response.items())),
+                timeout,
+            )
+        response['X-Cache'] = 'MISS'
+        return response
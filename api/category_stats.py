@@ -0,0 +1,143 @@
+"""
+Denormalized product statistics on Category: product_count, min_price,
+max_price and latest_product_at.
+
+They are kept up to date by the writes themselves rather than computed per
+request. add_products() counts new rows in; remove_product() counts one out
+and, only when the row held the category's minimum or maximum price or was
+its newest, takes that aggregate again from the category's remaining rows.
+An update is a removal followed by an addition. Each is a single UPDATE of
+the category row, run in the transaction that writes the product:
+Products.save() is atomic and the post_save and post_delete handlers in
+signals.py call these, so the statistics commit with the change. The
+Category cache generation is bumped once they have committed, and not at
+all when they roll back.
+
+bulk_create(), bulk_update() and queryset.update() send no signals; code
+using them calls add_products() or refresh(). Deleting many rows at once
+goes inside deferred(), which refreshes each touched category once instead
+of updating it per row. Two concurrent removals of a category's cheapest
+products can still leave a stale minimum, which reconcile() (the
+reconcile_category_stats command) repairs.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Case, Count, F, Max, Min, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .cache import bump_generation
+from .models import Category, Products
+
+STATS_FIELDS = ('product_count', 'min_price', 'max_price', 'latest_product_at')
+
+# Category ids touched inside deferred(), or None outside it.
+_deferred = ContextVar('category_stats_deferred', default=None)
+
+
+def _aggregate(function, field):
+    """One aggregate over the products of the category being updated."""
+    return Subquery(
+        Products.objects.filter(category=OuterRef('pk')).order_by()
+        .values('category').annotate(value=function(field)).values('value')
+    )
+
+
+@contextmanager
+def deferred():
+    """Refresh the categories touched in the block once, when it completes."""
+    touched = set()
+    token = _deferred.set(touched)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    if touched:
+        refresh(touched)
+
+
+def add_products(products):
+    """Count saved products into their categories' statistics."""
+    touched = _deferred.get()
+    if touched is not None:
+        touched.update(product.category_id for product in products)
+        return
+    by_category = {}
+    for product in products:
+        count, low, high, latest = by_category.get(product.category_id, (0, product.price, product.price, product.created_at))
+        by_category[product.category_id] = (
+            count + 1, min(low, product.price), max(high, product.price), max(latest, product.created_at),
+        )
+    now = timezone.now()
+    for category_id, (count, low, high, latest) in by_category.items():
+        Category.objects.filter(pk=category_id).update(
+            product_count=F('product_count') + count,
+            min_price=Least(Coalesce('min_price', Value(low)), Value(low)),
+            max_price=Greatest(Coalesce('max_price', Value(high)), Value(high)),
+            latest_product_at=Greatest(Coalesce('latest_product_at', Value(latest)), Value(latest)),
+            updated_at=now,
+        )
+    if by_category:
+        bump_generation(Category)
+
+
+def remove_product(category_id, price, created_at):
+    """Count a product that was deleted, or moved out of its old values, out of its category."""
+    touched = _deferred.get()
+    if touched is not None:
+        touched.add(category_id)
+        return
+    Category.objects.filter(pk=category_id).update(
+        product_count=Greatest(F('product_count') - 1, Value(0)),
+        min_price=Case(When(min_price__gte=price, then=_aggregate(Min, 'price')), default=F('min_price')),
+        max_price=Case(When(max_price__lte=price, then=_aggregate(Max, 'price')), default=F('max_price')),
+        latest_product_at=Case(
+            When(latest_product_at__lte=created_at, then=_aggregate(Max, 'created_at')),
+            default=F('latest_product_at'),
+        ),
+        updated_at=timezone.now(),
+    )
+    bump_generation(Category)
+
+
+def refresh(category_ids=None):
+    """Recompute the statistics of ``category_ids``, or of every category, from their products."""
+    queryset = Category.objects.all() if category_ids is None else Category.objects.filter(pk__in=category_ids)
+    updated = queryset.update(
+        product_count=Coalesce(_aggregate(Count, 'pk'), Value(0)),
+        min_price=_aggregate(Min, 'price'),
+        max_price=_aggregate(Max, 'price'),
+        latest_product_at=_aggregate(Max, 'created_at'),
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_generation(Category)
+    return updated
+
+
+def drifted():
+    """Categories whose stored statistics differ from their products, with both versions."""
+    actual = {
+        row['category']: row
+        for row in Products.objects.order_by().values('category').annotate(
+            product_count=Count('pk'), min_price=Min('price'), max_price=Max('price'),
+            latest_product_at=Max('created_at'),
+        )
+    }
+    empty = dict.fromkeys(STATS_FIELDS, None) | {'product_count': 0}
+    results = []
+    for category in Category.objects.order_by('pk').values('pk', 'name', *STATS_FIELDS):
+        expected = {field: actual.get(category['pk'], empty)[field] for field in STATS_FIELDS}
+        stored = {field: category[field] for field in STATS_FIELDS}
+        if stored != expected:
+            results.append({'id': category['pk'], 'name': category['name'], 'stored': stored, 'actual': expected})
+    return results
+
+
+def reconcile(dry_run=False):
+    """Repair drifted categories; returns what drifted()."""
+    results = drifted()
+    if results and not dry_run:
+        refresh([result['id'] for result in results])
+    return results
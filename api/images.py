@@ -0,0 +1,104 @@
+"""
+Width-bounded WebP/JPEG derivatives of uploaded images.
+
+Derivatives are generated by the images.derivatives background job after an
+image is saved, stored next to the original through the field's storage,
+and recorded on the instance's ``image_derivatives`` JSON field:
+
+    {"image": {"source": "products/pipes/1_ab12cd34.png",
+               "variants": {"webp": {"320": "products/pipes/1_ab12cd34_w320.webp", ...},
+                            "jpeg": {...}}}}
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import models
+
+# Pillow is imported where images are processed, in the jobs, rather than
+# when signals.py loads this module at startup.
+
+# (extension, Pillow format, quality)
+FORMATS = (
+    ('webp', 'WEBP', 80),
+    ('jpeg', 'JPEG', 82),
+)
+
+
+def derivative_name(name, width, extension):
+    base, _ = os.path.splitext(name)
+    return f'{base}_w{width}.{extension}'
+
+
+def derivative_names(field_file):
+    """Names of every stored derivative of ``field_file``."""
+    entry = field_file.instance.image_derivatives.get(field_file.field.name, {})
+    return [
+        name
+        for by_width in entry.get('variants', {}).values()
+        for name in by_width.values()
+    ]
+
+
+def _target_widths(original_width):
+    # Never upscale; an image narrower than every target gets one variant
+    # at its own width so there is always something smaller to serve.
+    widths = [width for width in sorted(settings.IMAGE_DERIVATIVE_WIDTHS) if width < original_width]
+    return widths or [original_width]
+
+
+def _encode(image, pillow_format, quality):
+    from PIL import Image
+
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    buffer = io.BytesIO()
+    # No exif= argument, so camera metadata and GPS tags are not copied.
+    image.save(buffer, pillow_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_derivatives(field_file):
+    """Create and store the derivatives of ``field_file``; returns its JSON entry."""
+    from PIL import Image, ImageOps
+
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        # Apply the EXIF orientation before the metadata is dropped.
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+
+    variants = {extension: {} for extension, _, _ in FORMATS}
+    for width in _target_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for extension, pillow_format, quality in FORMATS:
+            name = field_file.storage.save(
+                derivative_name(field_file.name, width, extension),
+                ContentFile(_encode(resized, pillow_format, quality)),
+            )
+            variants[extension][str(width)] = name
+    return {'source': field_file.name, 'variants': variants}
+
+
+def image_fields(instance):
+    return [field.name for field in instance._meta.fields if isinstance(field, models.ImageField)]
+
+
+def needs_derivatives(instance):
+    """True if an image field has changed since its derivatives were made."""
+    for field_name in image_fields(instance):
+        field_file = getattr(instance, field_name)
+        recorded = instance.image_derivatives.get(field_name, {}).get('source')
+        if (field_file.name or None) != recorded:
+            return True
+    return False
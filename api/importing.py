@@ -0,0 +1,267 @@
+"""
+Bulk product imports from a CSV or NDJSON manifest.
+
+Each row has ``name``, ``description``, ``price``, ``category`` (the
+category's name) and up to four images, ``image`` to ``image4``, given as a
+path under CATALOG_IMPORT_MEDIA_ROOT or an http(s) URL. URLs are only
+fetched from CATALOG_IMPORT_URL_HOSTS, from public addresses and without
+following redirects.
+
+The manifest is read a row at a time and imported in batches. A batch costs
+one query for category names not seen earlier in the import and is
+validated with BulkProductSerializer. Its images are then loaded and
+uploaded through a bounded thread pool, since every upload is a round trip
+to Cloudinary, and the products are inserted with them by bulk_create().
+No transaction is open while the images are transferred.
+
+A batch's products and the import's progress commit together, so an
+interrupted import resumes after the last committed batch instead of
+starting over. Files uploaded by a batch that was rolled back stay in
+storage. Invalid rows are skipped and listed in ``errors``, as are images
+that could not be loaded; their product is created without them.
+"""
+import csv
+import io
+import ipaddress
+import json
+import os
+import socket
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import category_stats
+from .cache import bump_generation
+from .models import CatalogImport, Category, Job, Products
+from .serializers import BulkProductSerializer
+
+IMAGE_FIELDS = ('image', 'image2', 'image3', 'image4')
+PRODUCT_FIELDS = ('name', 'description', 'price')
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+MAX_ERRORS = 1000
+# An import marked running but not updated for this long was interrupted
+# without being marked failed (a killed process) and may be resumed.
+STALE_AFTER = timedelta(minutes=10)
+
+
+class ImageSourceError(Exception):
+    pass
+
+
+class ImportInProgress(Exception):
+    pass
+
+
+def format_for(filename):
+    """Manifest format from a file name, or None."""
+    return FORMATS.get(os.path.splitext(filename)[1].lower())
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def read_manifest(path, format):
+    """Yield (row number, row), where row is None if it is not a JSON object."""
+    with open(path, newline='', encoding='utf-8-sig') as manifest:
+        if format == 'csv':
+            yield from enumerate(csv.DictReader(manifest), start=1)
+            return
+        number = 0
+        for line in manifest:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+
+class NoRedirects(urllib.request.HTTPRedirectHandler):
+    """Answer redirects with an HTTPError; the target could be any host."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_opener = urllib.request.build_opener(NoRedirects)
+
+
+def check_image_url(url):
+    """Raise ImageSourceError unless ``url`` is on an allowed host that resolves to public addresses only."""
+    host = (url.hostname or '').lower()
+    if host not in {allowed.lower() for allowed in settings.CATALOG_IMPORT_URL_HOSTS}:
+        raise ImageSourceError(f'Host is not allowed: {host}')
+    port = url.port or (443 if url.scheme == 'https' else 80)
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror as exc:
+        raise ImageSourceError(f'Host cannot be resolved: {exc}')
+    for address in addresses:
+        # Loopback, private, link-local (cloud metadata) and reserved ranges.
+        if not ipaddress.ip_address(address.partition('%')[0]).is_global:
+            raise ImageSourceError(f'Host resolves to a non-public address: {address}')
+
+
+def read_image(source):
+    """The file name and bytes of a manifest image."""
+    from PIL import Image
+
+    limit = settings.CATALOG_IMPORT_MAX_IMAGE_SIZE
+    url = urlparse(source)
+    if url.scheme in ('http', 'https'):
+        check_image_url(url)
+        with _opener.open(source, timeout=30) as response:
+            content = response.read(limit + 1)
+        name = os.path.basename(url.path)
+    else:
+        root = os.path.realpath(settings.CATALOG_IMPORT_MEDIA_ROOT)
+        path = os.path.realpath(os.path.join(root, source))
+        if os.path.commonpath([root, path]) != root:
+            raise ImageSourceError('Path is outside the import media directory')
+        with open(path, 'rb') as image:
+            content = image.read(limit + 1)
+        name = os.path.basename(path)
+    if len(content) > limit:
+        raise ImageSourceError('Image is too large')
+    try:
+        Image.open(io.BytesIO(content)).verify()
+    except Exception:
+        raise ImageSourceError('Not a valid image')
+    return name or 'image', content
+
+
+def store_image(product, field_name, source):
+    """
+    Upload one image for a product that is not saved yet; returns the stored
+    name. Runs in the pool. As for products created through the API, the
+    name is generated before the product has an id.
+    """
+    name, content = read_image(source)
+    field = product._meta.get_field(field_name)
+    return field.storage.save(field.generate_filename(product, name), ContentFile(content), max_length=field.max_length)
+
+
+class CatalogImporter:
+    """Runs, or resumes, one CatalogImport."""
+
+    def __init__(self, catalog_import, batch_size=None, workers=None, progress=None):
+        self.catalog_import = catalog_import
+        self.batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+        self.workers = workers or settings.CATALOG_IMPORT_UPLOAD_WORKERS
+        self.progress = progress
+        self.serializer = BulkProductSerializer(context={'preloaded': {'category': {}}})
+        # name -> Category, or None for names that do not exist.
+        self.categories = {}
+
+    def claim(self):
+        now = timezone.now()
+        claimed = CatalogImport.objects.filter(pk=self.catalog_import.pk).exclude(
+            status=CatalogImport.STATUS_RUNNING, updated_at__gt=now - STALE_AFTER,
+        ).update(status=CatalogImport.STATUS_RUNNING, updated_at=now)
+        if not claimed:
+            raise ImportInProgress(f'Import {self.catalog_import.pk} is already running')
+        self.catalog_import.status = CatalogImport.STATUS_RUNNING
+
+    def run(self):
+        catalog_import = self.catalog_import
+        self.claim()
+        rows = islice(read_manifest(catalog_import.path, catalog_import.format), catalog_import.rows_done, None)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='catalog-import') as pool:
+                while batch := list(islice(rows, self.batch_size)):
+                    self.import_batch(batch, pool)
+                    # bulk_create() and bulk_update() do not send post_save.
+                    bump_generation(Products)
+                    if self.progress:
+                        self.progress(catalog_import)
+        except BaseException:
+            # Also on KeyboardInterrupt, so the import can be resumed right away.
+            catalog_import.status = CatalogImport.STATUS_FAILED
+            catalog_import.save(update_fields=['status', 'updated_at'])
+            raise
+        catalog_import.status = CatalogImport.STATUS_DONE
+        catalog_import.save(update_fields=['status', 'updated_at'])
+        return catalog_import
+
+    def resolve_categories(self, rows):
+        """Look the batch's new category names up in one query."""
+        missing = {_text(row.get('category')) for _, row in rows} - self.categories.keys() - {''}
+        if missing:
+            # Category names are not unique; the oldest category wins.
+            for category in Category.objects.filter(name__in=missing).order_by('-pk'):
+                self.categories[category.name] = category
+            for name in missing:
+                self.categories.setdefault(name, None)
+        self.serializer.context['preloaded']['category'] = {
+            category.pk: category for category in self.categories.values() if category is not None
+        }
+
+    def validate(self, row):
+        """Return (validated data, None) or (None, errors) for one row."""
+        item = {field: row[field] for field in PRODUCT_FIELDS if _text(row.get(field))}
+        name = _text(row.get('category'))
+        category = self.categories.get(name)
+        if category is not None:
+            item['category'] = category.pk
+        try:
+            data, errors = self.serializer.run_validation(item), {}
+        except ValidationError as exc:
+            data, errors = None, dict(exc.detail)
+        if name and category is None:
+            errors['category'] = [f'Unknown category: {name}']
+        return (None, errors) if errors else (data, None)
+
+    def import_batch(self, batch, pool):
+        catalog_import = self.catalog_import
+        valid = [(number, row) for number, row in batch if row is not None]
+        errors = [
+            {'row': number, 'errors': {'non_field_errors': ['Row is not a JSON object']}}
+            for number, row in batch if row is None
+        ]
+        self.resolve_categories(valid)
+
+        products, sources = [], []
+        for number, row in valid:
+            data, row_errors = self.validate(row)
+            if row_errors:
+                errors.append({'row': number, 'errors': row_errors})
+                continue
+            product = Products(author_id=catalog_import.author_id, **data)
+            products.append(product)
+            sources += [(number, product, field, _text(row.get(field))) for field in IMAGE_FIELDS if _text(row.get(field))]
+
+        uploads = [
+            (number, product, field, pool.submit(store_image, product, field, source))
+            for number, product, field, source in sources
+        ]
+        for number, product, field, upload in uploads:
+            try:
+                setattr(product, field, upload.result())
+            except (OSError, ValueError, ImageSourceError) as exc:
+                errors.append({'row': number, 'errors': {field: [f'Could not load image: {exc}']}})
+
+        with transaction.atomic():
+            Products.objects.bulk_create(products)
+            category_stats.add_products(products)
+            Job.objects.bulk_create([
+                Job(name='images.derivatives', payload={'model': Products._meta.label, 'pk': product.pk})
+                for product in products if any(getattr(product, field) for field in IMAGE_FIELDS)
+            ])
+
+            catalog_import.rows_done += len(batch)
+            catalog_import.created += len(products)
+            catalog_import.failed += len(batch) - len(products)
+            errors.sort(key=lambda error: error['row'])
+            catalog_import.errors = (catalog_import.errors + errors)[:MAX_ERRORS]
+            catalog_import.save()
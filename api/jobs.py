@@ -0,0 +1,217 @@
+"""
+A small database-backed job queue for side effects that should not run
+inside the request, such as deleting media from Cloudinary.
+
+Jobs are rows in the same database as the data, so enqueueing inside a
+transaction commits or rolls back together with the write that caused it.
+`manage.py run_jobs` runs them, retrying failures with exponential backoff;
+jobs that exhaust their attempts move to DeadLetterJob.
+"""
+import logging
+import os
+import random
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import bump_generation
+from .images import derivative_names, generate_derivatives, image_fields
+from .importing import CatalogImporter
+from .media import get_media_client
+from .models import CatalogImport, DeadLetterJob, Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+# Handlers that do not use the database, which run_pending() may run in threads.
+CONCURRENT = set()
+
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+LOCK_TIMEOUT = timedelta(minutes=10)
+NOT_RUN = object()
+
+
+def job(name, concurrent=False):
+    """
+    Register a function as the handler for jobs called ``name``. Pass
+    ``concurrent=True`` for handlers that only call external services, such
+    as media deletion, so a batch of them can wait on the network together.
+    """
+    def register(func):
+        HANDLERS[name] = func
+        if concurrent:
+            CONCURRENT.add(name)
+        return func
+    return register
+
+
+def enqueue(name, payload=None, max_attempts=5):
+    """Queue job ``name``; ``payload`` is passed to its handler as keyword arguments."""
+    if name not in HANDLERS:
+        raise ValueError(f'Unknown job: {name}')
+    return Job.objects.create(name=name, payload=payload or {}, max_attempts=max_attempts)
+
+
+def enqueue_media_deletion(field_file, resource_type='image'):
+    """Queue deletion of an uploaded file and of any derivatives made from it."""
+    if not field_file:
+        return
+    names = [field_file.name]
+    if hasattr(field_file.instance, 'image_derivatives'):
+        names += derivative_names(field_file)
+    for name in names:
+        enqueue('media.destroy', {'name': name, 'resource_type': resource_type})
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``, with jitter."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(limit):
+    """
+    Mark up to ``limit`` due jobs as running and return them. Jobs left
+    running by a crashed worker are picked up again after LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    due = (
+        Q(status=Job.STATUS_PENDING, run_at__lte=now)
+        | Q(status=Job.STATUS_RUNNING, locked_at__lt=now - LOCK_TIMEOUT)
+    )
+    with transaction.atomic():
+        queryset = Job.objects.filter(due).order_by('run_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        jobs = list(queryset[:limit])
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.STATUS_RUNNING, locked_at=now, updated_at=now,
+        )
+    return jobs
+
+
+def execute(job):
+    """Call the job's handler; returns the traceback if it raised, else None."""
+    try:
+        HANDLERS[job.name](**job.payload)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+
+def run(job, error=NOT_RUN):
+    """
+    Run one claimed job, or with ``error`` given, record the outcome of an
+    execute() that already ran. Returns True if it succeeded.
+    """
+    job.attempts += 1
+    if error is NOT_RUN:
+        error = execute(job)
+    if error is not None:
+        job.last_error = error
+        if job.attempts >= job.max_attempts:
+            logger.error('Job %s failed permanently:\n%s', job, job.last_error)
+            with transaction.atomic():
+                DeadLetterJob.objects.create(
+                    name=job.name,
+                    payload=job.payload,
+                    attempts=job.attempts,
+                    last_error=job.last_error,
+                    created_at=job.created_at,
+                )
+                job.delete()
+        else:
+            logger.warning('Job %s failed (attempt %s), retrying', job, job.attempts)
+            job.status = Job.STATUS_PENDING
+            job.locked_at = None
+            job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+            job.save()
+        return False
+    job.delete()
+    return True
+
+
+def run_pending(limit=100, concurrency=1):
+    """
+    Run the jobs that are currently due. With ``concurrency`` above one,
+    handlers registered as concurrent run in that many threads, then their
+    outcomes are recorded here. Returns (succeeded, failed).
+    """
+    claimed = claim(limit)
+    outcomes = {}
+    parallel = [job for job in claimed if job.name in CONCURRENT]
+    if concurrency > 1 and len(parallel) > 1:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='jobs') as pool:
+            outcomes = dict(zip((job.pk for job in parallel), pool.map(execute, parallel)))
+
+    succeeded = failed = 0
+    for job in claimed:
+        if run(job, outcomes.get(job.pk, NOT_RUN)):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def requeue_dead(ids=None):
+    """Move dead-lettered jobs back onto the queue with a fresh attempt budget."""
+    queryset = DeadLetterJob.objects.all()
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    requeued = 0
+    with transaction.atomic():
+        for dead in queryset:
+            Job.objects.create(name=dead.name, payload=dead.payload)
+            dead.delete()
+            requeued += 1
+    return requeued
+
+
+# Handlers
+
+@job('media.destroy', concurrent=True)
+def destroy_media(name, resource_type='image'):
+    get_media_client().destroy(name, resource_type=resource_type)
+
+
+@job('images.derivatives')
+def build_image_derivatives(model, pk):
+    """Bring ``image_derivatives`` up to date with the instance's image fields."""
+    model = apps.get_model(model)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    derivatives = dict(instance.image_derivatives)
+    client = get_media_client()
+    for field_name in image_fields(instance):
+        field_file = getattr(instance, field_name)
+        entry = derivatives.get(field_name)
+        if entry and entry.get('source') == (field_file.name or None):
+            continue
+        if entry:
+            for by_width in entry.get('variants', {}).values():
+                for name in by_width.values():
+                    client.destroy(name)
+        if field_file:
+            derivatives[field_name] = generate_derivatives(field_file)
+        else:
+            derivatives.pop(field_name, None)
+    # update() rather than save(): no post_save, so no new job is queued.
+    model.objects.filter(pk=pk).update(image_derivatives=derivatives, updated_at=timezone.now())
+    bump_generation(model)
+
+
+@job('catalog.import')
+def import_catalog(pk):
+    """Run an uploaded catalog import, resuming it after an earlier failed attempt."""
+    catalog_import = CatalogImport.objects.filter(pk=pk).first()
+    if catalog_import is None or catalog_import.status == CatalogImport.STATUS_DONE:
+        return
+    CatalogImporter(catalog_import).run()
+    os.remove(catalog_import.path)
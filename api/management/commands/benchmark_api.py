@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import compare, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every route in core/urls.py and api/urls.py against seeded '
+        'data (see seed_catalog) and write p50/p95/p99 latency, throughput, '
+        'query counts and allocations per endpoint as JSON. In-process by '
+        'default, with all writes rolled back; --base-url runs GET routes '
+        'against a live server instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--base-url', help='e.g. http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=1, help='Parallel requests with --base-url.')
+        parser.add_argument('--only', nargs='+', metavar='URL_NAME', help='Only benchmark these URL names.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--compare', metavar='REPORT', help='Print p50 changes against an earlier report.')
+
+    def handle(self, *args, **options):
+        try:
+            report = run_benchmark(
+                iterations=options['iterations'],
+                warmup=max(options['warmup'], 1),
+                base_url=options['base_url'],
+                concurrency=options['concurrency'],
+                only=options['only'],
+                log=self.stderr.write,
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if options['compare']:
+            with open(options['compare']) as previous:
+                rows = compare(json.load(previous), report)
+            self.stderr.write(f"{'endpoint':<28} {'method':<6} {'p50 before':>10} {'p50 after':>10} {'change':>8}  queries")
+            for name, method, old, new, change, old_queries, new_queries in rows:
+                self.stderr.write(
+                    f'{name:<28} {method:<6} {old:>10.2f} {new:>10.2f} {change:>+7.1f}%  {old_queries} -> {new_queries}'
+                )
@@ -0,0 +1,89 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import HTTPRunner, build_context
+from api.models import News
+
+# name: command line after the interpreter, given the port and process count.
+SERVERS = {
+    'wsgi': lambda port, workers: [
+        '-m', 'gunicorn', 'api.benchmark_servers:wsgi_application',
+        '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ],
+    'asgi': lambda port, workers: [
+        '-m', 'uvicorn', 'api.benchmark_servers:asgi_application',
+        '--workers', str(workers), '--port', str(port), '--log-level', 'warning',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput under concurrent requests of the WSGI deployment '
+        '(gunicorn sync workers) and of ASGI (uvicorn, core/asgi.py), for the '
+        'DRF views and their async versions. Both servers run --workers '
+        'processes against the current database, which must be seeded (see '
+        'seed_catalog). Response caching is off so every request reaches '
+        'the database; --query-latency-ms adds a delay to each query.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--requests', type=int, default=200, help='Requests per measurement.')
+        parser.add_argument('--query-latency-ms', type=float, default=0)
+        parser.add_argument('--port', type=int, default=8701)
+
+    def handle(self, *args, **options):
+        try:
+            context = build_context()
+        except ValueError as exc:
+            raise CommandError(exc)
+        news = context['pks'][News]
+        paths = ['/api/products/', '/api/products/async/', f'/api/news/{news}/', f'/api/news/async/{news}/']
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        env = {
+            **os.environ,
+            'RESPONSE_CACHE_TIMEOUT': '0',
+            'BENCHMARK_QUERY_LATENCY_MS': str(options['query_latency_ms']),
+        }
+
+        self.stdout.write(f"{'server':<6} {'path':<24} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}  status")
+        for name, command in SERVERS.items():
+            with self.serve(command(options['port'], options['workers']), options['port'], env):
+                for path in paths:
+                    for concurrency in options['concurrency']:
+                        runner = HTTPRunner(context, f"http://127.0.0.1:{options['port']}", concurrency)
+                        runner.headers['Host'] = host
+                        result = runner.measure({'path': path}, options['requests'], warmup=concurrency)
+                        self.stdout.write(
+                            f"{name:<6} {path:<24} {concurrency:>7} {result['throughput_rps']:>8} "
+                            f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}  {result['status']}"
+                        )
+
+    @contextmanager
+    def serve(self, args, port, env):
+        process = subprocess.Popen([sys.executable, *args], env=env, cwd=settings.BASE_DIR)
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                if process.poll() is not None:
+                    raise CommandError(f'Server exited with status {process.returncode}: {" ".join(args)}')
+                try:
+                    socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise CommandError(f'Server did not start: {" ".join(args)}')
+                    time.sleep(0.2)
+            yield
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
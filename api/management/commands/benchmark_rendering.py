@@ -0,0 +1,73 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.mixins import shape_queryset
+from api.models import Products
+from api.rendering import FastJSONRenderer, FastRepresentation, orjson
+from api.seeding import seed_catalog
+from api.serializers import ProductSerializer
+
+DERIVATIVES = {'image': {'variants': {'webp': {'320': 'products/seed/a_w320.webp', '640': 'products/seed/a_w640.webp'}}}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rendering product lists through ProductSerializer and '
+        'JSONRenderer with the FastListMixin path (values(), compiled '
+        'converters, FastJSONRenderer), and check that both produce the same '
+        'bytes. Seeded rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        request = Request(APIRequestFactory().get('/api/products/', HTTP_HOST=host))
+        context = {'request': request}
+        self.stdout.write(f"orjson: {'yes' if orjson else 'no'}")
+        self.stdout.write(f"{'rows':>8} {'serializer':>11} {'fast path':>10} {'speedup':>8}  identical  (ms, median)")
+
+        with transaction.atomic():
+            for rows in sorted(options['rows']):
+                missing = rows - Products.objects.count()
+                if missing > 0:
+                    seed_catalog(products=missing, users=10, categories=10, news=0, testimonials=0, sliders=0, contacts=0)
+                    # Every tenth product has an image with derivatives.
+                    pks = Products.objects.order_by('pk').values_list('pk', flat=True)[::10]
+                    Products.objects.filter(pk__in=pks).update(image='products/seed/a.png', image_derivatives=DERIVATIVES)
+                queryset = Products.objects.order_by('-created_at', '-id')
+
+                def regular():
+                    serializer = ProductSerializer(many=True, context=context)
+                    items = shape_queryset(queryset, serializer.child)[:rows]
+                    return JSONRenderer().render(ProductSerializer(items, many=True, context=context).data)
+
+                def fast():
+                    representation = FastRepresentation.for_serializer(ProductSerializer(context=context))
+                    items = queryset.values(*representation.lookups)[:rows]
+                    return FastJSONRenderer().render(representation.many(items))
+
+                slow_times, slow_body = self._time(regular, options['repeat'])
+                fast_times, fast_body = self._time(fast, options['repeat'])
+                self.stdout.write(
+                    f'{rows:>8} {slow_times:>11.1f} {fast_times:>10.1f} {slow_times / fast_times:>7.1f}x  '
+                    f'{slow_body == fast_body}'
+                )
+            transaction.set_rollback(True)
+
+    def _time(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = render()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), body
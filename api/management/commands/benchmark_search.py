@@ -0,0 +1,75 @@
+import random
+import statistics
+import string
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Category, Products
+from api.search import search_products
+
+
+class Command(BaseCommand):
+    help = (
+        'Time product search against synthetic catalogs of increasing size and '
+        'compare it with the old name__icontains scan. Rows are inserted inside '
+        'a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--vocabulary', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        words = [
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+            for _ in range(options['vocabulary'])
+        ]
+        self.stdout.write(
+            f"{'products':>10} {'search p50':>11} {'search p95':>11} {'icontains p50':>14}  (ms)"
+        )
+        with transaction.atomic():
+            author = User.objects.create(username=f'search-bench-{rng.getrandbits(32)}')
+            categories = Category.objects.bulk_create(
+                [Category(name=f'Bench {word}') for word in words[:8]]
+            )
+            inserted = 0
+            for size in sorted(options['sizes']):
+                Products.objects.bulk_create(
+                    [self._product(rng, words, categories, author) for _ in range(size - inserted)],
+                    batch_size=1000,
+                )
+                inserted = size
+                queries = [' '.join(rng.sample(words, 2)) for _ in range(options['queries'])]
+                search = self._time(lambda q: search_products(Products.objects.all(), q)
+                                    .order_by('-search_rank', '-id'), queries)
+                scan = self._time(lambda q: Products.objects.filter(name__icontains=q.split()[0])
+                                  .order_by('-created_at'), queries)
+                self.stdout.write(
+                    f'{size:>10} {statistics.median(search):>11.2f} '
+                    f'{statistics.quantiles(search, n=20)[-1]:>11.2f} '
+                    f'{statistics.median(scan):>14.2f}'
+                )
+            transaction.set_rollback(True)
+
+    def _product(self, rng, words, categories, author):
+        return Products(
+            name=' '.join(rng.choices(words, k=3)),
+            description=' '.join(rng.choices(words, k=30)),
+            category=rng.choice(categories),
+            price=round(rng.uniform(1, 500), 2),
+            author=author,
+        )
+
+    def _time(self, build, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            list(build(query)[:20])
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import bump_generation
+from api.query_plans import LARGE_MODELS, analyze, check_query_plans, seed
+from api.models import Category
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed large tables, EXPLAIN every query the list endpoints run and fail '
+        'if any of them reads a large table in full. Rows are inserted inside '
+        'a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every failing query.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            context = seed(options['rows'])
+            analyze()
+            problems = check_query_plans(context)
+            transaction.set_rollback(True)
+        bump_generation(*LARGE_MODELS, Category)
+
+        for problem in problems:
+            self.stdout.write(f"{problem['url']}: full scan of {problem['table']}")
+            self.stdout.write(f"    {problem['sql']}")
+            if options['verbose_plans']:
+                for line in problem['plan']:
+                    self.stdout.write(f'    | {line}')
+        if problems:
+            raise CommandError(f'{len(problems)} queries read a large table in full')
+        self.stdout.write(self.style.SUCCESS('No full table scans'))
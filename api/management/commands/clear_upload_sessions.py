@@ -0,0 +1,25 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Delete resumable uploads that have not received data recently, with their partial files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Idle time after which an upload is abandoned.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for session in stale:
+            if os.path.exists(session.temp_path):
+                os.remove(session.temp_path)
+            session.delete()
+            count += 1
+        self.stdout.write(f'Deleted {count} abandoned uploads')
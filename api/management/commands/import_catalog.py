@@ -0,0 +1,62 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importing import CatalogImporter, ImportInProgress, format_for
+from api.models import CatalogImport
+
+
+class Command(BaseCommand):
+    help = (
+        'Import products from a CSV or NDJSON manifest (see api/importing.py). '
+        'Rows are inserted in batches while images upload through a thread '
+        'pool. Running the command again on the same manifest resumes an '
+        'unfinished import after its last completed batch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('manifest')
+        parser.add_argument('--author', required=True, help='Username the products are created for.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Taken from the file extension by default.')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--workers', type=int, help='Concurrent image uploads.')
+        parser.add_argument('--restart', action='store_true', help='Start over instead of resuming.')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['manifest'])
+        if not os.path.isfile(path):
+            raise CommandError(f'No such file: {path}')
+        manifest_format = options['format'] or format_for(path)
+        if manifest_format is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format')
+        author = User.objects.filter(username=options['author']).first()
+        if author is None:
+            raise CommandError(f"No such user: {options['author']}")
+
+        catalog_import = None
+        if not options['restart']:
+            catalog_import = (
+                CatalogImport.objects.filter(path=path, author=author)
+                .exclude(status=CatalogImport.STATUS_DONE).order_by('-created_at').first()
+            )
+        if catalog_import is None:
+            catalog_import = CatalogImport.objects.create(author=author, path=path, format=manifest_format)
+        else:
+            self.stderr.write(f'Resuming import {catalog_import.pk} after row {catalog_import.rows_done}')
+
+        importer = CatalogImporter(
+            catalog_import, batch_size=options['batch_size'], workers=options['workers'], progress=self.report,
+        )
+        try:
+            importer.run()
+        except ImportInProgress as exc:
+            raise CommandError(str(exc))
+        self.report(catalog_import)
+        for error in catalog_import.errors:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+
+    def report(self, catalog_import):
+        self.stderr.write(
+            f'{catalog_import.rows_done} rows, {catalog_import.created} created, {catalog_import.failed} skipped'
+        )
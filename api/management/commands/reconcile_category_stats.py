@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.category_stats import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the product statistics stored on each category with its '
+        'products (one GROUP BY over the table) and recompute those that '
+        'drifted. See api/category_stats.py.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it.')
+
+    def handle(self, *args, **options):
+        results = reconcile(dry_run=options['dry_run'])
+        for result in results:
+            changes = ', '.join(
+                f'{field} {stored} -> {result["actual"][field]}'
+                for field, stored in result['stored'].items() if stored != result['actual'][field]
+            )
+            self.stdout.write(f"{result['id']} {result['name']}: {changes}")
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(f'{len(results)} drifted categories {action}')
@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api import views  # noqa: F401  registers the cached views
+from api.cache import cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Print response cache hit/miss counters per view as JSON. Counters live in '
+        'the configured cache, so reading them from another process needs a shared '
+        'backend (file or Redis).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing.')
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        for counters in stats.values():
+            total = counters['hits'] + counters['misses']
+            counters['hit_ratio'] = round(counters['hits'] / total, 3) if total else None
+        self.stdout.write(json.dumps(stats, indent=2))
+        if options['reset']:
+            reset_cache_stats()
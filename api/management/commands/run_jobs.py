@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import requeue_dead, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (media deletion and other side effects).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run until no jobs are due, then exit.')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads for media deletions and other network-only jobs.')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--requeue-dead', action='store_true', help='Move dead-lettered jobs back onto the queue first.')
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            self.stdout.write(f'Requeued {requeue_dead()} dead jobs')
+        while True:
+            succeeded, failed = run_pending(options['batch_size'], options['concurrency'])
+            if succeeded or failed:
+                self.stdout.write(f'{succeeded} succeeded, {failed} failed')
+            if not succeeded and not failed:
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
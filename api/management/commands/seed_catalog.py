@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.seeding import PASSWORD, SCALES, USER_PREFIX, clear_catalog, seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Insert deterministic synthetic data for benchmarks: users, categories, '
+        'products, news, testimonials, sliders and contacts. Seeded users are '
+        f'named {USER_PREFIX}NNNNNN and share the password "{PASSWORD}".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded rows first.')
+        for name in ('users', 'categories', 'products', 'news', 'testimonials', 'sliders', 'contacts'):
+            parser.add_argument(f'--{name}', type=int, help=f'Override the number of {name} for the scale.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['clear']:
+            deleted = clear_catalog(options['batch_size'])
+            self.stdout.write(f'Deleted {deleted} seeded rows')
+
+        overrides = {
+            name: options[name]
+            for name in ('users', 'categories', 'products', 'news', 'testimonials', 'sliders', 'contacts')
+        }
+        with transaction.atomic():
+            seed_catalog(
+                scale=options['scale'], seed=options['seed'], batch_size=options['batch_size'],
+                log=self.stdout.write, **overrides,
+            )
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s'))
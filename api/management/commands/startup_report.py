@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.startup import FIRST_RESPONSE_BUDGET_MS, measure_startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure a cold start of core/wsgi.py (see api/startup.py): a fresh '
+        'interpreter imports the WSGI application and serves one GET. Prints '
+        'the time to the first response and the slowest imports, measured '
+        'with python -X importtime.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/products/', help='Path of the first request.')
+        parser.add_argument('--top', type=int, default=15, help='Packages and modules to list.')
+        parser.add_argument('--runs', type=int, default=3, help='The fastest run is reported.')
+        parser.add_argument(
+            '--budget-ms', type=float, default=FIRST_RESPONSE_BUDGET_MS, help='Fail if the first response takes longer.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = min(
+                (measure_startup(options['path']) for _ in range(options['runs'])),
+                key=lambda result: result['first_response_ms'],
+            )
+        except RuntimeError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(f"GET {options['path']}: {result['status']}, {result['bytes']} bytes")
+        self.stdout.write(f"import core.wsgi   {result['import_ms']:>8.1f} ms")
+        self.stdout.write(f"first response     {result['first_response_ms']:>8.1f} ms")
+        for title, rows in (('package', result['packages']), ('module', result['modules'])):
+            self.stdout.write(f"\n{title:<48} {'self ms':>8}")
+            for name, ms in rows[:options['top']]:
+                self.stdout.write(f'{name:<48} {ms:>8.1f}')
+        if result['eager']:
+            self.stderr.write(f"\nImported at startup, expected to load lazily: {', '.join(result['eager'])}")
+
+        budget = options['budget_ms']
+        if result['first_response_ms'] > budget:
+            raise CommandError(f"First response took {result['first_response_ms']:.1f} ms, over the {budget:g} ms budget")
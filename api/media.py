@@ -0,0 +1,47 @@
+import os
+from functools import cache
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+
+@cache
+def configure_cloudinary():
+    """
+    Import and configure the Cloudinary SDK on first use. It is not imported
+    at startup: it costs more to import than the rest of the project's
+    dependencies, and most processes never call it.
+    """
+    import cloudinary
+
+    credentials = settings.CLOUDINARY_STORAGE
+    cloudinary.config(
+        cloud_name=credentials['CLOUD_NAME'],
+        api_key=credentials['API_KEY'],
+        api_secret=credentials['API_SECRET'],
+        secure=True,
+    )
+
+
+class CloudinaryMediaClient:
+    """Deletes uploads from Cloudinary."""
+
+    def destroy(self, name, resource_type='image'):
+        configure_cloudinary()
+        import cloudinary.uploader
+
+        # Extract public_id from the stored file name
+        public_id = os.path.splitext(os.path.basename(name))[0]
+        return cloudinary.uploader.destroy(public_id, resource_type=resource_type)
+
+
+class StorageMediaClient:
+    """Deletes uploads from the default storage. Used locally and in tests."""
+
+    def destroy(self, name, resource_type='image'):
+        default_storage.delete(name)
+
+
+def get_media_client():
+    return import_string(settings.MEDIA_CLIENT)()
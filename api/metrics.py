@@ -0,0 +1,381 @@
+"""
+Request metrics in the Prometheus text format, aggregated across worker
+processes.
+
+Every process writes its samples to its own memory-mapped file in
+METRICS_DIR, so recording takes no cross-process lock: a request is a couple of dozen
+float additions into the mapping, at slots looked up once per (route,
+method, status), under a lock private to the process (only contended
+between threads of the same worker). `GET /metrics` maps
+every file in the directory and sums matching series.
+
+File layout (little endian):
+
+    header   slot count (uint32), bytes used in the key area (uint32)
+    values   CAPACITY float64 slots, one per series
+    keys     the series names in slot order, each a uint16 length + UTF-8
+
+Series names are final exposition lines without the value, such as
+``api_requests_total{route="product_list",method="GET",status="200"}``.
+Histogram buckets are stored cumulatively, so a scrape only has to add
+the files together. Response sizes are a summary (sum and count) to keep
+the series count, and with it the scrape time, down. Files of exited workers are kept, so counters never
+go backwards; clear METRICS_DIR when deploying. A process that cannot
+write its file logs a warning and stops recording rather than failing
+requests.
+"""
+import bisect
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import ExitStack
+from itertools import compress
+from operator import add, itemgetter, ne
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views import View
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('<II')
+KEY_LENGTH = struct.Struct('<H')
+CAPACITY = 16384
+VALUES_OFFSET = 4096
+KEYS_OFFSET = VALUES_OFFSET + CAPACITY * 8
+FILE_SIZE = KEYS_OFFSET + (1 << 20)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name: (type, help). Output is grouped in this order.
+FAMILIES = {
+    'api_requests_total': ('counter', 'Requests by URL name, method and status code.'),
+    'api_request_duration_seconds': ('histogram', 'Time from the first middleware to the response.'),
+    'api_request_queries': ('histogram', 'Database queries per request.'),
+    'api_response_size_bytes': ('summary', 'Response body size.'),
+}
+
+
+class MetricsFile:
+    """The current process's metrics file, opened for writing."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        with open(path, 'a+b') as handle:
+            if os.fstat(handle.fileno()).st_size < FILE_SIZE:
+                handle.truncate(FILE_SIZE)
+            self.mmap = mmap.mmap(handle.fileno(), FILE_SIZE)
+        self.values = memoryview(self.mmap)[VALUES_OFFSET:KEYS_OFFSET].cast('d')
+        keys, self.keys_end = read_keys(self.mmap, 0, HEADER.unpack_from(self.mmap, 0)[0])
+        self.slots = {key: index for index, key in enumerate(keys)}
+        self.requests = {}
+
+    def slot(self, key):
+        slot = self.slots.get(key)
+        if slot is not None:
+            return slot
+        encoded = key.encode()
+        slot = len(self.slots)
+        end = self.keys_end + KEY_LENGTH.size + len(encoded)
+        if slot >= CAPACITY or end > FILE_SIZE:
+            return None
+        KEY_LENGTH.pack_into(self.mmap, self.keys_end, len(encoded))
+        self.mmap[self.keys_end + KEY_LENGTH.size:end] = encoded
+        # Publish the key only after it is fully written.
+        HEADER.pack_into(self.mmap, 0, slot + 1, end - KEYS_OFFSET)
+        self.keys_end = end
+        self.slots[key] = slot
+        return slot
+
+    def request_slots(self, route, method, status):
+        """Slots of every series a request with these labels updates, or None when the file is full."""
+        labels = f'route="{route}"'
+        keys = [f'api_requests_total{{{labels},method="{method}",status="{status}"}}']
+        for name, buckets in (('api_request_duration_seconds', DURATION_BUCKETS), ('api_request_queries', QUERY_BUCKETS)):
+            keys += [f'{name}_bucket{{{labels},le="{bound}"}}' for bound in buckets]
+            keys += [f'{name}_bucket{{{labels},le="+Inf"}}', f'{name}_sum{{{labels}}}', f'{name}_count{{{labels}}}']
+        keys += [f'api_response_size_bytes_sum{{{labels}}}', f'api_response_size_bytes_count{{{labels}}}']
+        slots = [self.slot(key) for key in keys]
+        return None if None in slots else slots
+
+    def record(self, route, method, status, duration, queries, size):
+        with self.lock:
+            key = (route, method, status)
+            if key not in self.requests:
+                self.requests[key] = self.request_slots(route, method, status)
+            slots = self.requests[key]
+            if slots is None:
+                return
+            values = self.values
+            values[slots[0]] += 1
+            offset = 1
+            for buckets, value in ((DURATION_BUCKETS, duration), (QUERY_BUCKETS, queries)):
+                # Cumulative buckets: every bucket whose bound is >= value, then +Inf.
+                end = offset + len(buckets) + 1
+                for slot in slots[offset + bisect.bisect_left(buckets, value):end]:
+                    values[slot] += 1
+                values[slots[end]] += value
+                values[slots[end + 1]] += 1
+                offset = end + 2
+            if size is not None:
+                values[slots[offset]] += size
+                values[slots[offset + 1]] += 1
+
+
+def read_keys(buffer, start, count, offset=KEYS_OFFSET):
+    """Decode keys ``start`` to ``count`` from the key area, starting at ``offset``."""
+    keys = []
+    for _ in range(start, count):
+        (length,) = KEY_LENGTH.unpack_from(buffer, offset)
+        offset += KEY_LENGTH.size
+        keys.append(bytes(buffer[offset:offset + length]).decode())
+        offset += length
+    return keys, offset
+
+
+_writer = None
+_writer_key = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """
+    Open this process's file, reopening after a fork (gunicorn --preload).
+    Returns None, once per process and directory, when the file cannot be
+    created.
+    """
+    global _writer, _writer_key
+    key = (os.getpid(), settings.METRICS_DIR)
+    if _writer_key != key:
+        with _writer_lock:
+            if _writer_key != key:
+                try:
+                    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                    _writer = MetricsFile(os.path.join(settings.METRICS_DIR, f'metrics-{key[0]}.db'))
+                except OSError:
+                    logger.warning('Cannot write metrics to %s; recording is off', settings.METRICS_DIR, exc_info=True)
+                    _writer = None
+                _writer_key = key
+    return _writer
+
+
+def record_request(route, method, status, duration, queries, size):
+    writer = get_writer()
+    if writer is not None:
+        writer.record(route, method, status, duration, queries, size)
+
+
+def family_of(key):
+    """Metric family of a series key: the name without _bucket/_sum/_count."""
+    name = key.split('{', 1)[0]
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+class MetricsReader:
+    """
+    Sums the files in a directory. Mappings, decoded keys and the output
+    layout are kept between scrapes; a scrape only decodes series added
+    since the last one. Summing and formatting run through itemgetter()
+    and map() rather than Python loops, which keeps a scrape of a few
+    thousand series across several workers under a millisecond.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}
+        self.keys = []
+        self.index = {}
+        self.version = 0
+        self.order = []
+        self.prefixes = []
+        self.lines = []
+        self.previous = []
+
+    def key_index(self, key):
+        index = self.index.get(key)
+        if index is None:
+            index = self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.version += 1
+        return index
+
+    def open(self, path, inode):
+        with open(path, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size < FILE_SIZE:
+                return None
+            buffer = mmap.mmap(handle.fileno(), FILE_SIZE, access=mmap.ACCESS_READ)
+        return {'mmap': buffer, 'inode': inode, 'count': 0, 'offset': KEYS_OFFSET, 'indexes': [], 'built': None}
+
+    def refresh(self):
+        """Pick up new files and new series; returns the current files."""
+        current = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.db'):
+                continue
+            state = self.files.get(entry.path)
+            if state is None or state['inode'] != entry.inode():
+                state = self.open(entry.path, entry.inode())
+                if state is None:
+                    continue
+                self.files[entry.path] = state
+            count = HEADER.unpack_from(state['mmap'], 0)[0]
+            if count > state['count']:
+                keys, state['offset'] = read_keys(state['mmap'], state['count'], count, state['offset'])
+                state['indexes'].extend(self.key_index(key) for key in keys)
+                state['count'] = count
+            current.append(state)
+        if len(self.order) != len(self.keys):
+            self.layout()
+        return current
+
+    def layout(self):
+        """Order series by family and put HELP/TYPE lines before each family."""
+        rank = {name: position for position, name in enumerate(FAMILIES)}
+        families = [family_of(key) for key in self.keys]
+        self.order = sorted(range(len(self.keys)), key=lambda index: (rank.get(families[index], len(rank)), index))
+        self.prefixes = []
+        previous = None
+        for index in self.order:
+            prefix = f'{self.keys[index]} '
+            family = families[index]
+            if family != previous and family in FAMILIES:
+                kind, help_text = FAMILIES[family]
+                prefix = f'# HELP {family} {help_text}\n# TYPE {family} {kind}\n{prefix}'
+            previous = family
+            self.prefixes.append(prefix)
+        self.lines = [None] * len(self.order)
+        self.previous = [None] * len(self.order)
+
+    def getter(self, state):
+        """itemgetter from a file's slots to output order; missing series read a trailing 0.0."""
+        if state['built'] != (self.version, state['count']):
+            slots = {index: slot for slot, index in enumerate(state['indexes'])}
+            positions = [slots.get(index, state['count']) for index in self.order]
+            if len(positions) == 1:
+                state['getter'] = lambda values, position=positions[0]: (values[position],)
+            else:
+                state['getter'] = itemgetter(*positions)
+            state['built'] = (self.version, state['count'])
+        return state['getter']
+
+    def render(self):
+        if not os.path.isdir(self.directory):
+            return ''
+        files = self.refresh()
+        if not self.order:
+            return ''
+        totals = [0.0] * len(self.order)
+        for state in files:
+            values = memoryview(state['mmap'])[VALUES_OFFSET:VALUES_OFFSET + state['count'] * 8].cast('d').tolist()
+            values.append(0.0)
+            totals = list(map(add, totals, self.getter(state)(values)))
+        # Most series do not change between scrapes; only reformat those that did.
+        lines, prefixes = self.lines, self.prefixes
+        for position in compress(range(len(totals)), map(ne, totals, self.previous)):
+            lines[position] = prefixes[position] + repr(totals[position])
+        self.previous = totals
+        return '\n'.join(lines) + '\n'
+
+
+_reader = None
+
+
+def get_reader():
+    global _reader
+    if _reader is None or _reader.directory != settings.METRICS_DIR:
+        _reader = MetricsReader(settings.METRICS_DIR)
+    return _reader
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def watch(self, stack):
+        """Count queries on the current thread's connections until ``stack`` closes."""
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+
+
+class MetricsMiddleware:
+    """
+    Record every request under its URL name (``product_list``,
+    ``contact_create``). Requests that match no route are grouped as
+    ``unmatched`` so random paths cannot create new series.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        if not settings.METRICS_TOKEN and not settings.DEBUG:
+            raise ImproperlyConfigured('METRICS_ENABLED requires METRICS_TOKEN outside DEBUG')
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            counter.watch(stack)
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, counter.queries)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            # The async ORM runs queries in the request's thread-sensitive
+            # thread, on that thread's connections.
+            await sync_to_async(counter.watch)(stack)
+            response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, counter.queries)
+        return response
+
+    def record(self, request, response, duration, queries):
+        match = request.resolver_match
+        route = (match.url_name or match.view_name) if match else 'unmatched'
+        size = None if response.streaming else len(response.content)
+        record_request(route, request.method, response.status_code, duration, queries, size)
+
+
+class MetricsView(View):
+    """
+    Prometheus scrape endpoint, 404 unless METRICS_ENABLED. Scrapers must
+    send ``Authorization: Bearer <METRICS_TOKEN>``; without a token it is
+    only open in DEBUG.
+    """
+
+    def get(self, request):
+        if not settings.METRICS_ENABLED:
+            return HttpResponse('Not Found\n', status=404, content_type='text/plain')
+        if not self.authorized(request):
+            return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+        return HttpResponse(get_reader().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    def authorized(self, request):
+        token = settings.METRICS_TOKEN
+        if not token:
+            return settings.DEBUG
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
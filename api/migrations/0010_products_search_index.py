@@ -0,0 +1,82 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE api_products ADD COLUMN search_vector tsvector",
+    """
+    CREATE OR REPLACE FUNCTION api_products_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(
+                (SELECT name FROM api_category WHERE id = NEW.category_id), '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER api_products_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON api_products
+    FOR EACH ROW EXECUTE FUNCTION api_products_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION api_category_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE api_products SET category_id = category_id WHERE category_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER api_category_search_vector_trigger
+    AFTER UPDATE OF name ON api_category
+    FOR EACH ROW EXECUTE FUNCTION api_category_search_vector_update()
+    """,
+    "UPDATE api_products SET search_vector = NULL",
+    "CREATE INDEX api_products_search_vector_idx ON api_products USING GIN (search_vector)",
+    "CREATE INDEX api_products_name_trgm_idx ON api_products USING GIN (name gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS api_products_name_trgm_idx",
+    "DROP INDEX IF EXISTS api_products_search_vector_idx",
+    "DROP TRIGGER IF EXISTS api_category_search_vector_trigger ON api_category",
+    "DROP FUNCTION IF EXISTS api_category_search_vector_update()",
+    "DROP TRIGGER IF EXISTS api_products_search_vector_trigger ON api_products",
+    "DROP FUNCTION IF EXISTS api_products_search_vector_update()",
+    "ALTER TABLE api_products DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text search index for products on PostgreSQL: a trigger-maintained
+    tsvector column with a GIN index, plus a trigram index for fuzzy name
+    matches.
+
+    The SQLite FTS5 index is created by api.search.ensure_sqlite_index on
+    post_migrate instead, because SQLite rebuilds tables during later
+    migrations and drops their triggers.
+    """
+
+    dependencies = [
+        ('api', '0009_alter_testimonial_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run(POSTGRES_FORWARD),
+            _run(POSTGRES_BACKWARD),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_upload_session'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['-created_at', '-id'], name='api_contact_created'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['updated_at'], name='api_contact_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='api_contact_category_created'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['-created_at', '-id'], name='api_contact_unread_created'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(condition=models.Q(('is_responded', False)), fields=['-created_at', '-id'], name='api_contact_unresp_created'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['-created_at', '-id'], name='api_news_created'),
+        ),
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['updated_at'], name='api_news_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['-created_at', '-id'], name='api_prod_created'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['updated_at'], name='api_prod_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='api_prod_category_created'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='api_prod_author_created'),
+        ),
+        migrations.AddIndex(
+            model_name='slider',
+            index=models.Index(fields=['-created_at', '-id'], name='api_slider_created'),
+        ),
+        migrations.AddIndex(
+            model_name='slider',
+            index=models.Index(fields=['updated_at'], name='api_slider_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='slider',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-created_at', '-id'], name='api_slider_active_created'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(fields=['-created_at', '-id'], name='api_testimonial_created'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(fields=['updated_at'], name='api_testimonial_updated'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.5 on 2026-10-18 08:55
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def compute_stats(apps, schema_editor):
+    Category = apps.get_model('api', 'Category')
+    Products = apps.get_model('api', 'Products')
+
+    def aggregate(function, field):
+        return Subquery(
+            Products.objects.filter(category=OuterRef('pk')).order_by()
+            .values('category').annotate(value=function(field)).values('value')
+        )
+
+    Category.objects.update(
+        product_count=Coalesce(aggregate(Count, 'pk'), Value(0)),
+        min_price=aggregate(Min, 'price'),
+        max_price=aggregate(Max, 'price'),
+        latest_product_at=aggregate(Max, 'created_at'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_catalog_import'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='latest_product_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='max_price',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='min_price',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compute_stats, migrations.RunPython.noop),
+    ]
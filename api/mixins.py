@@ -0,0 +1,168 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer
+
+from .cache import get_generations, last_changed, last_deleted
+
+
+def _resolve_source(model, attrs):
+    """
+    Map a serializer ``source_attrs`` path onto the model.
+    Returns (related paths, column lookups), or None when the path is not a
+    plain chain of forward relations ending in a concrete field.
+    """
+    related, columns = [], []
+    for index, attr in enumerate(attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        lookup = '__'.join(attrs[:index + 1])
+        columns.append(lookup)
+        if index < len(attrs) - 1:
+            if not (field.many_to_one or field.one_to_one):
+                return None
+            related.append(lookup)
+            model = field.related_model
+    return related, columns
+
+
+def shape_queryset(queryset, serializer, extra_fields=()):
+    """
+    Add select_related() and only() to ``queryset`` based on the fields the
+    serializer will read. Dotted sources such as ``category.name`` become a
+    join instead of one query per row, and unused columns are not fetched.
+
+    The queryset is returned unchanged if any readable field cannot be
+    traced to a column (method fields, properties, nested serializers).
+    """
+    model = queryset.model
+    related = set()
+    columns = {model._meta.pk.name}
+    columns.update(
+        name for name in (field.lstrip('-') for field in extra_fields)
+        if _resolve_source(model, [name]) is not None
+    )
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, BaseSerializer) or field.source == '*':
+            return queryset
+        if field.source in queryset.query.annotations:
+            continue
+        resolved = _resolve_source(model, field.source_attrs)
+        if resolved is None:
+            return queryset
+        related.update(resolved[0])
+        columns.update(resolved[1])
+
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(columns))
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=id,name,price`` returns only the listed fields and
+    ``?omit=description`` leaves fields out, on GET requests. The serializer
+    is trimmed in get_serializer(), so SerializerQuerysetMixin and
+    FastListMixin, which read its fields, stop fetching the dropped columns
+    and joins too. Unknown names are a 400.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request.method in SAFE_METHODS:
+            self.trim_fields(getattr(serializer, 'child', serializer))
+        return serializer
+
+    def requested(self, param, available):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: [f'Unknown field: {name}' for name in unknown]})
+        return set(names)
+
+    def trim_fields(self, serializer):
+        fields = serializer.fields
+        keep = self.requested(self.fields_query_param, fields)
+        omit = self.requested(self.omit_query_param, fields) or set()
+        for name in list(fields):
+            if (keep is not None and name not in keep) or name in omit:
+                fields.pop(name)
+
+
+class SerializerQuerysetMixin:
+    """
+    Shape the view's queryset from its serializer's declared fields.
+    Hooks filter_queryset() so views that override get_queryset() are
+    covered too. Only meant for read-only views: updates should load the
+    whole row.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        ordering = getattr(self, 'pagination_ordering', None)
+        if ordering is None:
+            ordering = getattr(self.paginator, 'ordering', ())
+        return shape_queryset(queryset, self.get_serializer(), ordering)
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since with 304 Not Modified.
+
+    The validator is MAX(updated_at) over the rows the view would return,
+    which an index on updated_at answers without reading the table, plus
+    the cache generation (api/cache.py) of the view's model and of every
+    model in ``cache_models``, the models its serializer reads, as for
+    CachedResponseMixin. Signals bump the generation on every save and
+    delete, so the ETag also changes when a row is deleted, leaves a
+    filtered list or has a related row (such as its category) renamed.
+    Last-Modified covers deletions with a per-model last-deletion timestamp
+    and related models with the time their generation was last bumped.
+    """
+    validator_field = 'updated_at'
+    cache_models = ()
+
+    def get_validators(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        related = [model for model in self.cache_models if model is not queryset.model]
+        latest = queryset.order_by().aggregate(modified=Max(self.validator_field))['modified']
+        generations = get_generations([queryset.model, *related])
+        modified = max([last_deleted(queryset.model), *map(last_changed, related)])
+        if latest is not None:
+            modified = max(modified, latest.timestamp())
+        digest = hashlib.md5(
+            f"{self.request.get_full_path()}|{self.request.META.get('HTTP_ACCEPT', '')}|"
+            f"{latest}|{'-'.join(map(str, generations))}".encode()
+        ).hexdigest()
+        return quote_etag(digest), int(modified)
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return response
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
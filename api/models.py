@@ -1,11 +1,10 @@
 import os
 from uuid import uuid4
 from django.utils.text import slugify
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import User
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+from django.utils import timezone
 
 
 def upload_path(instance, filename):
@@ -54,6 +53,14 @@ def testimonial_file_path(instance, filename):
 
 class Category(models.Model):
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Statistics of the category's products, maintained on every product
+    # write (api/category_stats.py).
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    min_price = models.FloatField(null=True, editable=False)
+    max_price = models.FloatField(null=True, editable=False)
+    latest_product_at = models.DateTimeField(null=True, editable=False)
+
     def __str__(self):
         return self.name
 
@@ -66,33 +73,145 @@ class Products(models.Model):
     image2 = models.ImageField(upload_to=upload_path, null=True, blank=True)
     image3 = models.ImageField(upload_to=upload_path, null=True, blank=True)
     image4 = models.ImageField(upload_to=upload_path, null=True, blank=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     author = models.ForeignKey(User,on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Lists are paginated on (-created_at, -id) (api/pagination.py) and
+        # validated with MAX(updated_at) (api/mixins.py).
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_prod_created'),
+            models.Index(fields=['updated_at'], name='api_prod_updated'),
+            models.Index(fields=['category', '-created_at', '-id'], name='api_prod_category_created'),
+            models.Index(fields=['author', '-created_at', '-id'], name='api_prod_author_created'),
+        ]
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.set_counted_as()
+        return instance
+
+    def set_counted_as(self):
+        """
+        Record the category, price and creation time the category statistics
+        hold for this row, to update them when it changes. None when one of
+        those fields was not loaded.
+        """
+        if self.get_deferred_fields() & {'category_id', 'price', 'created_at'}:
+            self.counted_as = None
+        else:
+            self.counted_as = (self.category_id, self.price, self.created_at)
+
+    def save(self, *args, **kwargs):
+        # The post_save handler updates the category statistics; they
+        # commit or roll back with the row.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
 class Slider(models.Model):
     name = models.CharField(max_length=255, null=False, blank=False,default='Slider')
     video = models.FileField(upload_to=slider_file_path,null=False, blank=False)
     caption = models.CharField(max_length=255)
     author = models.ForeignKey(User,on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_slider_created'),
+            models.Index(fields=['updated_at'], name='api_slider_updated'),
+            models.Index(
+                fields=['-created_at', '-id'], name='api_slider_active_created',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
     def __str__(self):
         return self.caption
     
+class UploadSession(models.Model):
+    """A resumable, chunked upload of a slider video (see SliderUpload* views)."""
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.id}.part')
+
+    def __str__(self):
+        return self.filename
+    
+class CatalogImport(models.Model):
+    """A product import from a CSV or NDJSON manifest (see api/importing.py)."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    FORMAT_CHOICES = [('csv', 'CSV'), ('ndjson', 'NDJSON')]
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    path = models.CharField(max_length=1024)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # Manifest rows processed so far; an interrupted import resumes here.
+    rows_done = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    # The first MAX_ERRORS problems (api/importing.py), as {"row": n, "errors": {...}}.
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return os.path.basename(self.path)
+
 class Contact(models.Model):
     firstName = models.CharField(max_length=255)
     lastName = models.CharField(max_length=255)
     email = models.EmailField()
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     category = models.CharField(max_length=255)
     is_read = models.BooleanField(default=False)
     is_responded = models.BooleanField(default=False)
 
+    class Meta:
+        # The unread/unresponded indexes only hold the few rows still waiting
+        # for attention, so they stay small as the inbox grows.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_contact_created'),
+            models.Index(fields=['updated_at'], name='api_contact_updated'),
+            models.Index(fields=['category', '-created_at', '-id'], name='api_contact_category_created'),
+            models.Index(
+                fields=['-created_at', '-id'], name='api_contact_unread_created',
+                condition=models.Q(is_read=False),
+            ),
+            models.Index(
+                fields=['-created_at', '-id'], name='api_contact_unresp_created',
+                condition=models.Q(is_responded=False),
+            ),
+        ]
+
     def __str__(self):
         return self.firstName
     
@@ -100,9 +219,17 @@ class News(models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
     image = models.ImageField(upload_to=news_file_path, null=True, blank=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     author = models.ForeignKey(User,on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_news_created'),
+            models.Index(fields=['updated_at'], name='api_news_updated'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -111,9 +238,56 @@ class Testimonial(models.Model):
     name = models.CharField(max_length=255)
     content = models.TextField()
     image = models.ImageField(upload_to=testimonial_file_path, null=True, blank=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     author = models.ForeignKey(User,on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='api_testimonial_created'),
+            models.Index(fields=['updated_at'], name='api_testimonial_updated'),
+        ]
+
     def __str__(self):
         return self.name
 
+
+class Job(models.Model):
+    """A queued side effect, run by `manage.py run_jobs` (see api/jobs.py)."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+    ]
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'], name='api_job_status_run_at')]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class DeadLetterJob(models.Model):
+    """A job that failed max_attempts times; kept for inspection or requeueing."""
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,187 @@
+"""
+Opt-in per-request profiling (PROFILING_ENABLED).
+
+ProfilingMiddleware records, for every request:
+
+- db: query count and time, through a connection execute_wrapper
+- auth: DRF authentication (APIView.perform_authentication)
+- serialize: building serializer output (BaseSerializer.data, or the
+  FastListMixin path)
+- render: JSON rendering
+- external: storage uploads and media provider calls
+
+and reports them in a Server-Timing header and one JSON log line on the
+``api.profiling`` logger. A PROFILING_SAMPLE_RATE fraction of requests runs
+under cProfile; samples slower than PROFILING_SLOW_MS are written to
+PROFILING_DUMP_DIR for `python -m pstats` or snakeviz.
+
+Library calls are timed by wrapping the methods in PROFILED_CALLS once, when
+the middleware is loaded. Outside a profiled request the wrappers only
+check a context variable.
+"""
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# (class, attribute, timing name). Properties are wrapped through their getter.
+PROFILED_CALLS = [
+    ('rest_framework.views.APIView', 'perform_authentication', 'auth'),
+    ('rest_framework.serializers.BaseSerializer', 'data', 'serialize'),
+    ('api.rendering.FastRepresentation', 'many', 'serialize'),
+    ('rest_framework.renderers.JSONRenderer', 'render', 'render'),
+    ('api.rendering.FastJSONRenderer', 'render', 'render'),
+    ('django.core.files.storage.Storage', 'save', 'external'),
+    ('api.media.CloudinaryMediaClient', 'destroy', 'external'),
+]
+
+_current = ContextVar('api_request_profile', default=None)
+_installed = False
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.timings = {}
+        self.active = set()
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add('db', time.perf_counter() - started)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        entries = [f'db;dur={self.timings.get("db", 0.0) * 1000:.1f};desc="{self.queries} queries"']
+        for name, seconds in self.timings.items():
+            if name != 'db':
+                entries.append(f'{name};dur={seconds * 1000:.1f}')
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the time spent in the block to the current request's ``name`` timing.
+    Nested blocks with the same name are only counted once.
+    """
+    profile = _current.get()
+    if profile is None or name in profile.active:
+        yield
+        return
+    profile.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.active.discard(name)
+        profile.add(name, time.perf_counter() - started)
+
+
+def _timed_function(function, name):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with timed(name):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+def install():
+    """Wrap the methods listed in PROFILED_CALLS. Safe to call more than once."""
+    global _installed
+    if _installed:
+        return
+    for class_path, attribute, name in PROFILED_CALLS:
+        cls = import_string(class_path)
+        original = cls.__dict__[attribute]
+        if isinstance(original, property):
+            wrapped = property(_timed_function(original.fget, name), original.fset, original.fdel, original.__doc__)
+        else:
+            wrapped = _timed_function(original, name)
+        setattr(cls, attribute, wrapped)
+    _installed = True
+
+
+class ProfilingMiddleware:
+    """Put first in MIDDLEWARE so the total covers the other middleware."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = settings.PROFILING_SLOW_MS / 1000
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.dump_dir = settings.PROFILING_DUMP_DIR
+        install()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        profiler = self.start_profiler()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            _current.reset(token)
+
+        total = profile.elapsed()
+        response['Server-Timing'] = profile.server_timing(total)
+        slow = total >= self.slow_seconds
+        dump = self.dump_profile(profiler, request, total) if profiler is not None and slow else None
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'queries': profile.queries,
+            **{f'{name}_ms': round(seconds * 1000, 1) for name, seconds in profile.timings.items()},
+            **({'profile': dump} if dump else {}),
+        }))
+        return response
+
+    def start_profiler(self):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread.
+            return None
+        return profiler
+
+    def dump_profile(self, profiler, request, total):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        slug = re.sub(r'[^\w]+', '-', request.path).strip('-') or 'root'
+        path = os.path.join(
+            self.dump_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{request.method}-{slug}-{round(total * 1000)}ms.prof',
+        )
+        profiler.dump_stats(path)
+        return path
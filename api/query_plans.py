@@ -0,0 +1,133 @@
+import re
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import Contact, News, Products, Slider, Testimonial
+from .seeding import CONTACT_CATEGORIES, USER_PREFIX, seed_catalog
+
+# Tables that grow without bound; a full scan of any of them is a failure.
+LARGE_MODELS = (Products, Contact, News, Slider, Testimonial)
+
+# Endpoints and the filters they are called with. Placeholders are filled
+# from the seeded rows. The second page of each list is checked too.
+CHECKED_URLS = [
+    '/api/home/',
+    '/api/products/',
+    '/api/products/category/{category}/',
+    '/api/products/my/',
+    '/api/products/{product}/',
+    '/api/sliders/',
+    '/api/news/',
+    '/api/testimonials/',
+    '/api/contacts/',
+    '/api/contacts/category/{contact_category}/',
+    '/api/contacts/summary/',
+]
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def seed(rows):
+    """
+    Seed ``rows`` products and contacts, and a tenth as many news,
+    testimonials and sliders, with api.seeding. Returns the values used to
+    fill CHECKED_URLS. Call this inside a transaction that is rolled back.
+    """
+    small = max(rows // 10, 1)
+    seed_catalog(products=rows, contacts=rows, news=small, testimonials=small, sliders=small)
+    author = User.objects.filter(username__startswith=USER_PREFIX, products__isnull=False).order_by('pk').first()
+    return {
+        'author': author,
+        'category': author.products_set.values_list('category_id', flat=True).first(),
+        'product': author.products_set.values_list('pk', flat=True).first(),
+        'contact_category': CONTACT_CATEGORIES[1],
+    }
+
+
+def analyze(using='default'):
+    """Refresh planner statistics so plans reflect the seeded data."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def explain(sql, using='default'):
+    """Return the query plan of ``sql`` as a list of lines."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}')
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan, tables, vendor):
+    """Large tables read in full according to ``plan``."""
+    pattern = SQLITE_FULL_SCAN if vendor == 'sqlite' else POSTGRES_FULL_SCAN
+    scanned = []
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match and match.group(1) in tables:
+            scanned.append(match.group(1))
+    return scanned
+
+
+def check_url(url, user=None, using='default'):
+    """
+    Call the view behind ``url``, EXPLAIN every SELECT it ran and return
+    one entry per query that reads a large table in full, along with the
+    response.
+    """
+    connection = connections[using]
+    tables = {model._meta.db_table for model in LARGE_MODELS}
+    # Pagination links are absolute, so the request needs an allowed host.
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+    request = APIRequestFactory().get(url, HTTP_HOST=host)
+    if user is not None:
+        force_authenticate(request, user)
+    match = resolve(url.split('?')[0])
+    with CaptureQueriesContext(connection) as queries:
+        response = match.func(request, *match.args, **match.kwargs)
+        response.render()
+    if response.status_code != 200:
+        raise AssertionError(f'{url} returned {response.status_code}')
+
+    problems = []
+    for query in queries.captured_queries:
+        if not query['sql'].lstrip().upper().startswith('SELECT'):
+            continue
+        plan = explain(query['sql'], using)
+        for table in full_scans(plan, tables, connection.vendor):
+            problems.append({'url': url, 'table': table, 'sql': query['sql'], 'plan': plan})
+    return problems, response
+
+
+def check_query_plans(context, urls=CHECKED_URLS, using='default'):
+    """
+    Run check_url() over ``urls`` filled in from seed()'s ``context``.
+
+    The cache is swapped for a dummy one meanwhile: seed() runs in a
+    transaction that never commits, so it doesn't bump cache generations,
+    and a cached response or count would hide the queries behind it.
+    """
+    with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+        return _check_urls(context, urls, using)
+
+
+def _check_urls(context, urls, using):
+    problems = []
+    for url in urls:
+        found, response = check_url(url.format(**context), context['author'], using)
+        problems.extend(found)
+        next_link = isinstance(response.data, dict) and response.data.get('next')
+        if next_link:
+            found, _ = check_url(urlsplit(next_link)._replace(scheme='', netloc='').geturl(), context['author'], using)
+            problems.extend(found)
+    return problems
@@ -0,0 +1,216 @@
+"""
+Fast path for large read-only lists.
+
+FastListMixin fetches a page with values() for exactly the serializer's
+fields and builds each item with converters compiled once per request from
+the serializer's own fields, instead of instantiating models and calling
+to_representation() field by field. FastJSONRenderer renders with orjson
+when it is installed. Both produce the same bytes as the serializer and
+JSONRenderer; serializers with a field the fast path does not know fall
+back to the regular path.
+"""
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Field types whose to_representation() returns a database value unchanged.
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField, serializers.CharField, serializers.EmailField, serializers.BooleanField,
+)
+
+
+def _model_field(model, attrs):
+    """
+    Resolve a serializer source path to (values() lookup, model field), or
+    None unless it is a chain of non-null forward relations ending in a
+    concrete field. A null relation would make DRF skip the field.
+    """
+    for index, attr in enumerate(attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        if index < len(attrs) - 1:
+            if not (field.many_to_one or field.one_to_one) or field.null:
+                return None
+            model = field.related_model
+    return '__'.join(attrs), field
+
+
+def _file_url(field, storage):
+    request = field.context.get('request')
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda name: name or None
+    if request is None:
+        return lambda name: storage.url(name) if name else None
+    build = request.build_absolute_uri
+    return lambda name: build(storage.url(name)) if name else None
+
+
+def _datetime(field):
+    """
+    DateTimeField.to_representation() looks the current time zone up for
+    every value; resolve it once for ISO 8601 output of aware values.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    zone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or zone is None:
+        return field.to_representation
+    slow = field.to_representation
+
+    def convert(value):
+        if not isinstance(value, datetime) or timezone.is_naive(value):
+            return slow(value)
+        value = value.astimezone(zone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _converter(field, model_field):
+    """
+    A function from the stored value to the serialized one, None for values
+    used as they are, or False when the field is not supported.
+    """
+    kind = type(field)
+    if kind in PASSTHROUGH_FIELDS:
+        return None
+    if kind is serializers.FloatField:
+        return float
+    if kind is serializers.PrimaryKeyRelatedField:
+        return None if field.pk_field is None else False
+    if kind is serializers.DateTimeField:
+        return _datetime(field)
+    if kind in (serializers.FileField, serializers.ImageField):
+        return _file_url(field, model_field.storage)
+    if isinstance(field, serializers.ReadOnlyField):
+        # to_representation() of ReadOnlyField (and subclasses such as
+        # SrcsetField) takes the stored value directly.
+        return None if kind is serializers.ReadOnlyField else field.to_representation
+    return False
+
+
+class FastRepresentation:
+    """Compiled form of a serializer instance; see for_serializer()."""
+
+    def __init__(self, fields):
+        # (output name, values() lookup, converter or None)
+        self.fields = fields
+        self.lookups = [lookup for _, lookup, _ in fields]
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """Compile ``serializer``, or return None if a field is not supported."""
+        model = serializer.Meta.model
+        fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, serializers.BaseSerializer):
+                return None
+            resolved = _model_field(model, field.source_attrs)
+            if resolved is None:
+                return None
+            lookup, model_field = resolved
+            convert = _converter(field, model_field)
+            if convert is False:
+                return None
+            fields.append((name, lookup, convert))
+        return cls(fields)
+
+    def many(self, rows):
+        """Serialize values() rows; None stays None, as in Serializer.to_representation()."""
+        fields = self.fields
+        return [
+            {
+                name: row[lookup] if convert is None else (None if (value := row[lookup]) is None else convert(value))
+                for name, lookup, convert in fields
+            }
+            for row in rows
+        ]
+
+
+def _floats_differ(data):
+    """
+    True if ``data`` holds a float that orjson writes differently from json:
+    those json writes with an exponent (orjson has ``1e16`` for ``1e+16``
+    and ``0.00001`` for ``1e-05``), NaN and the infinities.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if value and not 1e-4 <= abs(value) < 1e16:
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. The output is the
+    same as JSONRenderer's compact unicode output; indented responses,
+    other settings, floats orjson formats differently and values it cannot
+    encode use JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) or _floats_differ(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these two so the output is valid JavaScript.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastListMixin:
+    """
+    Opt-in fast path for list views whose serializer only reads model
+    columns. Place it before SerializerQuerysetMixin and ListAPIView.
+    """
+
+    def get_renderers(self):
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in super().get_renderers()
+        ]
+
+    def list(self, request, *args, **kwargs):
+        representation = FastRepresentation.for_serializer(self.get_serializer())
+        if representation is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = getattr(self, 'pagination_ordering', None)
+        if ordering is None:
+            ordering = getattr(self.paginator, 'ordering', ())
+        # The paginator reads its ordering fields from the rows for cursors.
+        lookups = dict.fromkeys([*representation.lookups, *(field.lstrip('-') for field in ordering)])
+        rows = queryset.values(*lookups)
+
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(representation.many(rows))
+        return self.get_paginated_response(representation.many(page))
@@ -0,0 +1,156 @@
+"""
+Primary/replica routing with read-your-writes stickiness.
+
+When DATABASES has a ``replica`` entry, ReplicaRoutingMiddleware lets the
+reads of GET, HEAD and OPTIONS requests go to it. Everything else reads
+and writes the primary: other methods, management commands and jobs, and
+a client that wrote in the last READ_YOUR_WRITES_SECONDS, so it sees its
+own change before the replica has it.
+
+A client that wrote is recognized by a cookie set on the write's response
+or, for API clients that do not keep cookies, by the user id claim of its
+access token, remembered in the cache. Either only ever sends reads to the
+primary, so neither needs to be tamper-proof.
+
+An unreachable replica is marked down for REPLICA_HEALTH_CHECK_INTERVAL
+seconds, during which reads use the primary.
+
+READ_YOUR_WRITES_SECONDS should exceed the replica's usual lag. It also
+bounds how long CachedResponseMixin keeps a response read from the
+replica, which could predate the write that bumped the cache generation.
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'api_primary_until'
+STICKY_KEY = 'api:primary-until:{}'
+
+# The alias reads go to. Set per request by ReplicaRoutingMiddleware.
+_read_alias = ContextVar('read_alias', default=DEFAULT_DB_ALIAS)
+_replica_health = {'checked_at': None, 'healthy': True}
+
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+
+def replica_healthy():
+    """Whether the replica accepts connections, checked at most every REPLICA_HEALTH_CHECK_INTERVAL seconds."""
+    now = time.monotonic()
+    checked_at = _replica_health['checked_at']
+    if checked_at is None or now - checked_at >= settings.REPLICA_HEALTH_CHECK_INTERVAL:
+        try:
+            connections[REPLICA].ensure_connection()
+            healthy = True
+        except DatabaseError:
+            logger.warning('Replica database is unreachable; reading from the primary', exc_info=True)
+            healthy = False
+        _replica_health.update(checked_at=now, healthy=healthy)
+    return _replica_health['healthy']
+
+
+def reading_from_replica():
+    """Whether reads in the current request go to the replica."""
+    return _read_alias.get() == REPLICA and replica_healthy()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reading_from_replica():
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Put early in MIDDLEWARE, before anything that queries the database."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.authentication = JWTAuthentication()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_alias.set(self.read_alias(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        self.stick_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _read_alias.set(self.read_alias(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        self.stick_after_write(request, response)
+        return response
+
+    def read_alias(self, request):
+        if request.method not in SAFE_METHODS:
+            return DEFAULT_DB_ALIAS
+        try:
+            if float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time():
+                return DEFAULT_DB_ALIAS
+        except ValueError:
+            pass
+        user_id = self.token_user_id(request)
+        if user_id is not None and cache.get(STICKY_KEY.format(user_id)):
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def token_user_id(self, request):
+        """The user id claim of a valid access token, without loading the user."""
+        header = self.authentication.get_header(request)
+        raw_token = self.authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        try:
+            return self.authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+        except (InvalidToken, TokenError):
+            return None
+
+    def stick_after_write(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        window = settings.READ_YOUR_WRITES_SECONDS
+        response.set_cookie(
+            STICKY_COOKIE, str(time.time() + window), max_age=window,
+            secure=request.is_secure(), httponly=True, samesite='Lax',
+        )
+        # DRF sets the authenticated user on the underlying request.
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            cache.set(STICKY_KEY.format(user.pk), True, window)
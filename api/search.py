@@ -0,0 +1,183 @@
+import re
+
+from django.db import connections
+from django.db.models import F, FloatField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from .models import Products
+
+# The database marks matches with these private-use characters rather than
+# HTML, since the description itself is not escaped; highlight_html()
+# escapes the snippet and only then turns them into <mark> tags.
+SNIPPET_START = '\ue000'
+SNIPPET_STOP = '\ue001'
+
+HEADLINE_OPTIONS = f'StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxWords=30, MinWords=10'
+
+FTS_TABLE = 'api_products_fts'
+
+# Column weights for bm25(): name, category, description.
+FTS_WEIGHTS = '10.0, 5.0, 1.0'
+
+SQLITE_INDEX = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, category, description, tokenize = 'porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS api_products_fts_insert AFTER INSERT ON api_products BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, name, category, description)
+        VALUES (NEW.id, NEW.name,
+                (SELECT name FROM api_category WHERE id = NEW.category_id),
+                NEW.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS api_products_fts_update AFTER UPDATE ON api_products BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;
+        INSERT INTO {FTS_TABLE} (rowid, name, category, description)
+        VALUES (NEW.id, NEW.name,
+                (SELECT name FROM api_category WHERE id = NEW.category_id),
+                NEW.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS api_products_fts_delete AFTER DELETE ON api_products BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS api_category_fts_update AFTER UPDATE OF name ON api_category BEGIN
+        UPDATE {FTS_TABLE} SET category = NEW.name
+        WHERE rowid IN (SELECT id FROM api_products WHERE category_id = NEW.id);
+    END
+    """,
+]
+
+SQLITE_REBUILD = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, category, description)
+    SELECT p.id, p.name, c.name, p.description
+    FROM api_products p LEFT JOIN api_category c ON c.id = p.category_id
+    """,
+]
+
+
+SQLITE_TRIGGERS = [
+    'api_products_fts_insert',
+    'api_products_fts_update',
+    'api_products_fts_delete',
+    'api_category_fts_update',
+]
+
+
+def drop_sqlite_triggers(using='default', **kwargs):
+    """
+    Drop the sync triggers before migrating. SQLite rebuilds a table to alter
+    it, and renaming the rebuilt table fails while a trigger on another table
+    still refers to it. Connected to pre_migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for trigger in SQLITE_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+
+def ensure_sqlite_index(using='default', **kwargs):
+    """
+    Create the FTS5 table and its sync triggers if any are missing, and
+    rebuild the index when they were, since rows written meanwhile were not
+    indexed. Connected to post_migrate, so the index is rebuilt after every
+    migrate run on SQLite.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        names = [FTS_TABLE] + SQLITE_TRIGGERS
+        cursor.execute(
+            f"SELECT count(*) FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(names))})",
+            names,
+        )
+        if cursor.fetchone()[0] == len(names):
+            return
+        for statement in SQLITE_INDEX + SQLITE_REBUILD:
+            cursor.execute(statement)
+
+
+def highlight_html(snippet):
+    """Escape ``search_snippet`` for HTML and wrap its matches in <mark>."""
+    return escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_STOP, '</mark>')
+
+
+def search_products(queryset, query):
+    """
+    Filter ``queryset`` to products matching ``query`` across name, category
+    and description. Adds ``search_rank`` (higher is better) and
+    ``search_snippet`` (description excerpt with matches between
+    SNIPPET_START and SNIPPET_STOP; see highlight_html()).
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _search_postgres(queryset, query)
+    if vendor == 'sqlite':
+        return _search_sqlite(queryset, query)
+    return _search_fallback(queryset, query)
+
+
+def _search_postgres(queryset, query):
+    table = Products._meta.db_table
+    tsquery = "websearch_to_tsquery('english', %s)"
+    # ts_rank_cd() and similarity() return real; cast so the rank survives
+    # the round trip through a pagination cursor unchanged.
+    rank = RawSQL(
+        f"GREATEST(ts_rank_cd({table}.search_vector, {tsquery}), similarity({table}.name, %s))::float8",
+        [query, query],
+        output_field=FloatField(),
+    )
+    snippet = RawSQL(
+        f"ts_headline('english', {table}.description, {tsquery}, %s)",
+        [query, HEADLINE_OPTIONS],
+        output_field=TextField(),
+    )
+    return queryset.annotate(search_rank=rank, search_snippet=snippet).extra(
+        where=[f"({table}.search_vector @@ {tsquery} OR {table}.name %% %s)"],
+        params=[query, query],
+    )
+
+
+def _fts_query(query):
+    """Quote each word and make it a prefix term, so user input can't inject FTS syntax."""
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _search_sqlite(queryset, query):
+    match = _fts_query(query)
+    if not match:
+        # Punctuation only: nothing can match, but callers still order by rank.
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField()), search_snippet=Value('', output_field=TextField()),
+        )
+    table = Products._meta.db_table
+    lookup = f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id"
+    # bm25() is lower-is-better, so negate it to match the PostgreSQL rank.
+    rank = RawSQL(f"SELECT -bm25({FTS_TABLE}, {FTS_WEIGHTS}) {lookup}", [match], output_field=FloatField())
+    snippet = RawSQL(
+        f"SELECT snippet({FTS_TABLE}, 2, %s, %s, '…', 16) {lookup}",
+        [SNIPPET_START, SNIPPET_STOP, match],
+        output_field=TextField(),
+    )
+    matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+    return queryset.filter(pk__in=matches).annotate(search_rank=rank, search_snippet=snippet)
+
+
+def _search_fallback(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query) | Q(description__icontains=query) | Q(category__name__icontains=query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()), search_snippet=F('description'))
@@ -0,0 +1,159 @@
+"""
+Deterministic synthetic data for benchmarks and query plan checks.
+
+The same seed always produces the same users, categories, products, news,
+testimonials, sliders and contacts, so runs against different commits
+measure the same workload. Rows are generated lazily and written with
+bulk_create() in batches, so seeding a million products does not hold a
+million objects in memory.
+"""
+import random
+import string
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from . import category_stats
+from .cache import bump_generation
+from .models import Category, Contact, News, Products, Slider, Testimonial
+
+USER_PREFIX = 'seed-user-'
+CATEGORY_PREFIX = 'Seed '
+CONTACT_DOMAIN = 'seed.example.com'
+PASSWORD = 'benchmark-password'
+
+CONTACT_CATEGORIES = ['sales', 'support', 'quote', 'distribution', 'careers', 'other']
+
+SCALES = {
+    '1k': {'products': 1_000, 'users': 10, 'categories': 20},
+    '100k': {'products': 100_000, 'users': 100, 'categories': 50},
+    '1m': {'products': 1_000_000, 'users': 1_000, 'categories': 100},
+}
+
+
+def scale_counts(scale='1k', **overrides):
+    """Row counts for a named scale; news, contacts etc. follow the product count."""
+    counts = dict(SCALES[scale])
+    products = overrides.get('products') or counts['products']
+    counts.update(
+        products=products,
+        news=max(products // 100, 10),
+        testimonials=max(products // 100, 10),
+        sliders=max(products // 10_000, 10),
+        contacts=max(products // 10, 10),
+    )
+    counts.update({key: value for key, value in overrides.items() if value is not None})
+    return counts
+
+
+def _batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class CatalogSeeder:
+    """
+    Insert synthetic rows. ``log`` is called with a progress line after each
+    model is written.
+    """
+
+    def __init__(self, seed=42, batch_size=2000, log=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.words = [
+            ''.join(self.rng.choices(string.ascii_lowercase, k=self.rng.randint(4, 9)))
+            for _ in range(5000)
+        ]
+
+    def text(self, words):
+        return ' '.join(self.rng.choices(self.words, k=words))
+
+    def insert(self, model, rows):
+        count = 0
+        for batch in _batched(rows, self.batch_size):
+            model.objects.bulk_create(batch)
+            count += len(batch)
+        self.log(f'{model.__name__}: {count}')
+        return count
+
+    def seed(self, users, categories, products, news, testimonials, sliders, contacts):
+        # Hashing is deliberately slow, so every seeded user shares one hash.
+        password = make_password(PASSWORD)
+        start = User.objects.filter(username__startswith=USER_PREFIX).count()
+        self.insert(User, (
+            User(username=f'{USER_PREFIX}{start + i:06d}', email=f'user{start + i}@{CONTACT_DOMAIN}', password=password)
+            for i in range(users)
+        ))
+        self.insert(Category, (Category(name=f'{CATEGORY_PREFIX}{self.text(2)}') for _ in range(categories)))
+        author_ids = list(
+            User.objects.filter(username__startswith=USER_PREFIX).order_by('pk').values_list('pk', flat=True)
+        )
+        category_ids = list(
+            Category.objects.filter(name__startswith=CATEGORY_PREFIX).order_by('pk').values_list('pk', flat=True)
+        )
+        rng = self.rng
+
+        self.insert(Products, (
+            Products(
+                name=self.text(3), description=self.text(30), price=round(rng.uniform(1, 500), 2),
+                category_id=rng.choice(category_ids), author_id=rng.choice(author_ids),
+            )
+            for _ in range(products)
+        ))
+        self.insert(News, (
+            News(title=self.text(6), content=self.text(120), author_id=rng.choice(author_ids))
+            for _ in range(news)
+        ))
+        self.insert(Testimonial, (
+            Testimonial(name=self.text(2), content=self.text(40), author_id=rng.choice(author_ids))
+            for _ in range(testimonials)
+        ))
+        # Few sliders are live at a time, and most contacts have been handled.
+        self.insert(Slider, (
+            Slider(
+                name=self.text(2), caption=self.text(6), video='slider/seed.mp4',
+                author_id=rng.choice(author_ids), is_active=rng.random() < 0.05,
+            )
+            for _ in range(sliders)
+        ))
+        self.insert(Contact, (
+            Contact(
+                firstName=self.text(1), lastName=self.text(1), email=f'contact@{CONTACT_DOMAIN}',
+                message=self.text(50), category=rng.choice(CONTACT_CATEGORIES),
+                is_read=rng.random() > 0.02, is_responded=rng.random() > 0.05,
+            )
+            for _ in range(contacts)
+        ))
+        # bulk_create() sends no signals, so neither the category statistics
+        # nor cached responses would notice.
+        category_stats.refresh(category_ids)
+        bump_generation(Products, Category, News, Testimonial, Slider, Contact)
+
+
+def clear_catalog(batch_size=2000):
+    """Delete everything seed_catalog() inserted, in batches."""
+    querysets = [
+        Contact.objects.filter(email__endswith=f'@{CONTACT_DOMAIN}'),
+        Products.objects.filter(author__username__startswith=USER_PREFIX),
+        News.objects.filter(author__username__startswith=USER_PREFIX),
+        Testimonial.objects.filter(author__username__startswith=USER_PREFIX),
+        Slider.objects.filter(author__username__startswith=USER_PREFIX),
+        Category.objects.filter(name__startswith=CATEGORY_PREFIX),
+        User.objects.filter(username__startswith=USER_PREFIX),
+    ]
+    deleted = 0
+    with category_stats.deferred():
+        for queryset in querysets:
+            while pks := list(queryset.values_list('pk', flat=True)[:batch_size]):
+                deleted += queryset.model.objects.filter(pk__in=pks).delete()[0]
+    return deleted
+
+
+def seed_catalog(scale='1k', seed=42, batch_size=2000, log=None, **overrides):
+    """Seed the database at a named scale; see SCALES and scale_counts()."""
+    counts = scale_counts(scale, **overrides)
+    CatalogSeeder(seed=seed, batch_size=batch_size, log=log).seed(**counts)
+    return counts
@@ -1,7 +1,9 @@
 import os
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import News, Products, Category, Slider, Contact, Testimonial
+from .models import CatalogImport, News, Products, Category, Slider, Contact, Testimonial, UploadSession
+from .search import highlight_html
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,19 +15,97 @@ class UserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
+class SrcsetField(serializers.ReadOnlyField):
+    """
+    Expose ``image_derivatives`` as srcset strings per image field and format:
+    {"image": {"webp": "https://.../a_w320.webp 320w, https://.../a_w640.webp 640w"}}
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        srcsets = {}
+        for field_name, entry in value.items():
+            srcsets[field_name] = {}
+            for extension, by_width in entry.get('variants', {}).items():
+                candidates = []
+                for width, name in sorted(by_width.items(), key=lambda item: int(item[0])):
+                    url = default_storage.url(name)
+                    if request is not None:
+                        url = request.build_absolute_uri(url)
+                    candidates.append(f'{url} {width}w')
+                srcsets[field_name][extension] = ', '.join(candidates)
+        return srcsets
+
 class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     author_name = serializers.CharField(source='author.username', read_only=True)
+    image_srcset = SrcsetField(source='image_derivatives')
 
     class Meta:
         model = Products
-        fields = ['id', 'name', 'description', 'price', 'category', 'category_name', 'author', 'author_name', 'image', 'image2', 'image3', 'image4', 'created_at']
+        fields = ['id', 'name', 'description', 'price', 'category', 'category_name', 'author', 'author_name', 'image', 'image2', 'image3', 'image4', 'image_srcset', 'created_at']
         extra_kwargs = {'author': {"read_only": True}}
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolve ids from ``context['preloaded'][field_name]`` (a dict keyed by pk
+    that the view filled with one query) instead of one query per item.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return preloaded[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+class BulkProductSerializer(ProductSerializer):
+    category = PreloadedPrimaryKeyRelatedField(queryset=Category.objects.all())
+
+class HighlightField(serializers.ReadOnlyField):
+    """The search snippet as escaped HTML with the matches in <mark> tags."""
+
+    def to_representation(self, value):
+        return highlight_html(value or '')
+
+class ProductSearchSerializer(ProductSerializer):
+    rank = serializers.FloatField(source='search_rank', read_only=True)
+    highlight = HighlightField(source='search_snippet')
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['rank', 'highlight']
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = '__all__'
+        fields = ['id', 'name', 'updated_at']
+
+class CategoryStatsSerializer(CategorySerializer):
+    """Adds the product statistics kept on the category (api/category_stats.py)."""
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ['product_count', 'min_price', 'max_price', 'latest_product_at']
+
+class CategoryCountSerializer(CategorySerializer):
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ['product_count']
+
+VIDEO_MAX_SIZE = 100 * 1024 * 1024
+VIDEO_EXTENSIONS = ['.mp4', '.webm', '.mov']
+
+def validate_video_size(size):
+    if size > VIDEO_MAX_SIZE:
+        raise serializers.ValidationError('Video size is too large')
+
+def validate_video_extension(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in VIDEO_EXTENSIONS:
+        raise serializers.ValidationError('Unsupported file extension')
 
 class SliderSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,16 +124,32 @@ class SliderSerializer(serializers.ModelSerializer):
         return None
 
     def validate_video(self, value):
-        max_size = 100 * 1024 * 1024
-        if value.size > max_size:
-            raise serializers.ValidationError('Video size is too large')
-
-        valid_extensions = ['.mp4', '.webm', '.mov']
-        ext = os.path.splitext(value.name)[1].lower()
-        if ext not in valid_extensions:
-            raise serializers.ValidationError('Unsupported file extension')
+        validate_video_size(value.size)
+        validate_video_extension(value.name)
+        return value
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'offset', 'created_at']
+        read_only_fields = ['offset']
+
+    def validate_filename(self, value):
+        validate_video_extension(value)
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Video is empty')
+        validate_video_size(value)
         return value
 
+class CatalogImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CatalogImport
+        fields = ['id', 'format', 'status', 'rows_done', 'created', 'failed', 'errors', 'created_at', 'updated_at']
+        read_only_fields = fields
+
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
@@ -61,14 +157,17 @@ class ContactSerializer(serializers.ModelSerializer):
 
 class NewsSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
+    image_srcset = SrcsetField(source='image_derivatives')
 
     class Meta:
         model = News
-        fields = ['id', 'title', 'content', 'author', 'author_name', 'image', 'created_at']
+        fields = ['id', 'title', 'content', 'author', 'author_name', 'image', 'image_srcset', 'created_at']
         extra_kwargs = {'author': {"read_only": True}}
 
 class TestimonialSerializer(serializers.ModelSerializer):
+    image_srcset = SrcsetField(source='image_derivatives')
+
     class Meta:
         model = Testimonial
-        fields = '__all__'
+        exclude = ['image_derivatives']
         extra_kwargs = {'author': {"read_only": True}}
\ No newline at end of file
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+
+from . import category_stats
+from .authentication import invalidate_cached_user
+from .cache import bump_generation, mark_deleted
+from .images import needs_derivatives
+from .jobs import enqueue
+from .models import Category, Contact, News, Products, Slider, Testimonial
+
+# Models whose cache generation and deletion time back response caching
+# and conditional GET validators.
+VERSIONED_MODELS = (Products, Category, Slider, News, Testimonial, Contact)
+
+IMAGE_MODELS = (Products, News, Testimonial)
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    bump_generation(sender)
+
+
+def record_deletion(sender, **kwargs):
+    mark_deleted(sender)
+
+
+def queue_image_derivatives(sender, instance, raw=False, **kwargs):
+    if not raw and needs_derivatives(instance):
+        enqueue('images.derivatives', {'model': sender._meta.label, 'pk': instance.pk})
+
+
+def update_category_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    counted_as = getattr(instance, 'counted_as', None)
+    if not created:
+        if counted_as == (instance.category_id, instance.price, instance.created_at):
+            return
+        if counted_as is None:
+            # Loaded without the counted fields, so what to take out is unknown.
+            category_stats.refresh([instance.category_id])
+            instance.set_counted_as()
+            return
+        category_stats.remove_product(*counted_as)
+    category_stats.add_products([instance])
+    instance.set_counted_as()
+
+
+def remove_from_category_stats(sender, instance, origin=None, **kwargs):
+    # A deleted category takes its products and its statistics with it.
+    if isinstance(origin, Category):
+        return
+    counted_as = getattr(instance, 'counted_as', None)
+    category_stats.remove_product(*(counted_as or (instance.category_id, instance.price, instance.created_at)))
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'cache-{model.__name__}-save')
+    post_delete.connect(invalidate_cached_responses, sender=model, dispatch_uid=f'cache-{model.__name__}-delete')
+    post_delete.connect(record_deletion, sender=model, dispatch_uid=f'deleted-{model.__name__}')
+
+for model in IMAGE_MODELS:
+    post_save.connect(queue_image_derivatives, sender=model, dispatch_uid=f'derivatives-{model.__name__}')
+
+post_save.connect(update_category_stats, sender=Products, dispatch_uid='category-stats-save')
+post_delete.connect(remove_from_category_stats, sender=Products, dispatch_uid='category-stats-delete')
+
+post_save.connect(invalidate_cached_user, sender=get_user_model(), dispatch_uid='auth-user-save')
+post_delete.connect(invalidate_cached_user, sender=get_user_model(), dispatch_uid='auth-user-delete')
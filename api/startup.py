@@ -0,0 +1,91 @@
+"""
+Cold-start measurement for the WSGI entry point.
+
+A serverless deployment (vercel.json) or a new Render instance starts a
+fresh interpreter, imports core/wsgi.py and only then answers its first
+request. measure_startup() repeats that in a subprocess run under
+``python -X importtime`` and returns the time to the first response with
+the modules that were imported on the way, so that a slow new import shows
+up before it is deployed.
+
+Modules in LAZY_MODULES are only needed by some requests or by background
+jobs, and are imported where they are used; a report lists any that were
+imported anyway.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+LAZY_MODULES = ('cloudinary', 'cloudinary_storage.storage', 'dotenv', 'PIL')
+# About 550 ms on a developer laptop; most of it is Django and DRF.
+FIRST_RESPONSE_BUDGET_MS = 2000
+
+# Runs in the subprocess: import the WSGI application and serve one GET.
+SCRIPT = '''
+import json, sys, time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+started = time.perf_counter()
+from core.wsgi import application
+imported = time.perf_counter()
+
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': sys.argv[2], 'wsgi.input': BytesIO()}
+setup_testing_defaults(environ)
+statuses = []
+body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+answered = time.perf_counter()
+
+print(json.dumps({
+    'status': int(statuses[0].split()[0]),
+    'bytes': len(body),
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (answered - started) * 1000,
+    'modules': sorted(sys.modules),
+}))
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+\d+ \|\s+(\S+)$')
+
+
+def parse_importtime(output):
+    """(module, self µs) for each line of -X importtime output."""
+    return [
+        (match[2], int(match[1]))
+        for match in map(IMPORTTIME_LINE.match, output.splitlines()) if match
+    ]
+
+
+def measure_startup(path='/api/products/', env=None):
+    """
+    Start a fresh interpreter, import core/wsgi.py and GET ``path``.
+
+    Returns the response status, import_ms (importing core/wsgi.py, which
+    sets Django up), first_response_ms (from the start of that import to the
+    end of the response body), import times by top-level package, and the
+    LAZY_MODULES that were imported.
+    """
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT, path, host],
+        capture_output=True, text=True, cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'core.settings', **(env or {})},
+    )
+    if process.returncode:
+        raise RuntimeError(f'Startup script failed:\n{process.stderr[-2000:]}')
+    result = json.loads(process.stdout.splitlines()[-1])
+
+    packages = defaultdict(int)
+    modules = parse_importtime(process.stderr)
+    for name, self_us in modules:
+        packages[name.partition('.')[0]] += self_us
+    loaded = set(result.pop('modules'))
+    result['packages'] = sorted(((name, us / 1000) for name, us in packages.items()), key=lambda item: -item[1])
+    result['modules'] = sorted(((name, self_us / 1000) for name, self_us in modules), key=lambda item: -item[1])
+    result['eager'] = [name for name in LAZY_MODULES if name in loaded]
+    return result
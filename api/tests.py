@@ -1,3 +1,1496 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import fcntl
+import io
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection, connections, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .benchmark import run_benchmark
+from .cache import get_generations
+from .category_stats import deferred, drifted, refresh
+from .importing import NoRedirects
+from .jobs import enqueue_media_deletion, run_pending
+from .metrics import MetricsFile, MetricsMiddleware, MetricsView
+from .mixins import shape_queryset
+from .query_plans import analyze, check_query_plans, seed
+from .seeding import seed_catalog
+from .models import CatalogImport, Category, Contact, DeadLetterJob, Job, News, Products, Slider, Testimonial, UploadSession
+from .pagination import KeysetPagination
+from .rendering import FastJSONRenderer, FastRepresentation
+from .routers import REPLICA, _replica_health
+from .search import search_products
+from .serializers import NewsSerializer, ProductSearchSerializer, ProductSerializer
+from .startup import FIRST_RESPONSE_BUDGET_MS, measure_startup
+
+
+@contextmanager
+def recorded_queries():
+    """
+    Collect the SQL run in the block. Unlike assertNumQueries() this works
+    across test client requests, whose request_started signal resets
+    connection.queries.
+    """
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        statements.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        yield statements
+
+
+def create_products(count, author, category):
+    """bulk_create ``count`` products; it sends no signals, so the response cache is cleared."""
+    products = Products.objects.bulk_create([
+        Products(name=f'Product {index}', description='PVC', category=category, price=index, author=author)
+        for index in range(count)
+    ])
+    cache.clear()
+    return products
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.category = Category.objects.create(name='Pipes')
+
+    def test_cursors_visit_every_row_once(self):
+        # Half the rows share a timestamp, so the id breaks the ties.
+        create_products(25, self.user, self.category)
+        tied = create_products(20, self.user, self.category)
+        Products.objects.filter(pk__in=[product.pk for product in tied]).update(created_at=timezone.now())
+        expected = list(Products.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+        seen, pages, url = [], [], '/api/products/?page_size=10'
+        while url:
+            page = self.client.get(url).json()
+            pages.append(page)
+            seen += [product['id'] for product in page['results']]
+            url = page['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 10, 10, 5])
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[-1]['previous']).json()
+        self.assertEqual([product['id'] for product in previous['results']], expected[30:40])
+        self.assertIsNotNone(previous['next'])
+
+    def test_invalid_cursors_are_not_found(self):
+        create_products(3, self.user, self.category)
+        next_url = self.client.get('/api/products/?page_size=1').json()['next']
+        valid = parse_qs(urlsplit(next_url).query)['cursor'][0]
+        tampered = base64.urlsafe_b64encode(b'{"v":["not a date",1],"r":0}').decode()
+        short = base64.urlsafe_b64encode(b'{"v":[1],"r":0}').decode()
+        for cursor in ('garbage', tampered, short, valid[:-4]):
+            response = self.client.get(f'/api/products/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+
+    def test_query_count_does_not_grow_with_the_table(self):
+        for size in (50, 500):
+            Products.objects.all().delete()
+            create_products(size, self.user, self.category)
+            url = self.client.get('/api/products/?page_size=20').json()['next']
+            cache.clear()
+            # The validator's MAX(updated_at) and the page itself.
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(len(response.json()['results']), 20)
+
+    def test_count_is_cached_and_estimated_for_unfiltered_tables(self):
+        create_products(30, self.user, self.category)
+        self.assertNotIn('count', self.client.get('/api/products/').json())
+        self.assertEqual(self.client.get('/api/products/?with_count=true').json()['count'], 30)
+
+        # Served from the count cache until it expires, not recounted.
+        Products.objects.bulk_create([Products(name='New', description='PVC', category=self.category, price=1, author=self.user)])
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/?with_count=true&page_size=5')
+        self.assertEqual(response.json()['count'], 30)
+
+        cache.clear()
+        with mock.patch.object(KeysetPagination, '_estimate_count', return_value=1000) as estimate:
+            self.assertEqual(self.client.get('/api/products/?with_count=1').json()['count'], 1000)
+        estimate.assert_called_once()
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('owner', password='secret')
+        pipes, valves = Category.objects.create(name='Pipes'), Category.objects.create(name='Valves')
+        self.name_match = Products.objects.create(
+            name='Polymer pipe', category=pipes, price=10, description='Rigid tube for water', author=user,
+        )
+        self.description_match = Products.objects.create(
+            name='Elbow', category=pipes, price=2, description='Joins a polymer pipe at ninety degrees', author=user,
+        )
+        self.category_match = Products.objects.create(
+            name='Gate', category=valves, price=30, description='Brass body', author=user,
+        )
+
+    def search(self, query):
+        response = self.client.get('/api/products/search/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_results_are_ranked_with_highlights(self):
+        results = self.search('polymer pipe')['results']
+        self.assertEqual([product['id'] for product in results], [self.name_match.pk, self.description_match.pk])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertIn('<mark>polymer</mark>', results[1]['highlight'])
+
+        self.assertEqual([product['id'] for product in self.search('valves')['results']], [self.category_match.pk])
+        self.assertEqual([product['id'] for product in self.search('pip')['results']][:1], [self.name_match.pk])
+
+    def test_highlights_escape_the_description(self):
+        self.description_match.description = '<script>alert(1)</script> <b>polymer</b> & pipe'
+        self.description_match.save()
+        highlight = next(
+            product['highlight'] for product in self.search('polymer')['results']
+            if product['id'] == self.description_match.pk
+        )
+        self.assertNotIn('<script>', highlight)
+        self.assertIn('&lt;script&gt;', highlight)
+        self.assertIn('&lt;b&gt;<mark>polymer</mark>&lt;/b&gt; &amp;', highlight)
+
+    def test_punctuation_only_queries_match_nothing(self):
+        for query in ('!!!', '"', '*', '-'):
+            self.assertEqual(self.search(query)['results'], [], query)
+
+    def test_blank_query_lists_every_product(self):
+        results = self.search('  ')['results']
+        self.assertEqual([product['id'] for product in results], [
+            self.category_match.pk, self.description_match.pk, self.name_match.pk,
+        ])
+        self.assertNotIn('rank', results[0])
+
+    def test_other_databases_fall_back_to_icontains(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            products = search_products(Products.objects.all(), 'valves')
+            self.assertEqual([(product.pk, product.search_rank) for product in products], [(self.category_match.pk, 0.0)])
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.category = Category.objects.create(name='Pipes')
+        self.product = Products.objects.create(
+            name='Pipe', category=self.category, price=10, description='PVC', author=self.user,
+        )
+
+    def get(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hits_skip_the_database(self):
+        self.assertEqual(self.get('/api/products/')['X-Cache'], 'MISS')
+        with recorded_queries() as queries:
+            response = self.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(queries, [])
+        self.assertEqual(self.get('/api/products/?page_size=5')['X-Cache'], 'MISS')
+
+    def test_writes_invalidate_cached_responses(self):
+        path = f'/api/products/{self.product.pk}/'
+        self.get('/api/products/')
+        self.get(path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Elbow'
+            self.product.save()
+        for url in ('/api/products/', path):
+            response = self.get(url)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertIn(b'Elbow', response.content)
+
+    def test_reads_before_the_commit_do_not_outlive_it(self):
+        path = f'/api/products/{self.product.pk}/'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.name = 'Elbow'
+            self.product.save()
+            # Another connection would still read the old row here; whatever
+            # it caches must be filed under the generation the commit retires.
+            stale = self.get(path)
+            self.assertEqual(self.get(path)['X-Cache'], 'HIT')
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+
+        response = self.get(path)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], stale['ETag'])
+
+    def test_deletes_invalidate_cached_responses(self):
+        self.get('/api/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        response = self.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'], [])
+
+    def test_related_model_changes_invalidate_cached_responses(self):
+        path = f'/api/products/{self.product.pk}/'
+        self.get(path)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Fittings'
+            self.category.save()
+        response = self.get(path)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['category_name'], 'Fittings')
+
+        # A model the view does not read leaves the entry alone.
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title='Launch', content='...', author=self.user)
+        self.assertEqual(self.get(path)['X-Cache'], 'HIT')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.category = Category.objects.create(name='Pipes')
+        self.product = Products.objects.create(
+            name='Pipe', category=self.category, price=10, description='PVC', author=self.user,
+        )
+        self.paths = [
+            '/api/products/', f'/api/products/{self.product.pk}/', f'/api/products/category/{self.category.pk}/',
+        ]
+
+    def validators(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag'], response['Last-Modified']
+
+    def assertNotModified(self, path, etag, last_modified):
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(path, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_unchanged_content_is_not_modified(self):
+        for path in self.paths + ['/api/categories/', '/api/news/']:
+            etag, last_modified = self.validators(path)
+            self.assertNotModified(path, etag, last_modified)
+            # Answered from the response cache as well.
+            self.assertNotModified(path, etag, last_modified)
+
+        # A 304 costs the validator query only; nothing is serialized.
+        etag, _ = self.validators(self.paths[2])
+        with recorded_queries() as queries:
+            self.client.get(self.paths[2], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(queries), 1, queries)
+
+    def test_edits_and_deletes_change_the_validators(self):
+        before = {path: self.validators(path)[0] for path in self.paths}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 12
+            self.product.save()
+        after = {path: self.validators(path)[0] for path in self.paths}
+        for path in self.paths:
+            self.assertNotEqual(before[path], after[path], path)
+            self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=before[path]).status_code, 200)
+
+        list_path = self.paths[0]
+        etag, last_modified = self.validators(list_path)
+        with mock.patch('api.cache.time.time', return_value=time.time() + 60), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        response = self.client.get(list_path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+        self.assertEqual(self.client.get(list_path, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_related_changes_change_the_validators(self):
+        before = {path: self.validators(path) for path in self.paths}
+        with mock.patch('api.cache.time.time', return_value=time.time() + 60), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Fittings'
+            self.category.save()
+        for path, (etag, last_modified) in before.items():
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertIn(b'Fittings', response.content)
+            self.assertEqual(self.client.get(path, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200, path)
+
+
+class HomepageBundleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.pipes, self.valves = Category.objects.create(name='Pipes'), Category.objects.create(name='Valves')
+
+    def seed(self, count):
+        for index in range(count):
+            Products.objects.create(
+                name=f'Pipe {index}', category=self.pipes, price=index, description='PVC', author=self.user,
+            )
+            News.objects.create(title=f'News {index}', content='...', author=self.user)
+            Testimonial.objects.create(name=f'Customer {index}', content='...', author=self.user)
+            Slider.objects.create(
+                name=f'Slider {index}', video='slider/a.mp4', caption='...', author=self.user, is_active=index % 2 == 0,
+            )
+        cache.clear()
+
+    def test_one_query_per_section(self):
+        for count in (3, 30):
+            self.seed(count)
+            # Sliders, categories, products, news and testimonials.
+            with self.assertNumQueries(5):
+                response = self.client.get('/api/home/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_response_shape(self):
+        self.seed(10)
+        data = self.client.get('/api/home/?limit=3').json()
+        self.assertEqual(list(data), ['sliders', 'categories', 'products', 'news', 'testimonials'])
+        self.assertEqual(len(data['sliders']), 5)
+        self.assertTrue(all(slider['is_active'] for slider in data['sliders']))
+        self.assertEqual(data['categories'], [
+            {'id': self.pipes.pk, 'name': 'Pipes', 'updated_at': data['categories'][0]['updated_at'], 'product_count': 10},
+            {'id': self.valves.pk, 'name': 'Valves', 'updated_at': data['categories'][1]['updated_at'], 'product_count': 0},
+        ])
+        self.assertEqual([product['name'] for product in data['products']], ['Pipe 9', 'Pipe 8', 'Pipe 7'])
+        self.assertEqual(data['products'][0]['category_name'], 'Pipes')
+        self.assertEqual(data['products'][0]['author_name'], 'owner')
+        self.assertEqual(len(data['news']), 3)
+        self.assertEqual(len(data['testimonials']), 3)
+
+        self.assertEqual(len(self.client.get('/api/home/?limit=500').json()['products']), 10)
+        self.assertEqual(len(self.client.get('/api/home/?limit=x').json()['products']), 8)
+
+
+class BulkProductTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.other = User.objects.create_user('other', password='secret')
+        self.pipes, self.valves = Category.objects.create(name='Pipes'), Category.objects.create(name='Valves')
+        self.products = [
+            Products.objects.create(name=f'Pipe {index}', category=self.pipes, price=10 + index, description='PVC', author=self.user)
+            for index in range(3)
+        ]
+        self.foreign = Products.objects.create(name='Valve', category=self.valves, price=5, description='Brass', author=self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def item(self, **fields):
+        return {'name': 'Elbow', 'category': self.valves.pk, 'price': 2, 'description': 'PVC', **fields}
+
+    def test_create_counts_products_in_and_invalidates_the_cache(self):
+        self.assertEqual(self.client.get('/api/products/').json()['results'][0]['id'], self.foreign.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/products/bulk/create/', [self.item(), self.item(price=40)], format='json')
+        self.assertEqual(response.status_code, 201)
+        ids = [product['id'] for product in response.json()]
+
+        listed = self.client.get('/api/products/')
+        self.assertEqual(listed['X-Cache'], 'MISS')
+        self.assertEqual([product['id'] for product in listed.json()['results'][:2]], ids[::-1])
+        self.valves.refresh_from_db()
+        self.assertEqual((self.valves.product_count, self.valves.min_price, self.valves.max_price), (3, 2, 40))
+
+    def test_validation_errors_are_reported_by_index(self):
+        response = self.client.post(
+            '/api/products/bulk/create/', [self.item(), self.item(price='cheap'), self.item(category=0)], format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2])
+        self.assertIn('price', response.json()['errors'][0]['errors'])
+        self.assertEqual(Products.objects.count(), 4)
+
+    def test_update_refreshes_statistics_and_the_cache(self):
+        path = f'/api/products/{self.products[0].pk}/'
+        self.client.get(path)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/products/bulk/update/', [
+                {'id': self.products[0].pk, 'price': 1},
+                {'id': self.products[1].pk, 'category': self.valves.pk},
+            ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(path).json()['price'], 1)
+
+        self.pipes.refresh_from_db()
+        self.valves.refresh_from_db()
+        self.assertEqual((self.pipes.product_count, self.pipes.min_price, self.pipes.max_price), (2, 1, 12))
+        self.assertEqual((self.valves.product_count, self.valves.max_price), (2, 11))
+        self.assertEqual(drifted(), [])
+
+    def test_update_is_all_or_nothing(self):
+        ids = [product.pk for product in self.products]
+        response = self.client.patch('/api/products/bulk/update/', [
+            {'id': ids[0], 'price': 1}, {'id': ids[1], 'price': 'cheap'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [{'index': 1, 'errors': {'price': ['A valid number is required.']}}])
+
+        # A failure after bulk_update() rolls the batch back.
+        with mock.patch('api.category_stats.refresh', side_effect=DatabaseError('stats unavailable')):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                self.client.patch('/api/products/bulk/update/', [{'id': pk, 'price': 1} for pk in ids], format='json')
+        self.assertEqual(sorted(Products.objects.filter(pk__in=ids).values_list('price', flat=True)), [10, 11, 12])
+
+    def test_duplicate_ids_are_rejected(self):
+        pk = self.products[0].pk
+        response = self.client.patch('/api/products/bulk/update/', [{'id': pk, 'price': 1}, {'id': pk, 'price': 2}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Duplicate ids in batch'})
+
+    def test_missing_ids_are_not_found_and_foreign_ids_forbidden(self):
+        ids = [self.products[0].pk, 999999]
+        response = self.client.post('/api/products/bulk/delete/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['errors'], [{'index': 1, 'id': 999999, 'errors': {'id': ['Product not found']}}])
+        response = self.client.patch('/api/products/bulk/update/', [{'id': 999999, 'price': 1}], format='json')
+        self.assertEqual(response.status_code, 404)
+
+        ids = [self.products[0].pk, self.foreign.pk]
+        response = self.client.post('/api/products/bulk/delete/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual([error['id'] for error in response.json()['errors']], [self.foreign.pk])
+        response = self.client.patch('/api/products/bulk/update/', [{'id': self.foreign.pk, 'price': 1}], format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Products.objects.count(), 4)
+
+    def test_delete_removes_the_batch(self):
+        self.client.get('/api/products/')
+        ids = [product.pk for product in self.products[:2]]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/products/bulk/delete/', {'ids': ids}, format='json')
+        self.assertEqual(response.json()['deleted'], 2)
+        listed = self.client.get('/api/products/')
+        self.assertEqual(listed['X-Cache'], 'MISS')
+        self.assertNotIn(ids[0], [product['id'] for product in listed.json()['results']])
+        self.pipes.refresh_from_db()
+        self.assertEqual((self.pipes.product_count, self.pipes.min_price), (1, 12))
+
+
+class RecordingMediaClient:
+    """Stands in for Cloudinary: records deletions, optionally failing."""
+    destroyed = []
+    fail = False
+
+    def destroy(self, name, resource_type='image'):
+        if self.fail:
+            raise ConnectionError('media provider unavailable')
+        self.destroyed.append((name, resource_type))
+
+
+@override_settings(MEDIA_CLIENT='api.tests.RecordingMediaClient')
+class JobQueueTests(TestCase):
+    def setUp(self):
+        RecordingMediaClient.destroyed = []
+        RecordingMediaClient.fail = False
+        self.user = User.objects.create_user('owner', password='secret')
+        self.product = Products.objects.create(
+            name='Pipe', category=Category.objects.create(name='Pipes'), price=10,
+            description='PVC', author=self.user, image='products/pipes/a.png',
+            image2='products/pipes/b.png',
+        )
+        # Drop the derivative job queued by the save; these files don't exist.
+        Job.objects.all().delete()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_delete_enqueues_media_deletion(self):
+        response = self.client.delete(f'/api/products/delete/{self.product.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Products.objects.exists())
+        self.assertEqual(Job.objects.count(), 2)
+        self.assertEqual(RecordingMediaClient.destroyed, [])
+
+        self.assertEqual(run_pending(), (2, 0))
+        self.assertEqual(
+            sorted(RecordingMediaClient.destroyed),
+            [('products/pipes/a.png', 'image'), ('products/pipes/b.png', 'image')],
+        )
+        self.assertFalse(Job.objects.exists())
+
+    def test_failing_job_backs_off_then_dead_letters(self):
+        RecordingMediaClient.fail = True
+        self.client.post('/api/products/bulk/delete/', {'ids': [self.product.pk]}, format='json')
+        Job.objects.update(max_attempts=2)
+
+        self.assertEqual(run_pending(), (0, 2))
+        job = Job.objects.first()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_PENDING, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ConnectionError', job.last_error)
+        self.assertEqual(run_pending(), (0, 0))
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending(), (0, 2))
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(DeadLetterJob.objects.count(), 2)
+
+
+@override_settings(MEDIA_CLIENT='api.media.StorageMediaClient', IMAGE_DERIVATIVE_WIDTHS=[320, 640, 1280])
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user('author', password='secret')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, size=(800, 600)):
+        exif = Image.Exif()
+        exif[0x010F] = 'CameraMaker'
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_save_queues_derivatives_without_exif(self):
+        news = News.objects.create(title='Plant opening', content='...', author=self.user, image=self.upload())
+        self.assertEqual(Job.objects.filter(name='images.derivatives').count(), 1)
+        run_pending()
+
+        news.refresh_from_db()
+        variants = news.image_derivatives['image']['variants']
+        self.assertEqual(sorted(variants), ['jpeg', 'webp'])
+        self.assertEqual(sorted(variants['webp'], key=int), ['320', '640'])
+        with default_storage.open(variants['jpeg']['320']) as derivative:
+            image = Image.open(derivative)
+            self.assertEqual(image.size, (320, 240))
+            self.assertEqual(len(image.getexif()), 0)
+
+        srcset = NewsSerializer(news).data['image_srcset']['image']['webp']
+        self.assertRegex(srcset, r'_w320\.webp 320w, .*_w640\.webp 640w$')
+
+    def test_replacing_image_rebuilds_and_removes_old_derivatives(self):
+        news = News.objects.create(title='Expo', content='...', author=self.user, image=self.upload())
+        run_pending()
+        news.refresh_from_db()
+        old = news.image_derivatives['image']['variants']['webp']['320']
+
+        news.image = self.upload(size=(200, 100))
+        news.save()
+        run_pending()
+        news.refresh_from_db()
+
+        self.assertFalse(default_storage.exists(old))
+        self.assertEqual(list(news.image_derivatives['image']['variants']['webp']), ['200'])
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            CHUNKED_UPLOAD_DIR=f'{self.media_root}/uploads',
+            CHUNKED_UPLOAD_MAX_CHUNK_SIZE=4,
+        )
+        self.settings_override.enable()
+        self.user = User.objects.create_user('uploader', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def put_chunk(self, url, data, start, total):
+        return self.client.generic(
+            'PUT', url, data, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{start + len(data) - 1}/{total}',
+        )
+
+    def test_upload_resumes_from_offset_and_creates_slider(self):
+        content = b'0123456789'
+        response = self.client.post('/api/sliders/uploads/', {'filename': 'intro.mp4', 'size': len(content)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        url = f"/api/sliders/uploads/{response.data['id']}/"
+
+        self.assertEqual(self.put_chunk(url, content[:4], 0, 10).data['offset'], 4)
+        # A retried or out-of-order chunk is rejected with the offset to resume from.
+        response = self.put_chunk(url, content[:4], 0, 10)
+        self.assertEqual((response.status_code, response.data['offset']), (409, 4))
+        self.assertEqual(self.put_chunk(url, content[4:9], 4, 10).status_code, 413)
+
+        response = self.client.get(url)
+        self.assertEqual(response['Upload-Offset'], '4')
+        self.assertEqual(self.client.post(f'{url}complete/', {'name': 'Intro'}).status_code, 409)
+
+        self.put_chunk(url, content[4:8], 4, 10)
+        self.put_chunk(url, content[8:], 8, 10)
+        response = self.client.post(f'{url}complete/', {'name': 'Intro', 'caption': 'Welcome'})
+        self.assertEqual(response.status_code, 201)
+
+        slider = Slider.objects.get()
+        with slider.video.open('rb') as video:
+            self.assertEqual(video.read(), content)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunk_losing_the_offset_claim_leaves_the_file_alone(self):
+        response = self.client.post('/api/sliders/uploads/', {'filename': 'intro.mp4', 'size': 8}, format='json')
+        url = f"/api/sliders/uploads/{response.data['id']}/"
+        session = UploadSession.objects.get()
+        self.put_chunk(url, b'0123', 0, 8)
+
+        # A concurrent PUT of the same range that read the session before
+        # the first one recorded its chunk.
+        session.offset = 0
+        with mock.patch('api.views.SliderUploadChunk.get_object', return_value=session):
+            response = self.put_chunk(url, b'abcd', 0, 8)
+        self.assertEqual((response.status_code, response.data['offset']), (409, 4))
+        with open(session.temp_path, 'rb') as data:
+            self.assertEqual(data.read(), b'0123')
+        self.assertEqual(UploadSession.objects.get().offset, 4)
+
+    def test_chunk_waits_for_no_other_writer(self):
+        response = self.client.post('/api/sliders/uploads/', {'filename': 'intro.mp4', 'size': 8}, format='json')
+        url = f"/api/sliders/uploads/{response.data['id']}/"
+        session = UploadSession.objects.get()
+
+        # Another request is still streaming its chunk into the file.
+        with open(session.temp_path, 'r+b') as writer:
+            fcntl.flock(writer, fcntl.LOCK_EX)
+            response = self.put_chunk(url, b'0123', 0, 8)
+        self.assertEqual((response.status_code, response.data['offset']), (409, 0))
+        self.assertEqual(self.put_chunk(url, b'0123', 0, 8).data['offset'], 4)
+
+    def test_concurrent_completes_create_one_slider(self):
+        response = self.client.post('/api/sliders/uploads/', {'filename': 'intro.mp4', 'size': 4}, format='json')
+        url = f"/api/sliders/uploads/{response.data['id']}/"
+        self.put_chunk(url, b'0123', 0, 4)
+        session = UploadSession.objects.get()
+
+        self.assertEqual(self.client.post(f'{url}complete/', {'name': 'Intro', 'caption': 'Welcome'}).status_code, 201)
+        # A second complete that read the session before the first removed it.
+        with mock.patch('api.views.SliderUploadComplete.get_object', return_value=session):
+            response = self.client.post(f'{url}complete/', {'name': 'Intro', 'caption': 'Welcome'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(Slider.objects.count(), 1)
+
+    def test_invalid_complete_keeps_the_upload(self):
+        response = self.client.post('/api/sliders/uploads/', {'filename': 'intro.mp4', 'size': 4}, format='json')
+        url = f"/api/sliders/uploads/{response.data['id']}/"
+        self.put_chunk(url, b'0123', 0, 4)
+
+        self.assertEqual(self.client.post(f'{url}complete/', {'is_active': 'maybe'}).status_code, 400)
+        self.assertTrue(UploadSession.objects.exists())
+        self.assertEqual(self.client.post(f'{url}complete/', {'name': 'Intro', 'caption': 'Welcome'}).status_code, 201)
+
+    def test_rejects_bad_declarations_and_other_users(self):
+        response = self.client.post('/api/sliders/uploads/', {'filename': 'intro.exe', 'size': 10}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/sliders/uploads/', {'filename': 'intro.mp4', 'size': 10}, format='json')
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', password='secret'))
+        self.assertEqual(other.get(f"/api/sliders/uploads/{response.data['id']}/").status_code, 404)
+
+
+class QueryPlanTests(TestCase):
+    def test_list_endpoints_do_not_scan_large_tables(self):
+        context = seed(2000)
+        analyze()
+        problems = check_query_plans(context)
+        self.assertEqual([(problem['url'], problem['table'], problem['plan']) for problem in problems], [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkTests(TestCase):
+    def test_every_route_is_benchmarked_and_succeeds(self):
+        cache.clear()
+        seed_catalog(products=200)
+        report = run_benchmark(iterations=2, warmup=1)
+
+        failures = [(row['method'], row['path'], row['status']) for row in report['endpoints'] if row['status'] >= 400]
+        self.assertEqual(failures, [])
+        self.assertIn('product_bulk_update', {row['name'] for row in report['endpoints']})
+        self.assertEqual(report['meta']['dataset']['api.Products'], 200)
+        # Every write was rolled back.
+        self.assertEqual(Products.objects.count(), 200)
+
+
+class StartupTests(TestCase):
+    def test_cold_start_of_wsgi_entry_point(self):
+        # An unauthorized /metrics scrape needs no database, which the
+        # subprocess cannot share with the test.
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            result = measure_startup('/metrics', env={
+                'METRICS_ENABLED': 'True', 'METRICS_DIR': metrics_dir, 'METRICS_TOKEN': 'scrape-secret',
+            })
+        self.assertEqual(result['status'], 401)
+        self.assertEqual(result['eager'], [])
+        self.assertLess(result['first_response_ms'], FIRST_RESPONSE_BUDGET_MS)
+        self.assertIn('django', dict(result['packages']))
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.dump_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dump_dir)
+
+    def test_reports_server_timing_and_dumps_slow_samples(self):
+        user = User.objects.create_user('owner', password='secret')
+        Products.objects.create(
+            name='Pipe', category=Category.objects.create(name='Pipes'), price=10, description='PVC', author=user,
+        )
+        with override_settings(
+            PROFILING_ENABLED=True, PROFILING_SLOW_MS=0, PROFILING_SAMPLE_RATE=1.0, PROFILING_DUMP_DIR=self.dump_dir,
+        ), self.assertLogs('api.profiling', 'WARNING') as logs:
+            response = APIClient().get('/api/products/')
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('serialize;dur=', timing)
+        self.assertRegex(timing, r'total;dur=[\d.]+$')
+        self.assertIn('"path": "/api/products/"', logs.output[0])
+        self.assertEqual(len(os.listdir(self.dump_dir)), 1)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            METRICS_ENABLED=True, METRICS_DIR=self.metrics_dir, METRICS_TOKEN='scrape-secret',
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.metrics_dir)
+
+    def test_requests_are_aggregated_across_worker_files(self):
+        client = APIClient()
+        client.get('/api/products/')
+        client.get('/api/products/')
+        client.get('/no-such-page/')
+        # Another worker process's file in the same directory.
+        MetricsFile(f'{self.metrics_dir}/metrics-other.db').record('product_list', 'GET', 200, 0.2, 3, 512)
+
+        body = client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').content.decode()
+        self.assertIn('api_requests_total{route="product_list",method="GET",status="200"} 3.0', body)
+        self.assertIn('api_requests_total{route="unmatched",method="GET",status="404"} 1.0', body)
+        self.assertIn('api_request_duration_seconds_bucket{route="product_list",le="+Inf"} 3.0', body)
+        # The second request was a response cache hit and ran no queries.
+        self.assertIn('api_request_queries_bucket{route="product_list",le="0"} 1.0', body)
+        self.assertIn('api_request_duration_seconds_bucket{route="product_list",le="0.25"}', body)
+        self.assertEqual(body.count('# TYPE api_requests_total counter'), 1)
+
+    def test_token_is_required(self):
+        self.assertEqual(APIClient().get('/metrics').status_code, 401)
+        self.assertEqual(APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        with override_settings(METRICS_ENABLED=False):
+            response = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 404)
+
+        # Without a token the app refuses to start outside DEBUG, and the
+        # view lets no scrape through.
+        with override_settings(METRICS_TOKEN=''):
+            with self.assertRaises(ImproperlyConfigured):
+                MetricsMiddleware(lambda request: None)
+            request = RequestFactory().get('/metrics', HTTP_AUTHORIZATION='Bearer ')
+            self.assertEqual(MetricsView.as_view()(request).status_code, 401)
+
+    def test_unwritable_directory_turns_recording_off(self):
+        blocker = f'{self.metrics_dir}/file'
+        open(blocker, 'w').close()
+        with override_settings(METRICS_DIR=f'{blocker}/metrics'), self.assertLogs('api.metrics', 'WARNING'):
+            self.assertEqual(APIClient().get('/api/products/').status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner', password='secret')
+        self.product = Products.objects.create(
+            name='Pipe', category=Category.objects.create(name='Pipes'), price=10, description='PVC', author=self.user,
+        )
+        self.client = APIClient()
+
+    def login(self, password='secret'):
+        response = self.client.post('/api/token/', {'username': 'owner', 'password': password}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def update(self, name):
+        with recorded_queries() as statements:
+            response = self.client.patch(f'/api/products/update/{self.product.pk}/', {'name': name}, format='json')
+        return response, statements
+
+    def test_writes_do_not_query_the_user(self):
+        self.login()
+        self.update('Warm-up')
+        response, statements = self.update('Pipe 2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Products.objects.get().name, 'Pipe 2')
+        self.assertEqual([sql for sql in statements if 'FROM "auth_user"' in sql], [])
+
+    def test_password_change_revokes_tokens(self):
+        self.login()
+        self.update('Warm-up')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('changed')
+            self.user.save()
+
+        self.assertEqual(self.update('Pipe 2')[0].status_code, 401)
+        self.login('changed')
+        self.assertEqual(self.update('Pipe 2')[0].status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        self.login()
+        self.update('Warm-up')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.assertEqual(self.update('Pipe 2')[0].status_code, 401)
+
+    def test_user_is_forgotten_when_the_change_commits(self):
+        self.login()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.is_active = False
+            self.user.save()
+            # Another connection still reads the active row and caches it.
+            User.objects.filter(pk=self.user.pk).update(is_active=True)
+            self.update('Warm-up')
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.update('Pipe 2')[0].status_code, 401)
+
+
+class ContactProtectionTests(TestCase):
+    payload = {
+        'firstName': 'Ada', 'lastName': 'Lovelace', 'email': 'ada@example.com',
+        'message': 'Quote for 200 m of pipe', 'category': 'quote',
+    }
+
+    def setUp(self):
+        cache.clear()
+
+    def test_identical_submissions_are_answered_from_the_cache(self):
+        client = APIClient()
+        first = client.post('/api/contacts/create/', self.payload, format='json')
+        with recorded_queries() as queries:
+            again = client.post(
+                '/api/contacts/create/', {**self.payload, 'message': '  quote for 200 M of pipe '}, format='json',
+            )
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data['id'], first.data['id'])
+        self.assertEqual(queries, [])
+        self.assertEqual(Contact.objects.count(), 1)
+
+    @override_settings(DUPLICATE_SUBMISSION_WINDOW=0)
+    def test_bursts_are_throttled_per_ip(self):
+        client = APIClient()
+        statuses = [
+            client.post('/api/contacts/create/', {**self.payload, 'message': f'Message {i}'}, format='json').status_code
+            for i in range(6)
+        ]
+        self.assertEqual(statuses, [201] * 5 + [429])
+
+        response = client.post('/api/contacts/create/', self.payload, format='json')
+        self.assertEqual(int(response['Retry-After']), 12)
+        # Another client has its own bucket.
+        other = APIClient(REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(other.post('/api/contacts/create/', self.payload, format='json').status_code, 201)
+
+
+class ContactInboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for category, is_read in [('sales', False), ('sales', False), ('sales', True), ('support', False)]:
+            Contact.objects.create(
+                firstName='Ada', lastName='Lovelace', email='ada@example.com', message='Hi',
+                category=category, is_read=is_read,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='secret'))
+
+    def test_summary_is_cached_until_contacts_change(self):
+        response = self.client.get('/api/contacts/summary/')
+        self.assertEqual(response.data, {
+            'unread': 3,
+            'unresponded': 4,
+            'categories': [
+                {'category': 'sales', 'unread': 2, 'unresponded': 3},
+                {'category': 'support', 'unread': 1, 'unresponded': 1},
+            ],
+        })
+        with recorded_queries() as queries:
+            self.client.get('/api/contacts/summary/')
+        self.assertEqual(queries, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/contacts/mark-read/', {'filter': {'category': 'sales'}}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(self.client.get('/api/contacts/summary/').data['unread'], 1)
+
+    def test_status_changes_by_ids_in_one_update(self):
+        ids = list(Contact.objects.filter(category='sales').values_list('pk', flat=True))
+        with recorded_queries() as queries:
+            response = self.client.post('/api/contacts/mark-responded/', {'ids': ids}, format='json')
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith('UPDATE'))
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(Contact.objects.filter(is_responded=True).count(), 3)
+
+        response = self.client.post('/api/contacts/mark-unresponded/', {'ids': ids[:1]}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+
+    def test_invalid_selections_are_rejected(self):
+        for body in [{}, {'ids': []}, {'ids': ['1']}, {'filter': {'email': 'ada@example.com'}}, {'filter': {'is_read': 'no'}}]:
+            response = self.client.post('/api/contacts/mark-read/', body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(Contact.objects.filter(is_read=True).exclude(category='sales').exists())
+
+
+class FastListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('owner', password='secret')
+        category = Category.objects.create(name='Pipes   & fittings')
+        for index in range(25):
+            Products.objects.create(
+                name=f'Pipe "{index}" é \u2028\u2029', category=category, price=index + 0.5, description='PVC\n\ttube',
+                author=user, image='products/pipes/a b.png' if index % 2 else None,
+                image_derivatives={'image': {'variants': {'webp': {'320': 'products/pipes/a_w320.webp'}}}} if index % 3 else {},
+            )
+        News.objects.create(title='Launch', content='New line', author=user)
+
+    def get_both(self, path):
+        fast = self.client.get(path)
+        cache.clear()
+        with mock.patch.object(FastRepresentation, 'for_serializer', return_value=None):
+            regular = self.client.get(path)
+        cache.clear()
+        return fast, regular
+
+    def test_output_is_identical_to_the_serializer(self):
+        first, regular = self.get_both('/api/products/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.json()['results']), 20)
+        self.assertEqual(first.content, regular.content)
+
+        fast, regular = self.get_both(first.json()['next'])
+        self.assertEqual(len(fast.json()['results']), 5)
+        self.assertEqual(fast.content, regular.content)
+
+        for path in ('/api/news/', f'/api/products/category/{Category.objects.get().pk}/?page_size=5'):
+            fast, regular = self.get_both(path)
+            self.assertEqual(fast.content, regular.content)
+
+    def test_floats_render_like_json(self):
+        values = [
+            1e16, -1e16, 1e22, 1.5e300, 1.7976931348623157e308, 123456789012345680.0, 9999999999999998.0,
+            1e-05, 1e-7, -2e-9, 9.9e-05, 5e-324, 0.0001, 0.1, 2.5, -0.0, 1e15, 0.5 + 2**52,
+        ]
+        for value in values:
+            data = {'results': [{'price': value}]}
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data), value)
+
+    def test_unsupported_serializers_are_not_compiled(self):
+        self.assertIsNone(FastRepresentation.for_serializer(ProductSearchSerializer()))
+        self.assertIsNotNone(FastRepresentation.for_serializer(ProductSerializer()))
+        self.assertIsNotNone(FastRepresentation.for_serializer(NewsSerializer()))
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('owner', password='secret')
+        self.product = Products.objects.create(
+            name='Pipe', category=Category.objects.create(name='Pipes'), price=10, description='PVC ' * 500, author=user,
+        )
+        Testimonial.objects.create(name='Ada', content='Great pipes ' * 100, author=user)
+
+    def test_fields_trim_the_response_and_the_query(self):
+        with recorded_queries() as queries:
+            response = self.client.get('/api/products/?fields=id,name,price,image')
+        self.assertEqual(list(response.json()['results'][0]), ['id', 'name', 'price', 'image'])
+        select = next(sql for sql in queries if 'FROM "api_products"' in sql and 'MAX(' not in sql)
+        self.assertNotIn('description', select)
+        self.assertNotIn('JOIN', select)
+
+        response = self.client.get(f'/api/products/{self.product.pk}/?omit=description,category_name,author_name')
+        self.assertNotIn('description', response.json())
+        self.assertIn('category', response.json())
+
+        with recorded_queries() as queries:
+            response = self.client.get('/api/testimonials/?fields=id,name')
+        self.assertEqual(response.json()['results'], [{'id': Testimonial.objects.get().pk, 'name': 'Ada'}])
+        self.assertFalse([sql for sql in queries if '"content"' in sql])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/news/?fields=id,body')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Unknown field: body']})
+
+        response = self.client.get('/api/products/?fields=id&omit=weight,colour')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'omit': ['Unknown field: weight', 'Unknown field: colour']})
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/?fields=password').status_code, 400)
+
+    def test_unread_columns_are_deferred(self):
+        serializer = ProductSerializer()
+        for name in ('description', 'price', 'image', 'image2', 'image3', 'image4', 'image_srcset', 'created_at'):
+            serializer.fields.pop(name)
+        product = shape_queryset(Products.objects.all(), serializer).get()
+        self.assertEqual(
+            product.get_deferred_fields(),
+            {'description', 'price', 'image', 'image2', 'image3', 'image4', 'image_derivatives', 'created_at', 'updated_at'},
+        )
+        self.assertEqual(product.category.get_deferred_fields(), {
+            'updated_at', 'product_count', 'min_price', 'max_price', 'latest_product_at',
+        })
+        with self.assertNumQueries(0):
+            self.assertEqual((product.category.name, product.author.username), ('Pipes', 'owner'))
+
+    def test_related_fields_do_not_query_per_row(self):
+        category, user = Category.objects.get(), User.objects.get()
+        for path in ('/api/products/?fields=id,category_name,author_name', '/api/products/', '/api/news/?omit=content'):
+            counts = []
+            for _ in range(2):
+                cache.clear()
+                with recorded_queries() as queries:
+                    response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                counts.append(len(queries))
+                # More rows for the second request.
+                for index in range(10):
+                    Products.objects.create(name=f'Pipe {index}', category=category, price=1, description='PVC', author=user)
+                    News.objects.create(title=f'News {index}', content='...', author=user)
+            self.assertEqual(counts[0], counts[1], path)
+        select = next(sql for sql in queries if 'FROM "api_news"' in sql and 'MAX(' not in sql)
+        self.assertIn('JOIN "auth_user"', select)
+        self.assertNotIn('"content"', select)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('owner', password='secret')
+        category = Category.objects.create(name='Pipes')
+        for index in range(5):
+            Products.objects.create(name=f'Pipe {index}', category=category, price=index, description='PVC', author=user)
+        Contact.objects.create(firstName='Ada', lastName='Lovelace', email='ada@example.com', message='Hi, "quote"', category='quote')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_products_stream_as_ndjson(self):
+        response = self.client.get('/api/products/export/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['name'], 'Pipe 0')
+        self.assertEqual(json.loads(lines[0])['category_name'], 'Pipes')
+
+    def test_contacts_stream_as_gzipped_csv(self):
+        response = self.client.get('/api/contacts/export/?output=csv&compression=gzip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="contacts.csv.gz"')
+        rows = list(csv.reader(io.StringIO(gzip.decompress(b''.join(response.streaming_content)).decode())))
+        self.assertEqual(rows[0][:4], ['id', 'firstName', 'lastName', 'email'])
+        self.assertEqual(rows[1][4], 'Hi, "quote"')
+        self.assertEqual(len(rows), 2)
+
+    def test_exports_require_authentication_and_a_known_format(self):
+        self.assertEqual(APIClient().get('/api/contacts/export/').status_code, 401)
+        self.assertEqual(self.client.get('/api/products/export/?output=xml').status_code, 400)
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        # Local storage stands in for Cloudinary.
+        self.settings_override = override_settings(
+            MEDIA_ROOT=f'{self.root}/media',
+            CATALOG_IMPORT_DIR=f'{self.root}/imports',
+            CATALOG_IMPORT_MEDIA_ROOT=f'{self.root}/images',
+        )
+        self.settings_override.enable()
+        os.makedirs(f'{self.root}/images')
+        Image.new('RGB', (4, 4), 'red').save(f'{self.root}/images/pipe.png')
+        with open(f'{self.root}/secret.png', 'wb') as secret:
+            secret.write(b'not for import')
+        self.user = User.objects.create_user('importer', password='secret')
+        Category.objects.create(name='Pipes')
+        Category.objects.create(name='Fittings')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.root)
+
+    def write_manifest(self, name, rows):
+        path = f'{self.root}/{name}'
+        with open(path, 'w', newline='') as manifest:
+            writer = csv.DictWriter(manifest, ['name', 'description', 'price', 'category', 'image', 'image2'])
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def import_catalog(self, path, **options):
+        call_command('import_catalog', path, author='importer', stderr=io.StringIO(), **options)
+        return CatalogImport.objects.get(path=path)
+
+    def test_imports_rows_images_and_reports_errors(self):
+        path = self.write_manifest('catalog.csv', [
+            {'name': 'Pipe', 'description': 'PVC', 'price': '9.5', 'category': 'Pipes', 'image': 'pipe.png'},
+            {'name': 'Elbow', 'description': 'PVC', 'price': '2', 'category': 'Fittings', 'image': '../secret.png'},
+            {'name': 'Tee', 'description': 'PVC', 'price': 'cheap', 'category': 'Fittings'},
+            {'name': 'Valve', 'description': 'Brass', 'price': '30', 'category': 'Valves'},
+            {'name': 'Cap', 'description': 'PVC', 'price': '1', 'category': 'Pipes', 'image2': 'pipe.png'},
+        ])
+        with recorded_queries() as queries:
+            catalog_import = self.import_catalog(path, batch_size=4, workers=2)
+
+        self.assertEqual(catalog_import.status, CatalogImport.STATUS_DONE)
+        self.assertEqual((catalog_import.rows_done, catalog_import.created, catalog_import.failed), (5, 3, 2))
+        self.assertEqual([(error['row'], list(error['errors'])) for error in catalog_import.errors], [
+            (2, ['image']), (3, ['price']), (4, ['category']),
+        ])
+        self.assertEqual(catalog_import.errors[2]['errors']['category'], ['Unknown category: Valves'])
+        # The second batch only names categories the first one looked up.
+        self.assertEqual(sum('FROM "api_category"' in sql for sql in queries), 1)
+
+        pipe = Products.objects.get(name='Pipe')
+        self.assertEqual((pipe.category.name, pipe.price, pipe.author), ('Pipes', 9.5, self.user))
+        self.assertTrue(pipe.image.name.startswith('products/pipes/'))
+        self.assertTrue(default_storage.exists(pipe.image.name))
+        self.assertFalse(Products.objects.get(name='Elbow').image)
+        self.assertTrue(Products.objects.get(name='Cap').image2)
+        self.assertEqual(Job.objects.filter(name='images.derivatives').count(), 2)
+
+    @override_settings(CATALOG_IMPORT_URL_HOSTS=['images.example.com', 'localhost'])
+    def test_image_urls_are_limited_to_public_allowed_hosts(self):
+        with open(f'{self.root}/images/pipe.png', 'rb') as image:
+            content = image.read()
+        public = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('93.184.216.34', 443))]
+        private = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('169.254.169.254', 443))]
+        path = self.write_manifest('catalog.csv', [
+            {'name': 'Pipe', 'description': 'PVC', 'price': '1', 'category': 'Pipes', 'image': 'https://images.example.com/pipe.png'},
+            {'name': 'Elbow', 'description': 'PVC', 'price': '1', 'category': 'Pipes', 'image': 'https://internal.example.com/a.png'},
+            {'name': 'Tee', 'description': 'PVC', 'price': '1', 'category': 'Pipes', 'image': 'http://localhost:8000/a.png'},
+            {'name': 'Cap', 'description': 'PVC', 'price': '1', 'category': 'Pipes', 'image': 'https://images.example.com/b.png'},
+        ])
+        resolved = {'images.example.com': [public, private], 'localhost': [[
+            (socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('127.0.0.1', 8000)),
+        ]]}
+        with mock.patch('api.importing.socket.getaddrinfo', side_effect=lambda host, *args, **kwargs: resolved[host].pop(0)), \
+                mock.patch('api.importing._opener.open', return_value=io.BytesIO(content)) as fetch:
+            catalog_import = self.import_catalog(path, workers=1)
+
+        fetch.assert_called_once_with('https://images.example.com/pipe.png', timeout=30)
+        self.assertTrue(Products.objects.get(name='Pipe').image)
+        self.assertEqual({error['row']: error['errors']['image'][0] for error in catalog_import.errors}, {
+            2: 'Could not load image: Host is not allowed: internal.example.com',
+            3: 'Could not load image: Host resolves to a non-public address: 127.0.0.1',
+            4: 'Could not load image: Host resolves to a non-public address: 169.254.169.254',
+        })
+        # Redirects are answered with an HTTPError instead of being followed.
+        self.assertIsNone(NoRedirects().redirect_request(None, None, 302, 'Found', {}, 'http://127.0.0.1/'))
+
+    def test_interrupted_import_resumes_after_last_batch(self):
+        path = self.write_manifest('catalog.csv', [
+            {'name': f'Pipe {index}', 'description': 'PVC', 'price': index, 'category': 'Pipes'}
+            for index in range(5)
+        ])
+        with mock.patch('api.importing.bump_generation', side_effect=[None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                self.import_catalog(path, batch_size=2)
+        catalog_import = CatalogImport.objects.get()
+        self.assertEqual((catalog_import.status, catalog_import.rows_done), (CatalogImport.STATUS_FAILED, 4))
+
+        catalog_import = self.import_catalog(path, batch_size=2)
+        self.assertEqual(CatalogImport.objects.count(), 1)
+        self.assertEqual((catalog_import.status, catalog_import.created), (CatalogImport.STATUS_DONE, 5))
+        self.assertEqual(Products.objects.count(), 5)
+
+    def test_endpoint_queues_import_of_uploaded_manifest(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        lines = [
+            json.dumps({'name': 'Pipe', 'description': 'PVC', 'price': 9.5, 'category': 'Pipes', 'image': 'pipe.png'}),
+            'not json',
+        ]
+        manifest = SimpleUploadedFile('catalog.ndjson', '\n'.join(lines).encode())
+        response = client.post('/api/products/import/', {'manifest': manifest})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], CatalogImport.STATUS_PENDING)
+        url = f"/api/products/import/{response.data['id']}/"
+
+        run_pending()
+        response = client.get(url)
+        self.assertEqual((response.data['status'], response.data['created'], response.data['failed']), ('done', 1, 1))
+        self.assertEqual(response.data['errors'], [{'row': 2, 'errors': {'non_field_errors': ['Row is not a JSON object']}}])
+        self.assertEqual(os.listdir(f'{self.root}/imports'), [])
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', password='secret'))
+        self.assertEqual(other.get(url).status_code, 404)
+        manifest = SimpleUploadedFile('catalog.xml', b'<catalog/>')
+        self.assertEqual(client.post('/api/products/import/', {'manifest': manifest}).status_code, 400)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='secret')
+        category = Category.objects.create(name='Pipes')
+        for index in range(3):
+            Products.objects.create(
+                name=f'Pipe {index}', category=category, price=index, description='PVC', author=self.owner,
+                image=f'products/pipes/{index}.png',
+            )
+        self.product = Products.objects.order_by('pk').first()
+        # Drop the derivative jobs queued by the saves; the images do not exist.
+        Job.objects.all().delete()
+        self.client = APIClient(HTTP_HOST='nmppolymer-api.onrender.com')
+
+    def test_list_and_detail_match_the_drf_views(self):
+        async_page = self.client.get('/api/products/async/?page_size=2').json()
+        page = self.client.get('/api/products/?page_size=2').json()
+        self.assertEqual(async_page['results'], page['results'])
+        self.assertIsNotNone(async_page['next'])
+        rest = self.client.get(async_page['next']).json()
+        self.assertEqual([item['name'] for item in rest['results']], ['Pipe 0'])
+
+        response = self.client.get(f'/api/products/async/{self.product.pk}/')
+        self.assertEqual(response.json(), self.client.get(f'/api/products/{self.product.pk}/').json())
+        self.assertEqual(self.client.get('/api/products/async/999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/async/?cursor=bogus').status_code, 404)
+
+    def test_delete_checks_token_and_owner_and_queues_media(self):
+        url = f'/api/products/async/delete/{self.product.pk}/'
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+        other = User.objects.create_user('other', password='secret')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(other).access_token}')
+        self.assertEqual(self.client.delete(url).status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.owner).access_token}')
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Products.objects.filter(pk=self.product.pk).exists())
+        self.assertEqual(list(Job.objects.values_list('payload__name', flat=True)), ['products/pipes/0.png'])
+
+    @override_settings(MEDIA_CLIENT='api.tests.RecordingMediaClient')
+    def test_media_deletions_run_concurrently(self):
+        RecordingMediaClient.destroyed = []
+        for product in Products.objects.all():
+            enqueue_media_deletion(product.image)
+        threads = []
+        with mock.patch.object(RecordingMediaClient, 'destroy', autospec=True, side_effect=lambda *args, **kwargs: threads.append(threading.current_thread().name)):
+            self.assertEqual(run_pending(concurrency=4), (3, 0))
+        self.assertTrue(all(name.startswith('jobs') for name in threads))
+        self.assertFalse(Job.objects.exists())
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    The replica is a copy of the test database taken in setUp, so it lags
+    behind every later write. The copy needs the data committed, hence
+    TransactionTestCase.
+    """
+    # Resolved in setUpClass, once the replica alias exists.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.root, 'replica.sqlite3')
+        connections.settings[REPLICA] = {**connections.settings['default'], 'NAME': cls.path}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        shutil.rmtree(cls.root)
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='secret')
+        self.category = Category.objects.create(name='Pipes')
+        self.product = Products.objects.create(
+            name='Pipe', category=self.category, price=1, description='PVC', author=self.owner,
+        )
+        Job.objects.all().delete()
+        connections[REPLICA].close()
+        replica = sqlite3.connect(self.path)
+        connection.ensure_connection()
+        connection.connection.backup(replica)
+        replica.close()
+        _replica_health.update(checked_at=None, healthy=True)
+        cache.clear()
+        self.client = APIClient(HTTP_HOST='nmppolymer-api.onrender.com')
+
+    def rename(self, client):
+        return client.patch(f'/api/products/update/{self.product.pk}/', {'name': 'Renamed'})
+
+    def test_reads_go_to_the_replica(self):
+        self.product.name = 'Renamed'
+        self.product.save()
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').json()['name'], 'Pipe')
+        created = Products.objects.create(name='New', category=self.category, price=2, description='PVC', author=self.owner)
+        self.assertEqual(self.client.get(f'/api/products/{created.pk}/').status_code, 404)
+
+    def test_writer_reads_its_writes_by_cookie(self):
+        # Forced authentication sends no token, so only the cookie can route reads.
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.rename(self.client).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/products/{self.product.pk}/').json()['name'], 'Renamed')
+        other = APIClient(HTTP_HOST='nmppolymer-api.onrender.com')
+        self.assertEqual(other.get(f'/api/products/async/{self.product.pk}/').json()['name'], 'Pipe')
+
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(f'/api/products/async/{self.product.pk}/').json()['name'], 'Pipe')
+
+    def test_writer_reads_its_writes_by_token(self):
+        token = RefreshToken.for_user(self.owner).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.rename(self.client).status_code, 200)
+        # Another client without the cookie, with the same user's token.
+        other = APIClient(HTTP_HOST='nmppolymer-api.onrender.com')
+        other.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(other.get(f'/api/products/async/{self.product.pk}/').json()['name'], 'Renamed')
+
+        with override_settings(READ_YOUR_WRITES_SECONDS=0):
+            cache.clear()
+            self.assertEqual(other.get(f'/api/products/async/{self.product.pk}/').json()['name'], 'Pipe')
+
+    def test_unreachable_replica_is_skipped(self):
+        self.product.name = 'Renamed'
+        self.product.save()
+        with mock.patch.object(connections[REPLICA], 'ensure_connection', side_effect=DatabaseError):
+            with self.assertLogs('api.routers', 'WARNING'):
+                response = self.client.get(f'/api/products/async/{self.product.pk}/')
+        self.assertEqual(response.json()['name'], 'Renamed')
+        # The failure is remembered until the next health check.
+        self.assertEqual(self.client.get(f'/api/products/async/{self.product.pk}/').json()['name'], 'Renamed')
+        _replica_health['checked_at'] = None
+        self.assertEqual(self.client.get(f'/api/products/async/{self.product.pk}/').json()['name'], 'Pipe')
+
+
+class CategoryStatsTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', password='secret')
+        self.pipes = Category.objects.create(name='Pipes')
+        self.fittings = Category.objects.create(name='Fittings')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def create(self, price, category=None):
+        return Products.objects.create(
+            name='Pipe', category=category or self.pipes, price=price, description='PVC', author=self.owner,
+        )
+
+    def stats(self, category):
+        data = self.client.get(f'/api/categories/{category.pk}/?stats=true').data
+        return data['product_count'], data['min_price'], data['max_price']
+
+    def test_statistics_follow_saves_and_deletes(self):
+        cheap, middle, dear = self.create(5), self.create(10), self.create(20)
+        self.assertEqual(self.stats(self.pipes), (3, 5, 20))
+        self.assertEqual(Category.objects.get(pk=self.pipes.pk).latest_product_at, dear.created_at)
+
+        cheap.price = 15
+        cheap.save()
+        self.assertEqual(self.stats(self.pipes), (3, 10, 20))
+        dear.category = self.fittings
+        dear.save()
+        self.assertEqual((self.stats(self.pipes), self.stats(self.fittings)), ((2, 10, 15), (1, 20, 20)))
+        middle.delete()
+        self.assertEqual(self.stats(self.pipes), (1, 15, 15))
+        Products.objects.get(pk=cheap.pk).delete()
+        self.assertEqual(self.stats(self.pipes), (0, None, None))
+        self.assertEqual(drifted(), [])
+
+    def test_reads_do_not_aggregate(self):
+        self.create(5)
+        cache.clear()
+        with recorded_queries() as statements:
+            response = self.client.get('/api/categories/?stats=true')
+        self.assertEqual(response.data[0]['product_count'], 1)
+        self.assertFalse([sql for sql in statements if 'COUNT(' in sql or 'GROUP BY' in sql])
+        self.assertNotIn('product_count', self.client.get('/api/categories/').data[0])
+
+    def test_failed_save_rolls_statistics_back(self):
+        product = self.create(5)
+        with mock.patch('api.category_stats.bump_generation', side_effect=RuntimeError):
+            # save() joins the enclosing transaction; a savepoint keeps the test's usable.
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                product.price = 1
+                product.save()
+        self.assertEqual(Products.objects.get(pk=product.pk).price, 5)
+        self.assertEqual(drifted(), [])
+
+    def test_generation_is_bumped_when_the_change_commits(self):
+        product = self.create(5)
+        generation = get_generations([Category])
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                refresh([self.pipes.pk])
+                raise RuntimeError
+        self.assertEqual(get_generations([Category]), generation)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with deferred():
+                product.price = 7
+                product.save()
+            self.assertEqual(get_generations([Category]), generation)
+        self.assertNotEqual(get_generations([Category]), generation)
+
+    def test_bulk_endpoints_keep_statistics(self):
+        item = {'name': 'Pipe', 'description': 'PVC', 'price': 8, 'category': self.pipes.pk}
+        response = self.client.post('/api/products/bulk/create/', [item, {**item, 'price': 3}], format='json')
+        ids = [product['id'] for product in response.data]
+        self.assertEqual(self.stats(self.pipes), (2, 3, 8))
+        self.client.patch('/api/products/bulk/update/', [{'id': ids[0], 'category': self.fittings.pk}], format='json')
+        self.assertEqual((self.stats(self.pipes), self.stats(self.fittings)), ((1, 3, 3), (1, 8, 8)))
+        self.client.post('/api/products/bulk/delete/', {'ids': ids}, format='json')
+        self.assertEqual((self.stats(self.pipes), self.stats(self.fittings)), ((0, None, None), (0, None, None)))
+        self.assertEqual(drifted(), [])
+
+    def test_reconcile_repairs_drift(self):
+        self.create(5)
+        Category.objects.filter(pk=self.pipes.pk).update(product_count=7, max_price=None)
+        out = io.StringIO()
+        call_command('reconcile_category_stats', '--dry-run', stdout=out)
+        self.assertIn('product_count 7 -> 1', out.getvalue())
+        self.assertEqual(len(drifted()), 1)
+        call_command('reconcile_category_stats', stdout=out)
+        self.assertEqual(drifted(), [])
+        self.assertEqual(self.stats(self.pipes), (1, 5, 5))
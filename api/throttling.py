@@ -0,0 +1,95 @@
+"""
+Protection for the write endpoints anyone can call: contact form,
+registration and token views.
+
+TokenBucketThrottle rejects bursts before the view runs, and
+DuplicateSubmissionMixin answers repeated identical submissions from the
+cache. Neither touches the database. State lives in the default cache, so
+limits are shared between worker processes when that cache is (Redis).
+"""
+import hashlib
+import json
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+BUCKET_KEY = 'api:throttle:{}:{}'
+SUBMISSION_KEY = 'api:submission:{}:{}'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60): the bucket size and the seconds it takes to refill."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    A token bucket per client IP and view ``throttle_scope``. The rate comes
+    from DEFAULT_THROTTLE_RATES: '5/min' allows a burst of 5, then one
+    request every 12 seconds. Views without a scope or rate are not
+    throttled, nor is anything when THROTTLE_ENABLED is off.
+
+    The bucket is stored as one timestamp, the time it will be full again
+    (the generic cell rate algorithm), so a request costs one cache read and
+    one write. Two concurrent requests from the same client can both read
+    the old value and let one extra request through; DRF's own throttles
+    have the same race, and it keeps this working on any cache backend.
+    """
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if rate is None or not settings.THROTTLE_ENABLED:
+            return True
+
+        capacity, period = parse_rate(rate)
+        key = BUCKET_KEY.format(scope, self.get_ident(request))
+        now = time.time()
+        full_at = max(cache.get(key, now), now) + period / capacity
+        if full_at - now > period:
+            self.retry_after = full_at - now - period
+            return False
+        cache.set(key, full_at, math.ceil(full_at - now))
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class DuplicateSubmissionMixin:
+    """
+    For create views: a POST whose ``duplicate_fields`` match a successful
+    one from the last DUPLICATE_SUBMISSION_WINDOW seconds gets the first
+    response's body back with 200, from the cache, instead of a new row.
+    Values are compared ignoring case and surrounding or repeated
+    whitespace.
+    """
+    duplicate_fields = ()
+
+    def submission_key(self, data):
+        values = [' '.join(str(data.get(field, '')).split()).casefold() for field in self.duplicate_fields]
+        digest = hashlib.sha256(json.dumps(values).encode()).hexdigest()
+        return SUBMISSION_KEY.format(type(self).__name__, digest)
+
+    def create(self, request, *args, **kwargs):
+        window = settings.DUPLICATE_SUBMISSION_WINDOW
+        if not window:
+            return super().create(request, *args, **kwargs)
+
+        key = self.submission_key(request.data)
+        previous = cache.get(key)
+        if previous is not None:
+            return Response(previous, status=status.HTTP_200_OK)
+        response = super().create(request, *args, **kwargs)
+        if response.status_code == status.HTTP_201_CREATED:
+            cache.set(key, dict(response.data), window)
+        return response
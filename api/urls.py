@@ -1,7 +1,10 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
+    # Homepage
+    path('home/', views.HomepageBundle.as_view(), name='homepage'),
+
     # User Management
     path('users/', views.UserList.as_view(), name='user_list'),
     # path('users/<int:pk>/', views.UserDetail.as_view(), name='user_detail'),
@@ -18,11 +21,20 @@ urlpatterns = [
     path('products/', views.ProductList.as_view(), name='product_list'),
     path('products/create/', views.ProductCreate.as_view(), name='product_create'),
     path('products/<int:pk>/', views.ProductDetail.as_view(), name='product_detail'),
+    path('products/export/', views.ProductExport.as_view(), name='product_export'),
+    path('products/import/', views.ProductImport.as_view(), name='product_import'),
+    path('products/import/<uuid:pk>/', views.ProductImportDetail.as_view(), name='product_import_detail'),
+    path('products/async/', async_views.AsyncProductList.as_view(), name='async_product_list'),
+    path('products/async/<int:pk>/', async_views.AsyncProductDetail.as_view(), name='async_product_detail'),
+    path('products/async/delete/<int:pk>/', async_views.AsyncProductDelete.as_view(), name='async_product_delete'),
     path('products/update/<int:pk>/', views.ProductUpdate.as_view(), name='product_update'),
     path('products/delete/<int:pk>/', views.ProductDelete.as_view(), name='product_delete'),
     path('products/my/', views.ProductListByUser.as_view(), name='my_products'),  # Get user-specific products
     path('products/category/<int:pk>/', views.ProductListByCategory.as_view(), name='products_by_category'),
     path('products/search/', views.ProductListBySearch.as_view(), name='products_by_search'),
+    path('products/bulk/create/', views.ProductBulkCreate.as_view(), name='product_bulk_create'),
+    path('products/bulk/update/', views.ProductBulkUpdate.as_view(), name='product_bulk_update'),
+    path('products/bulk/delete/', views.ProductBulkDelete.as_view(), name='product_bulk_delete'),
 
     # Sliders
     path('sliders/', views.SliderList.as_view(), name='slider_list'),
@@ -30,6 +42,9 @@ urlpatterns = [
     path('sliders/<int:pk>/', views.SliderDetail.as_view(), name='slider_detail'),
     path('sliders/update/<int:pk>/', views.SliderUpdate.as_view(), name='slider_update'),   
     path('sliders/delete/<int:pk>/', views.SliderDelete.as_view(), name='slider_delete'),
+    path('sliders/uploads/', views.SliderUploadCreate.as_view(), name='slider_upload_create'),
+    path('sliders/uploads/<uuid:pk>/', views.SliderUploadChunk.as_view(), name='slider_upload'),
+    path('sliders/uploads/<uuid:pk>/complete/', views.SliderUploadComplete.as_view(), name='slider_upload_complete'),
     
     # Contacts
     path('contacts/', views.ContactList.as_view(), name='contact_list'),
@@ -37,6 +52,13 @@ urlpatterns = [
     path('contacts/<int:pk>/', views.ContactDetail.as_view(), name='contact_detail'),
     path('contacts/update/<int:pk>/', views.ContactUpdate.as_view(), name='contact_update'),
     path('contacts/delete/<int:pk>/', views.ContactDelete.as_view(), name='contact_delete'),
+    path('contacts/category/<str:category>/', views.ContactListByCategory.as_view(), name='contacts_by_category'),
+    path('contacts/export/', views.ContactExport.as_view(), name='contact_export'),
+    path('contacts/summary/', views.ContactSummary.as_view(), name='contact_summary'),
+    path('contacts/mark-read/', views.ContactMarkRead.as_view(), name='contact_mark_read'),
+    path('contacts/mark-unread/', views.ContactMarkUnread.as_view(), name='contact_mark_unread'),
+    path('contacts/mark-responded/', views.ContactMarkResponded.as_view(), name='contact_mark_responded'),
+    path('contacts/mark-unresponded/', views.ContactMarkUnresponded.as_view(), name='contact_mark_unresponded'),
     
 
     # News
@@ -45,6 +67,9 @@ urlpatterns = [
     path('news/<int:pk>/', views.NewsDetail.as_view(), name='news_detail'),
     path('news/update/<int:pk>/', views.NewsUpdate.as_view(), name='news_update'),
     path('news/delete/<int:pk>/', views.NewsDelete.as_view(), name='news_delete'),
+    path('news/async/', async_views.AsyncNewsList.as_view(), name='async_news_list'),
+    path('news/async/<int:pk>/', async_views.AsyncNewsDetail.as_view(), name='async_news_detail'),
+    path('news/async/delete/<int:pk>/', async_views.AsyncNewsDelete.as_view(), name='async_news_delete'),
     
     # Testimonials
     path('testimonials/', views.TestimonialList.as_view(), name='testimonial_list'),
@@ -1,31 +1,102 @@
+import fcntl
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
 
+from django.db import transaction
+from django.db.models import Count, Value
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from . import category_stats
+from .cache import CachedResponseMixin, bump_generation, cached_query
+from .export import FORMATS, export_filename, stream_export
+from .importing import format_for
+from .jobs import enqueue, enqueue_media_deletion
+from .mixins import ConditionalGetMixin, SerializerQuerysetMixin, SparseFieldsMixin, shape_queryset
+from .models import CatalogImport, Contact, News, Products, Category, Slider, Testimonial, UploadSession
+from .pagination import KeysetPagination
+from .rendering import FastListMixin
+from .search import search_products
+from .throttling import DuplicateSubmissionMixin, TokenBucketThrottle
+from .serializers import BulkProductSerializer, CatalogImportSerializer, CategoryCountSerializer, CategoryStatsSerializer, ContactSerializer, NewsSerializer, ProductSearchSerializer, ProductSerializer, CategorySerializer, TestimonialSerializer, UploadSessionSerializer, UserSerializer, SliderSerializer
+
+# Homepage API
+class HomepageBundle(CachedResponseMixin, APIView):
+    """
+    Everything the landing page needs in one response: active sliders,
+    categories with product counts, and the latest products, news and
+    testimonials. One query per section.
+    """
+    permission_classes = [AllowAny]
+    cache_models = (Slider, Category, Products, News, Testimonial)
+    default_limit = 8
+    max_limit = 50
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get(self, request, *args, **kwargs):
+        limit = self.get_limit()
+        context = {'request': request}
+        product_serializer = ProductSerializer(many=True, context=context)
+        news_serializer = NewsSerializer(many=True, context=context)
+
+        sliders = Slider.objects.filter(is_active=True).order_by('-created_at', '-id')
+        categories = Category.objects.order_by('name')
+        products = shape_queryset(Products.objects.order_by('-created_at', '-id'), product_serializer.child)
+        news = shape_queryset(News.objects.order_by('-created_at', '-id'), news_serializer.child)
+        testimonials = Testimonial.objects.order_by('-created_at', '-id')
+
+        return Response({
+            'sliders': SliderSerializer(sliders, many=True, context=context).data,
+            'categories': CategoryCountSerializer(categories, many=True, context=context).data,
+            'products': ProductSerializer(products[:limit], many=True, context=context).data,
+            'news': NewsSerializer(news[:limit], many=True, context=context).data,
+            'testimonials': TestimonialSerializer(testimonials[:limit], many=True, context=context).data,
+        })
 
-from .models import Contact, News, Products, Category, Slider, Testimonial
-from .serializers import ContactSerializer, NewsSerializer, ProductSerializer, CategorySerializer, TestimonialSerializer, UserSerializer, SliderSerializer
-import os
-import cloudinary
-from cloudinary.uploader import destroy
 
 # User APIs
 class CreateUserView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'register'
     def perform_create(self, serializer):
         if serializer.is_valid():
             serializer.save()
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)  
 
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'token'
+
+class ThrottledTokenRefreshView(TokenRefreshView):
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'token'
+
 class UserList(generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    pagination_ordering = ('-date_joined', '-id')
 
 class UserDetail(generics.RetrieveAPIView):
     queryset = User.objects.all()
@@ -45,33 +116,56 @@ class UserUpdate(generics.UpdateAPIView):
 
 
 # Product APIs
-class ProductList(generics.ListAPIView):
+PRODUCT_MEDIA_FIELDS = ['image', 'image2', 'image3', 'image4']
+
+def delete_product_media(product):
+    for field in PRODUCT_MEDIA_FIELDS:
+        enqueue_media_deletion(getattr(product, field))
+
+class ProductList(CachedResponseMixin, ConditionalGetMixin, FastListMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.ListAPIView):
     queryset = Products.objects.all().order_by('-created_at')
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    cache_models = (Products, Category)
 
-class ProductListByCategory(generics.ListAPIView):
+class ProductListByCategory(ConditionalGetMixin, FastListMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    cache_models = (Products, Category)
 
     def get_queryset(self):
         category_id = self.kwargs.get('pk')
         return Products.objects.filter(category=category_id)
 
-class ProductListBySearch(generics.ListAPIView):
-    serializer_class = ProductSerializer
+class ProductListBySearch(ConditionalGetMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.ListAPIView):
     permission_classes = [AllowAny]
+    cache_models = (Products, Category)
+
+    @property
+    def search_query(self):
+        return self.request.GET.get('search','').strip()
+
+    @property
+    def pagination_ordering(self):
+        if self.search_query:
+            return ('-search_rank', '-id')
+        return KeysetPagination.ordering
+
+    def get_serializer_class(self):
+        if self.search_query:
+            return ProductSearchSerializer
+        return ProductSerializer
 
     def get_queryset(self):
-        search_query = self.request.GET.get('search','').strip()
-        if search_query:
-            return Products.objects.filter(name__icontains=search_query)
+        if self.search_query:
+            return search_products(Products.objects.all(), self.search_query)
         return Products.objects.all()
 
-class ProductDetail(generics.RetrieveAPIView):
+class ProductDetail(CachedResponseMixin, ConditionalGetMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.RetrieveAPIView):
     queryset = Products.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    cache_models = (Products, Category)
 
 class ProductCreate(generics.CreateAPIView):
     queryset = Products.objects.all()
@@ -85,13 +179,13 @@ class ProductCreate(generics.CreateAPIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class ProductUpdate(generics.UpdateAPIView):
-    queryset = Products.objects.all()
+    queryset = Products.objects.select_related('author', 'category')
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
 
     def perform_update(self, serializer):
-        product = self.get_object()
-        if product.author != self.request.user:
+        product = serializer.instance
+        if product.author_id != self.request.user.id:
             return Response({'error': 'You do not have permission to update this product'}, status=status.HTTP_403_FORBIDDEN)
         if serializer.is_valid():
             serializer.save()
@@ -107,36 +201,232 @@ class ProductDelete(generics.DestroyAPIView):
         product = self.get_object()
         
         # Check permission
-        if product.author != request.user:
+        if product.author_id != request.user.id:
             return Response(
                 {'error': 'You do not have permission to delete this product'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Delete associated media files from Cloudinary
-        media_fields = ['image', 'image2', 'image3', 'image4']
-        for field in media_fields:
-            media_file = getattr(product, field)
-            if media_file:
-                try:
-                    # Extract public_id from the image URL
-                    public_id = os.path.splitext(os.path.basename(media_file.name))[0]
-                    
-                    # Delete the file from Cloudinary
-                    cloudinary.uploader.destroy(public_id)
-                except Exception as e:
-                    print(f"Error deleting media file {field}: {str(e)}")
-        
-        # Delete the product
-        self.perform_destroy(product)
+        # Queue deletion of the associated media files and delete the product
+        with transaction.atomic():
+            delete_product_media(product)
+            self.perform_destroy(product)
         return Response(
             {'message': 'Product and associated media files deleted successfully'}, 
             status=status.HTTP_204_NO_CONTENT
         )
 
-class ProductListByUser(generics.ListAPIView):
+class ProductBulkView(APIView):
+    """
+    Base for the batch endpoints. The body is a JSON array (or {"ids": [...]}
+    for deletes). Batches are all-or-nothing: if any item fails validation,
+    does not exist or belongs to another user, nothing is written and the
+    response lists the errors by index.
+    """
+    permission_classes = [IsAuthenticated]
+    max_batch_size = 500
+
+    def get_items(self, request, key=None):
+        items = request.data.get(key) if key and isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return None, Response({'error': 'Expected a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return None, Response(
+                {'error': f'At most {self.max_batch_size} items per request'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return items, None
+
+    def get_serializer(self, items, **kwargs):
+        category_ids = set()
+        for item in items:
+            try:
+                category_ids.add(int(item['category']))
+            except (KeyError, TypeError, ValueError):
+                pass
+        context = {
+            'request': self.request,
+            'preloaded': {'category': Category.objects.in_bulk(category_ids)},
+        }
+        return BulkProductSerializer(data=items, many=True, context=context, **kwargs)
+
+    def get_owned_products(self, ids):
+        """
+        Fetch the batch in one query. Ids that don't exist make the response
+        a 404 and products of other users a 403, with the errors by index.
+        """
+        products = Products.objects.select_related('category', 'author').in_bulk(ids)
+        missing = [
+            {'index': index, 'id': pk, 'errors': {'id': ['Product not found']}}
+            for index, pk in enumerate(ids) if pk not in products
+        ]
+        if missing:
+            return None, Response({'errors': missing}, status=status.HTTP_404_NOT_FOUND)
+        forbidden = [
+            {'index': index, 'id': pk, 'errors': {'id': ['You do not have permission to modify this product']}}
+            for index, pk in enumerate(ids) if products[pk].author_id != self.request.user.id
+        ]
+        if forbidden:
+            return None, Response({'errors': forbidden}, status=status.HTTP_403_FORBIDDEN)
+        return products, None
+
+    def get_ids(self, items):
+        ids, errors = [], []
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else item
+            if isinstance(pk, bool) or not isinstance(pk, int):
+                errors.append({'index': index, 'errors': {'id': ['A valid integer is required']}})
+            ids.append(pk)
+        return ids, errors
+
+    def validation_errors(self, serializer):
+        return [
+            {'index': index, 'errors': errors}
+            for index, errors in enumerate(serializer.errors) if errors
+        ]
+
+class ProductBulkCreate(ProductBulkView):
+    def post(self, request, *args, **kwargs):
+        items, error_response = self.get_items(request)
+        if error_response:
+            return error_response
+        serializer = self.get_serializer(items)
+        if not serializer.is_valid():
+            return Response({'errors': self.validation_errors(serializer)}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = [Products(author=request.user, **data) for data in serializer.validated_data]
+        with transaction.atomic():
+            Products.objects.bulk_create(products)
+            category_stats.add_products(products)
+        # bulk_create() does not send post_save.
+        bump_generation(Products)
+        return Response(
+            ProductSerializer(products, many=True, context={'request': request}).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+class ProductBulkUpdate(ProductBulkView):
+    def patch(self, request, *args, **kwargs):
+        items, error_response = self.get_items(request)
+        if error_response:
+            return error_response
+        ids, errors = self.get_ids(items)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        if len(set(ids)) != len(ids):
+            return Response({'error': 'Duplicate ids in batch'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(items, partial=True)
+        if not serializer.is_valid():
+            return Response({'errors': self.validation_errors(serializer)}, status=status.HTTP_400_BAD_REQUEST)
+        products, error_response = self.get_owned_products(ids)
+        if error_response:
+            return error_response
+
+        now = timezone.now()
+        fields = {'updated_at'}
+        categories = {product.category_id for product in products.values()}
+        for pk, data in zip(ids, serializer.validated_data):
+            product = products[pk]
+            for attr, value in data.items():
+                setattr(product, attr, value)
+            product.updated_at = now
+            fields.update(data)
+        updated = [products[pk] for pk in ids]
+        with transaction.atomic():
+            Products.objects.bulk_update(updated, sorted(fields))
+            if fields & {'category', 'price'}:
+                category_stats.refresh(categories | {product.category_id for product in updated})
+        # bulk_update() does not send post_save.
+        bump_generation(Products)
+        return Response(ProductSerializer(updated, many=True, context={'request': request}).data)
+
+class ProductBulkDelete(ProductBulkView):
+    def post(self, request, *args, **kwargs):
+        items, error_response = self.get_items(request, key='ids')
+        if error_response:
+            return error_response
+        ids, errors = self.get_ids(items)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        products, error_response = self.get_owned_products(ids)
+        if error_response:
+            return error_response
+
+        with transaction.atomic(), category_stats.deferred():
+            for product in products.values():
+                delete_product_media(product)
+            deleted, _ = Products.objects.filter(pk__in=products.keys()).delete()
+        return Response({'message': f'{deleted} products deleted successfully', 'deleted': deleted}, status=status.HTTP_200_OK)
+
+class ProductImport(generics.GenericAPIView):
+    """
+    Start a catalog import (see api/importing.py): POST the manifest as the
+    multipart file ``manifest``, a .csv or .ndjson file or with ``format``
+    set. The import runs in the job queue and resumes after a failure; GET
+    products/import/<id>/ for its progress and row errors.
+    """
+    serializer_class = CatalogImportSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        manifest = request.FILES.get('manifest')
+        if manifest is None:
+            return Response({'error': 'Upload the manifest as "manifest"'}, status=status.HTTP_400_BAD_REQUEST)
+        manifest_format = request.data.get('format') or format_for(manifest.name)
+        if manifest_format not in ('csv', 'ndjson'):
+            return Response({'error': 'format must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+
+        catalog_import = CatalogImport(author=request.user, format=manifest_format)
+        catalog_import.path = os.path.join(settings.CATALOG_IMPORT_DIR, f'{catalog_import.pk}.{manifest_format}')
+        os.makedirs(settings.CATALOG_IMPORT_DIR, exist_ok=True)
+        with open(catalog_import.path, 'wb') as destination:
+            for chunk in manifest.chunks():
+                destination.write(chunk)
+        with transaction.atomic():
+            catalog_import.save()
+            enqueue('catalog.import', {'pk': str(catalog_import.pk)})
+        return Response(self.get_serializer(catalog_import).data, status=status.HTTP_202_ACCEPTED)
+
+class ProductImportDetail(generics.RetrieveAPIView):
+    serializer_class = CatalogImportSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return CatalogImport.objects.filter(author=self.request.user)
+
+class ExportView(APIView):
+    """
+    Stream every row of ``export_name`` (see api/export.py) as
+    ?output=ndjson (default) or ?output=csv, gzipped with
+    ?compression=gzip. Rows are fetched and encoded a chunk at a time.
+    """
+    permission_classes = [IsAuthenticated]
+    export_name = None
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        compression = request.query_params.get('compression')
+        if output not in FORMATS:
+            return Response({'error': f"output must be one of: {', '.join(FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        if compression not in (None, 'gzip'):
+            return Response({'error': 'compression must be gzip'}, status=status.HTTP_400_BAD_REQUEST)
+
+        compress = compression == 'gzip'
+        response = StreamingHttpResponse(
+            stream_export(self.export_name, output, compress, context={'request': request}),
+            content_type='application/gzip' if compress else FORMATS[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(self.export_name, output, compress)}"'
+        return response
+
+class ProductExport(ExportView):
+    export_name = 'products'
+
+class ProductListByUser(ConditionalGetMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    cache_models = (Products, Category)
 
     def get_queryset(self):
         return Products.objects.filter(author=self.request.user)
@@ -154,10 +444,24 @@ class CreateCategoryView(generics.CreateAPIView):
             raise Response({'error': 'Category already exists'}, status=status.HTTP_400_BAD_REQUEST)
         serializer.save()
 
-class CategoryList(generics.ListAPIView):
+class CategoryStatsMixin:
+    """
+    ``?stats=true`` adds each category's product_count, min_price, max_price
+    and latest_product_at, which are stored on the category
+    (api/category_stats.py) rather than aggregated per request.
+    """
+
+    def get_serializer_class(self):
+        if self.request.query_params.get('stats', '').lower() in ('1', 'true', 'yes'):
+            return CategoryStatsSerializer
+        return CategorySerializer
+
+class CategoryList(CategoryStatsMixin, CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     queryset = Category.objects.all()
-    serializer_class = CategorySerializer
     permission_classes = [AllowAny]
+    cache_models = (Category,)
+    # Categories feed the navigation menu and are few, so return them all.
+    pagination_class = None
 
 class CategoryUpdate(generics.UpdateAPIView):
     queryset = Category.objects.all()
@@ -174,9 +478,8 @@ class CategoryDelete(generics.DestroyAPIView):
         self.perform_destroy(category)
         return Response({'message': 'Category deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
-class CategoryDetail(generics.RetrieveAPIView):
+class CategoryDetail(CategoryStatsMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Category.objects.all()
-    serializer_class = CategorySerializer
     permission_classes = [AllowAny]
 
 
@@ -191,12 +494,13 @@ class SliderCreate(generics.CreateAPIView):
             serializer.save(author=self.request.user)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-class SliderList(generics.ListAPIView):
+class SliderList(CachedResponseMixin, ConditionalGetMixin, generics.ListAPIView):
     queryset = Slider.objects.all().order_by('-created_at')
     serializer_class = SliderSerializer
     permission_classes = [AllowAny]
+    cache_models = (Slider,)
 
-class SliderDetail(generics.RetrieveAPIView):
+class SliderDetail(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Slider.objects.all()
     serializer_class = SliderSerializer
     permission_classes = [AllowAny]
@@ -207,8 +511,8 @@ class SliderUpdate(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def perform_update(self, serializer):
-        slider = self.get_object()
-        if slider.author != self.request.user:
+        slider = serializer.instance
+        if slider.author_id != self.request.user.id:
             return Response({'error': 'You do not have permission to update this slider'}, status=status.HTTP_403_FORBIDDEN)
         if serializer.is_valid():
             serializer.save()
@@ -222,17 +526,145 @@ class SliderDelete(generics.DestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         slider = self.get_object()
-        if slider.author != request.user:
+        if slider.author_id != request.user.id:
             return Response({'error': 'You do not have permission to delete this slider'}, status=status.HTTP_403_FORBIDDEN)
-        self.perform_destroy(slider)
+        with transaction.atomic():
+            enqueue_media_deletion(slider.video, resource_type='video')
+            self.perform_destroy(slider)
         return Response({'message': 'Slider deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
+# Resumable slider uploads
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+class SliderUploadCreate(generics.CreateAPIView):
+    """
+    Start a resumable upload by declaring the file name and size. The
+    extension and size limits are checked here, before any bytes are sent.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        session = serializer.save(author=self.request.user)
+        os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+        open(session.temp_path, 'wb').close()
+
+class SliderUploadChunk(generics.RetrieveAPIView):
+    """
+    GET returns the number of bytes received so far (``offset``). PUT sends
+    the next chunk as the raw request body, starting at that offset:
+
+        PUT /api/sliders/uploads/<id>/
+        Content-Range: bytes 0-8388607/52428800
+
+    The body is streamed to disk in small reads, so memory use does not
+    depend on the chunk size. After a dropped connection, GET the offset
+    and resume from there.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+    read_size = 64 * 1024
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(author=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        response['Upload-Offset'] = str(response.data['offset'])
+        return response
+
+    def put(self, request, *args, **kwargs):
+        session = self.get_object()
+        match = CONTENT_RANGE.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+        if not match:
+            return Response({'error': 'Content-Range header required: bytes start-end/total'}, status=status.HTTP_400_BAD_REQUEST)
+        start, end, total = map(int, match.groups())
+        length = end - start + 1
+        if total != session.size or end < start or end >= session.size:
+            return Response({'error': 'Content-Range does not match the upload'}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+            return Response({'error': 'Chunk is too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if int(request.META.get('CONTENT_LENGTH') or 0) != length:
+            return Response({'error': 'Content-Length does not match Content-Range'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            destination = open(session.temp_path, 'r+b')
+        except FileNotFoundError:
+            return Response({'error': 'Upload data was lost, start a new upload'}, status=status.HTTP_410_GONE)
+
+        with destination:
+            # One writer per session: the lock is held on the file rather
+            # than the session row, so no transaction stays open while the
+            # body streams in. It is released when the file is closed.
+            try:
+                fcntl.flock(destination, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                locked = True
+            else:
+                locked = False
+            session.refresh_from_db(fields=['offset'])
+            if locked or session.offset != start:
+                return Response(
+                    {'error': 'Chunk must start at the current offset', 'offset': session.offset},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            written = 0
+            destination.seek(start)
+            # Drop bytes left over from an earlier, interrupted attempt.
+            destination.truncate()
+            while written < length:
+                chunk = request.stream.read(min(self.read_size, length - written))
+                if not chunk:
+                    break
+                destination.write(chunk)
+                written += len(chunk)
+            destination.flush()
+
+            session.offset = start + written
+            UploadSession.objects.filter(pk=session.pk, offset=start).update(offset=session.offset, updated_at=timezone.now())
+        return Response(self.get_serializer(session).data, headers={'Upload-Offset': str(session.offset)})
+
+class SliderUploadComplete(generics.GenericAPIView):
+    """Create the Slider from a fully received upload."""
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(author=self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        session = self.get_object()
+        if session.offset != session.size:
+            return Response({'error': 'Upload is incomplete', 'offset': session.offset}, status=status.HTTP_409_CONFLICT)
+
+        data = {key: request.data[key] for key in ('name', 'caption', 'is_active') if key in request.data}
+        with transaction.atomic():
+            # Claim the session by deleting its row. A concurrent complete
+            # waits on the row until this one commits, deletes nothing and
+            # gets the 404 instead of a second Slider.
+            if not UploadSession.objects.filter(pk=session.pk, offset=session.size).delete()[0]:
+                return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+            with open(session.temp_path, 'rb') as video:
+                data['video'] = File(video, name=session.filename)
+                serializer = SliderSerializer(data=data, context={'request': request})
+                if not serializer.is_valid():
+                    transaction.set_rollback(True)
+                    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                serializer.save(author=request.user)
+
+        os.remove(session.temp_path)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 #  Contact APIs
-class ContactCreate(generics.CreateAPIView):
+class ContactCreate(DuplicateSubmissionMixin, generics.CreateAPIView):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = 'contact'
+    duplicate_fields = ('firstName', 'lastName', 'email', 'category', 'message')
 
     def perform_create(self, serializer):
         if serializer.is_valid():
@@ -240,12 +672,12 @@ class ContactCreate(generics.CreateAPIView):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-class ContactList(generics.ListAPIView):
+class ContactList(ConditionalGetMixin, generics.ListAPIView):
     queryset = Contact.objects.all().order_by('-created_at')
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated]
 
-class ContactDetail(generics.RetrieveAPIView):
+class ContactDetail(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated]
@@ -271,47 +703,105 @@ class ContactDelete(generics.DestroyAPIView):
         self.perform_destroy(contact)
         return Response({'message': 'Contact deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
-class ContactMarkRead(generics.UpdateAPIView):
-    queryset = Contact.objects.all()
-    serializer_class = ContactSerializer
-    permission_classes = [IsAuthenticated]
-
-    def perform_update(self, serializer):
-        contact = self.get_object()
-        serializer.save(is_read=True)
-        return Response({'message': 'Contact marked as read'}, status=status.HTTP_200_OK)
-
-class ContactMarkResponded(generics.UpdateAPIView):
-    queryset = Contact.objects.all()
-    serializer_class = ContactSerializer
+class ContactBulkStatusView(APIView):
+    """
+    Base for the inbox status endpoints. The body selects contacts either by
+    id, {"ids": [1, 2]}, or by category, is_read and is_responded,
+    {"filter": {"category": "sales", "is_read": false}}; an empty filter
+    selects every contact. Matching contacts are changed with one UPDATE.
+    """
     permission_classes = [IsAuthenticated]
+    changes = {}
+    message = ''
+    max_batch_size = 500
+    filter_fields = {'category': str, 'is_read': bool, 'is_responded': bool}
+
+    def get_filter(self, data):
+        if not isinstance(data, dict) or ('ids' in data) == ('filter' in data):
+            return None, 'Expected either "ids" or "filter"'
+        if 'ids' in data:
+            ids = data['ids']
+            if not isinstance(ids, list) or not ids:
+                return None, 'Expected a non-empty list of ids'
+            if len(ids) > self.max_batch_size:
+                return None, f'At most {self.max_batch_size} ids per request'
+            if any(isinstance(pk, bool) or not isinstance(pk, int) for pk in ids):
+                return None, 'Ids must be integers'
+            return {'pk__in': ids}, None
+        lookups = data['filter']
+        if not isinstance(lookups, dict):
+            return None, 'Expected an object for "filter"'
+        for name, value in lookups.items():
+            if name not in self.filter_fields:
+                return None, f'Cannot filter on "{name}"'
+            if not isinstance(value, self.filter_fields[name]):
+                return None, f'Invalid value for "{name}"'
+        return lookups, None
+
+    def post(self, request, *args, **kwargs):
+        lookups, error = self.get_filter(request.data)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        # Only touch rows that change, so updated_at and the count stay
+        # meaningful and the partial unread/unresponded indexes can be used.
+        queryset = Contact.objects.filter(**lookups).exclude(**self.changes)
+        updated = queryset.update(**self.changes, updated_at=timezone.now())
+        if updated:
+            # update() does not send post_save.
+            bump_generation(Contact)
+        return Response({'message': f'{updated} contacts {self.message}', 'updated': updated}, status=status.HTTP_200_OK)
+
+class ContactMarkRead(ContactBulkStatusView):
+    changes = {'is_read': True}
+    message = 'marked as read'
+
+class ContactMarkResponded(ContactBulkStatusView):
+    changes = {'is_responded': True}
+    message = 'marked as responded'
+
+class ContactMarkUnread(ContactBulkStatusView):
+    changes = {'is_read': False}
+    message = 'marked as unread'
+
+class ContactMarkUnresponded(ContactBulkStatusView):
+    changes = {'is_responded': False}
+    message = 'marked as unresponded'
+
+def contact_summary():
+    # One grouped query per partial index, combined with UNION ALL, so only
+    # the rows still waiting are read. An OR of the two conditions cannot
+    # use the partial indexes and reads the whole table.
+    def waiting(field, label):
+        return (
+            Contact.objects.filter(**{field: False}).order_by()
+            .values('category').annotate(label=Value(label), count=Count('pk'))
+        )
 
-    def perform_update(self, serializer):
-        contact = self.get_object()
-        serializer.save(is_responded=True)
-        return Response({'message': 'Contact marked as responded'}, status=status.HTTP_200_OK)
-
-class ContactMarkUnread(generics.UpdateAPIView):
-    queryset = Contact.objects.all()
-    serializer_class = ContactSerializer
-    permission_classes = [IsAuthenticated]
-
-    def perform_update(self, serializer):
-        contact = self.get_object()
-        serializer.save(is_read=False)
-        return Response({'message': 'Contact marked as unread'}, status=status.HTTP_200_OK)
-
-class ContactMarkUnresponded(generics.UpdateAPIView):
-    queryset = Contact.objects.all()
-    serializer_class = ContactSerializer
+    categories = {}
+    for row in waiting('is_read', 'unread').union(waiting('is_responded', 'unresponded'), all=True):
+        counts = categories.setdefault(row['category'], {'category': row['category'], 'unread': 0, 'unresponded': 0})
+        counts[row['label']] = row['count']
+    rows = [categories[name] for name in sorted(categories)]
+    return {
+        'unread': sum(row['unread'] for row in rows),
+        'unresponded': sum(row['unresponded'] for row in rows),
+        'categories': rows,
+    }
+
+class ContactExport(ExportView):
+    export_name = 'contacts'
+
+class ContactSummary(APIView):
+    """
+    Unread and unresponded counts per category for the dashboard badge,
+    cached until a contact changes.
+    """
     permission_classes = [IsAuthenticated]
 
-    def perform_update(self, serializer):
-        contact = self.get_object()
-        serializer.save(is_responded=False)
-        return Response({'message': 'Contact marked as unresponded'}, status=status.HTTP_200_OK)
+    def get(self, request, *args, **kwargs):
+        return Response(cached_query('contact-summary', (Contact,), contact_summary))
 
-class ContactListByCategory(generics.ListAPIView):
+class ContactListByCategory(ConditionalGetMixin, generics.ListAPIView):
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated]
 
@@ -321,12 +811,13 @@ class ContactListByCategory(generics.ListAPIView):
 
 
 # News APIs
-class NewsList(generics.ListAPIView):
+class NewsList(CachedResponseMixin, ConditionalGetMixin, FastListMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.ListAPIView):
     queryset = News.objects.all().order_by('-created_at')
     serializer_class = NewsSerializer
     permission_classes = [AllowAny]
+    cache_models = (News,)
 
-class NewsDetail(generics.RetrieveAPIView):
+class NewsDetail(ConditionalGetMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.RetrieveAPIView):
     queryset = News.objects.all()
     serializer_class = NewsSerializer
     permission_classes = [AllowAny]
@@ -343,13 +834,13 @@ class NewsCreate(generics.CreateAPIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class NewsUpdate(generics.UpdateAPIView):
-    queryset = News.objects.all()
+    queryset = News.objects.select_related('author')
     serializer_class = NewsSerializer
     permission_classes = [IsAuthenticated]
 
     def perform_update(self, serializer):
-        news = self.get_object()
-        if news.author != self.request.user:
+        news = serializer.instance
+        if news.author_id != self.request.user.id:
             return Response({'error': 'You do not have permission to update this news'}, status=status.HTTP_403_FORBIDDEN)
         if serializer.is_valid():
             serializer.save()
@@ -363,12 +854,14 @@ class NewsDelete(generics.DestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         news = self.get_object()
-        if news.author != request.user:
+        if news.author_id != request.user.id:
             return Response({'error': 'You do not have permission to delete this news'}, status=status.HTTP_403_FORBIDDEN)
-        self.perform_destroy(news)
+        with transaction.atomic():
+            enqueue_media_deletion(news.image)
+            self.perform_destroy(news)
         return Response({'message': 'News deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
-class NewsListByUser(generics.ListAPIView):
+class NewsListByUser(ConditionalGetMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.ListAPIView):
     serializer_class = NewsSerializer
     permission_classes = [IsAuthenticated]
 
@@ -377,12 +870,13 @@ class NewsListByUser(generics.ListAPIView):
 
 
 # Testimonial APIs
-class TestimonialList(generics.ListAPIView):
+class TestimonialList(CachedResponseMixin, ConditionalGetMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.ListAPIView):
     queryset = Testimonial.objects.all()
     serializer_class = TestimonialSerializer
     permission_classes = [AllowAny]
+    cache_models = (Testimonial,)
 
-class TestimonialDetail(generics.RetrieveAPIView):
+class TestimonialDetail(ConditionalGetMixin, SparseFieldsMixin, SerializerQuerysetMixin, generics.RetrieveAPIView):
     queryset = Testimonial.objects.all()
     serializer_class = TestimonialSerializer
     permission_classes = [AllowAny]
@@ -404,8 +898,8 @@ class TestimonialUpdate(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def perform_update(self, serializer):
-        testimonial = self.get_object()
-        if testimonial.author != self.request.user:
+        testimonial = serializer.instance
+        if testimonial.author_id != self.request.user.id:
             return Response({'error': 'You do not have permission to update this testimonial'}, status=status.HTTP_403_FORBIDDEN)
         if serializer.is_valid():
             serializer.save()
@@ -419,7 +913,9 @@ class TestimonialDelete(generics.DestroyAPIView):
 
     def delete(self, request, *args, **kwargs):
         testimonial = self.get_object()
-        if testimonial.author != request.user:
+        if testimonial.author_id != request.user.id:
             return Response({'error': 'You do not have permission to delete this testimonial'}, status=status.HTTP_403_FORBIDDEN)
-        self.perform_destroy(testimonial)
+        with transaction.atomic():
+            enqueue_media_deletion(testimonial.image)
+            self.perform_destroy(testimonial)
         return Response({'message': 'Testimonial deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
@@ -3,14 +3,35 @@ ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with uvicorn (in requirements.txt), one process per CPU core:
+
+    uvicorn core.asgi:application --host 0.0.0.0 --port $PORT --workers 4 --limit-concurrency 100
+
+The async views in api/async_views.py run on the event loop. Everything
+synchronous, DRF views and the async ORM's queries alike, runs in a thread
+per request (see below), so a slow query or a slow Cloudinary call only
+holds up its own request. Each of those threads opens its own database
+connection: keep CONN_MAX_AGE at 0 (dj_database_url's default) and size
+--limit-concurrency to what the database accepts. core.wsgi with gunicorn
+remains the WSGI entry point; `manage.py benchmark_asgi` compares the two.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
+from asgiref.sync import ThreadSensitiveContext
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    # By default all thread-sensitive code of the process, which includes
+    # every ORM call, shares one thread, so requests would wait on each
+    # other's queries. A context per request gives each request its own.
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
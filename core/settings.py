@@ -12,14 +12,13 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
-from dotenv import load_dotenv
 import dj_database_url
 import os
+import tempfile
 from corsheaders.defaults import default_headers
-load_dotenv()
-from decouple import config
-import cloudinary_storage
-import cloudinary
+# decouple reads the environment, then .env. The Cloudinary SDK is imported
+# only when media is uploaded or deleted (api/media.py), not at startup.
+from decouple import Csv, config
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,10 +49,14 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'corsheaders',
     'cloudinary_storage',
-    'cloudinary',
 ]
 
 MIDDLEWARE = [
+    # Inactive unless PROFILING_ENABLED is set; see below.
+    'api.profiling.ProfilingMiddleware',
+    'api.metrics.MetricsMiddleware',
+    # Inactive unless a replica is configured; see api/routers.py.
+    'api.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,18 +72,41 @@ REST_FRAMEWORK = {
     
     'DEFAULT_AUTHENTICATION_CLASSES': (
       
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),   
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
+    # Token buckets for the endpoints anyone can hammer (api/throttling.py),
+    # per client IP: a burst of N, refilling over the period.
+    'DEFAULT_THROTTLE_RATES': {
+        'contact': config('THROTTLE_RATE_CONTACT', default='5/min'),
+        'register': config('THROTTLE_RATE_REGISTER', default='10/hour'),
+        'token': config('THROTTLE_RATE_TOKEN', default='20/min'),
+    },
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=2),
+    # Tokens carry a fingerprint of the password hash, so changing the
+    # password revokes them.
+    'CHECK_REVOKE_TOKEN': True,
 }
 
+# Switches off DEFAULT_THROTTLE_RATES; benchmark_api does so for its run.
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+
+# Identical contact form submissions within this many seconds are answered
+# with the first response instead of creating another row; 0 disables it.
+DUPLICATE_SUBMISSION_WINDOW = config('DUPLICATE_SUBMISSION_WINDOW', default=600, cast=int)
+
+# Seconds an authenticated user is kept in the cache (api/authentication.py);
+# saving or deleting the user drops it earlier.
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300, cast=int)
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -123,7 +149,75 @@ DATABASES = {
     }
 }
 
-DATABASES['default'] = dj_database_url.config()
+# Persistent connections: seconds to keep a connection between requests (0
+# closes it after each request, which ASGI needs; see core/asgi.py), and
+# whether to check a kept connection is still alive before reusing it.
+DATABASE_CONN_MAX_AGE = config('DATABASE_CONN_MAX_AGE', default=0, cast=int)
+DATABASE_CONN_HEALTH_CHECKS = config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+DATABASES['default'] = dj_database_url.parse(
+    config('DATABASE_URL'), conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+)
+
+# Optional read replica (api/routers.py). GET/HEAD/OPTIONS requests read from
+# it; writes, and a client's reads for READ_YOUR_WRITES_SECONDS after it
+# wrote, use the primary. An unreachable replica is skipped and retried
+# every REPLICA_HEALTH_CHECK_INTERVAL seconds.
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        REPLICA_DATABASE_URL, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+    )
+    # In tests the replica is the test primary under another name.
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+READ_YOUR_WRITES_SECONDS = config('READ_YOUR_WRITES_SECONDS', default=10, cast=int)
+REPLICA_HEALTH_CHECK_INTERVAL = config('REPLICA_HEALTH_CHECK_INTERVAL', default=30, cast=int)
+
+# Cache
+# Any Django backend works: locmem (default), file-based, or Redis via
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and
+# CACHE_LOCATION=redis://host:6379/0.
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='nmppolymer-api'),
+    }
+}
+
+# Seconds a cached public response is kept; saves and deletes invalidate
+# it earlier through per-model generation counters (api/cache.py).
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Per-request profiling (api/profiling.py): Server-Timing headers and a JSON
+# log line per request. A PROFILING_SAMPLE_RATE fraction of requests runs
+# under cProfile, and samples slower than PROFILING_SLOW_MS are dumped to
+# PROFILING_DUMP_DIR.
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SLOW_MS = config('PROFILING_SLOW_MS', default=500, cast=int)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_DUMP_DIR = config('PROFILING_DUMP_DIR', default=os.path.join(BASE_DIR, 'tmp', 'profiles'))
+
+# Request metrics served at /metrics (api/metrics.py). Each worker process
+# writes to its own file in METRICS_DIR, which must be writable (the code
+# directory is not on Vercel); clear it when deploying. Scrapes must send
+# "Authorization: Bearer <METRICS_TOKEN>", and outside DEBUG the app refuses
+# to start with metrics enabled and no token.
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'nmppolymer-api-metrics'))
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': config('API_LOG_LEVEL', default='INFO')},
+    },
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -175,13 +269,27 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-cloudinary.config( 
-  cloud_name = "da59vv48c", 
-  api_key = "859235219229299", 
-  api_secret = "zl4IF3cjJ6YzpF6QdtrzHVQ8KMM", 
-  secure = True
-)
-
+# Resumable slider uploads: chunks are appended to a file in this directory
+# until the upload is finalized.
+CHUNKED_UPLOAD_DIR = config('CHUNKED_UPLOAD_DIR', default=os.path.join(BASE_DIR, 'tmp', 'uploads'))
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Catalog imports (api/importing.py). Uploaded manifests are kept in
+# CATALOG_IMPORT_DIR until the import finishes; image paths in a manifest are
+# relative to CATALOG_IMPORT_MEDIA_ROOT, or http(s) URLs on one of the
+# comma-separated CATALOG_IMPORT_URL_HOSTS (none by default).
+CATALOG_IMPORT_DIR = config('CATALOG_IMPORT_DIR', default=os.path.join(BASE_DIR, 'tmp', 'imports'))
+CATALOG_IMPORT_MEDIA_ROOT = config('CATALOG_IMPORT_MEDIA_ROOT', default=os.path.join(BASE_DIR, 'tmp', 'import-media'))
+CATALOG_IMPORT_URL_HOSTS = config('CATALOG_IMPORT_URL_HOSTS', default='', cast=Csv())
+CATALOG_IMPORT_BATCH_SIZE = config('CATALOG_IMPORT_BATCH_SIZE', default=200, cast=int)
+CATALOG_IMPORT_UPLOAD_WORKERS = config('CATALOG_IMPORT_UPLOAD_WORKERS', default=8, cast=int)
+CATALOG_IMPORT_MAX_IMAGE_SIZE = 10 * 1024 * 1024
+
+# Widths of the WebP/JPEG derivatives generated for uploaded images (api/images.py).
+IMAGE_DERIVATIVE_WIDTHS = [320, 640, 1280]
+
+# Credentials for django-cloudinary-storage and, through
+# api.media.configure_cloudinary(), for direct Cloudinary API calls.
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': 'da59vv48c',
     'API_KEY': '859235219229299',
@@ -189,6 +297,10 @@ CLOUDINARY_STORAGE = {
 }
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+
+# Client used by background jobs to delete uploaded media (api/media.py).
+# api.media.StorageMediaClient deletes from the local storage instead.
+MEDIA_CLIENT = config('MEDIA_CLIENT', default='api.media.CloudinaryMediaClient')
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 